@@ -0,0 +1,80 @@
+"""
+Benchmark of listing a huge flat directory.
+
+Compares os.scandir with the getdents backend (Linux only), and counts the getdents64 calls needed with glibc's
+32KiB readdir buffer and with the 1MiB buffer of the backend. The CPU cost per entry is what matters on local
+file systems, while the number of calls matters on FUSE mounts (e.g. object-store-backed trees), where every call
+is a request to the daemon. --fuse-latency serves the directory from a FUSE mount (flat_fuse.py, needs root) whose
+every request waits that long, so both backends are timed on a real mount.
+
+Usage: python benchmarks/bench_listing.py [--files N] [--runs N] [--fuse-latency SECONDS] [--directory DIR]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import flat_fuse
+from file_system_analyzer.models import getdents
+from file_system_analyzer.models.getdents import GETDENTS_BUFFER_BYTES, iter_dirent_batches, list_directory
+
+GLIBC_READDIR_BYTES = 32 * 1024
+
+
+def count_calls(directory, buffer_size):
+    # every batch is one call, plus the final call returning 0
+    return sum(1 for _ in iter_dirent_batches(directory, buffer_size)) + 1
+
+
+def time_listing(directory, backend, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        entries = list_directory(directory, backend)
+        sum(1 for entry in entries if entry.is_file(follow_symlinks=False))
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--fuse-latency", type=float, help="list a FUSE mount whose requests wait this many seconds")
+    parser.add_argument("--directory", help="existing directory to list instead of a generated one")
+    args = parser.parse_args()
+
+    if not getdents.getdents_available():
+        print("getdents64 isn't available on this machine")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory, server = args.directory, None
+        if args.fuse_latency is not None:
+            directory = tmp
+            server = flat_fuse.mount(tmp, args.files, args.fuse_latency)
+        elif directory is None:
+            directory = tmp
+            for i in range(args.files):
+                open(os.path.join(tmp, f"object_{i:08d}.parquet"), "w").close()
+
+        try:
+            small_calls = count_calls(directory, GLIBC_READDIR_BYTES)
+            large_calls = count_calls(directory, GETDENTS_BUFFER_BYTES)
+            entries = len(os.listdir(directory))
+            print(f"{entries} entries: {small_calls} getdents64 calls with a 32KiB buffer (scandir), "
+                  f"{large_calls} with a 1MiB buffer (getdents backend)")
+
+            scandir = time_listing(directory, "scandir", args.runs)
+            backend = time_listing(directory, "getdents", args.runs)
+        finally:
+            if server is not None:
+                flat_fuse.unmount(directory, server)
+        print(f"{'backend':<12}{'total':>12}{'per entry':>14}")
+        for name, seconds in (("scandir", scandir), ("getdents", backend)):
+            print(f"{name:<12}{seconds * 1e3:>10.1f}ms{seconds / entries * 1e9:>12.0f}ns")
+
+
+if __name__ == "__main__":
+    main()
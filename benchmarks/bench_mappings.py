@@ -0,0 +1,108 @@
+"""
+Benchmark of loading and querying the mapping tables.
+
+Load time compares importing the source tables and building the term matcher in a fresh process, as done before,
+with importing the precompiled tables and restoring the matcher from them (the matcher module itself is imported
+beforehand by both). Bytecode is cached in a temporary
+directory and warmed up first, as it would be in an installed package. Lookups compare the source dicts with a
+regex alternation over all terms against the lookup functions of the compiled tables with the restored matcher.
+
+Usage: python benchmarks/bench_mappings.py [--lookups N] [--runs N]
+"""
+import argparse
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import timeit
+
+from file_system_analyzer.models import compiled_mappings, file_type_mappings
+from file_system_analyzer.models.term_matcher import TermMatcher
+
+LOAD_SOURCE = """
+import time
+from file_system_analyzer.models.term_matcher import TermMatcher
+start = time.perf_counter()
+from file_system_analyzer.models.file_type_mappings import TERM_TO_CATEGORY
+TermMatcher(TERM_TO_CATEGORY)
+print(time.perf_counter() - start)
+"""
+
+LOAD_COMPILED = """
+import time
+from file_system_analyzer.models.term_matcher import TermMatcher
+start = time.perf_counter()
+from file_system_analyzer.models.compiled_mappings import TERM_MATCHER_TABLES
+TermMatcher.from_tables(*TERM_MATCHER_TABLES)
+print(time.perf_counter() - start)
+"""
+
+DESCRIPTIONS = [
+    "ELF 64-bit LSB shared object, x86-64, version 1 (SYSV), dynamically linked, stripped",
+    "Zip archive data, at least v2.0 to extract, compression method=deflate",
+    "Composite Document File V2 Document, Little Endian, Os: Windows, Version 10.0",
+    "Microsoft Excel 2007+",
+    "data",
+]
+
+
+def load_time(code, runs, cache):
+    command = [sys.executable, "-X", f"pycache_prefix={cache}", "-c", code]
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, env=env)
+    return min(float(subprocess.run(command, check=True, capture_output=True, text=True, env=env).stdout)
+               for _ in range(runs))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache:
+        source, compiled = load_time(LOAD_SOURCE, args.runs, cache), load_time(LOAD_COMPILED, args.runs, cache)
+    print(f"{'load, source + build':<26} {source * 1000:8.3f} ms")
+    print(f"{'load, compiled':<26} {compiled * 1000:8.3f} ms   {source / compiled:6.2f}x")
+
+    rng = random.Random(0)
+    extensions = [rng.choice(list(file_type_mappings.EXTENSION_TO_CATEGORY) + [".unknown"])
+                  for _ in range(args.lookups)]
+    descriptions = [rng.choice(DESCRIPTIONS) for _ in range(args.lookups)]
+    pattern = re.compile("|".join(re.escape(k) for k in file_type_mappings.TERM_TO_CATEGORY), re.IGNORECASE)
+    matcher = TermMatcher.from_tables(*compiled_mappings.TERM_MATCHER_TABLES)
+
+    def source_extensions():
+        table = file_type_mappings.EXTENSION_TO_CATEGORY
+        for extension in extensions:
+            table.get(extension, "other")
+
+    def compiled_extensions():
+        lookup = compiled_mappings.extension_category
+        for extension in extensions:
+            lookup(extension, "other")
+
+    def source_terms():
+        for description in descriptions:
+            match = pattern.search(description)
+            if match:
+                file_type_mappings.TERM_TO_CATEGORY[match.group(0).lower()]
+
+    def compiled_terms():
+        for description in descriptions:
+            term = matcher.search(description)
+            if term:
+                compiled_mappings.term_category(term)
+
+    for label, baseline, candidate in [("extensions", source_extensions, compiled_extensions),
+                                       ("terms", source_terms, compiled_terms)]:
+        before = min(timeit.repeat(baseline, number=1, repeat=3))
+        after = min(timeit.repeat(candidate, number=1, repeat=3))
+        print(f"{label + ', source':<26} {args.lookups / before:>14,.0f} lookups/s")
+        print(f"{label + ', compiled':<26} {args.lookups / after:>14,.0f} lookups/s   {before / after:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
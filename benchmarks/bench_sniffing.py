@@ -0,0 +1,67 @@
+"""
+Benchmark of reading file headers for libmagic.
+
+Compares libmagic opening and reading every file by itself (from_file, once for the MIME type and once more for the
+raw description of application types) with the leading bytes read once into a reused buffer and passed to libmagic
+(from_buffer), with the default 1MiB limit and a lower one. Page caches can be dropped between runs to measure cold
+reads (Linux, as root).
+
+Usage: python benchmarks/bench_sniffing.py [--files N] [--max-bytes 64KiB] [--cold]
+"""
+import argparse
+import os
+import random
+import subprocess
+import tempfile
+import time
+
+from file_system_analyzer.cli.utils import convert_to_bytes
+from file_system_analyzer.models.classifiers import MagicClassifier
+from file_system_analyzer.models.file_system_analyzer import FileMetadata
+from file_system_analyzer.models.utils import infer_file_type_magic
+
+HEADERS = [b"\x89PNG\r\n\x1a\n", b"%PDF-1.4\n", b"PK\x03\x04", b"\x7fELF\x02\x01\x01", b"plain text\n",
+           b"\x1f\x8b\x08"]
+SIZES = [100, 2000, 30_000, 200_000, 3_000_000]
+
+
+def drop_caches():
+    subprocess.run(["sync"], check=True)
+    with open("/proc/sys/vm/drop_caches", "w") as f:
+        f.write("3\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--max-bytes", default="64KiB")
+    parser.add_argument("--cold", help="drop page caches before every run", action="store_true")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        files = []
+        for i in range(args.files):
+            path = os.path.join(directory, f"file_{i}")
+            with open(path, "wb") as f:
+                f.write(rng.choice(HEADERS) + rng.randbytes(rng.choice(SIZES)))
+            files.append(FileMetadata(path, os.path.getsize(path), 0o644))
+
+        default, capped = MagicClassifier(), MagicClassifier(convert_to_bytes(args.max_bytes))
+        runs = [("from_file", lambda file: infer_file_type_magic(file.path)),
+                ("header, 1MiB", default.classify),
+                (f"header, {args.max_bytes}", capped.classify)]
+        baseline = None
+        for name, classify in runs:
+            if args.cold:
+                drop_caches()
+            start = time.perf_counter()
+            for file in files:
+                classify(file)
+            seconds = time.perf_counter() - start
+            baseline = baseline or seconds
+            print(f"{name:<16} {len(files) / seconds:>10,.0f} files/s   {baseline / seconds:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
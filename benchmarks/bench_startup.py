@@ -0,0 +1,68 @@
+"""
+Startup time benchmark for the `fsa` command.
+
+Measures wall time of `fsa -h`, of a machine-readable scan (`-o`) and of a full report over a small directory,
+and lists the slowest imports reported by `python -X importtime` for `fsa -h`.
+
+Usage: python benchmarks/bench_startup.py [--runs N]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+FSA = [sys.executable, "-m", "file_system_analyzer.cli.cli"]
+
+
+def time_command(args, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(FSA + args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def slowest_imports(args, count):
+    process = subprocess.run([sys.executable, "-X", "importtime"] + FSA[1:] + args,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "data"
+        root.mkdir()
+        for i in range(20):
+            (root / f"file_{i}.txt").write_text("hello\n" * i)
+
+        cases = {
+            "fsa -h": ["-h"],
+            "fsa -d small -o part.json": ["-d", str(root), "-t", "1KiB", "-o", str(Path(tmp) / "part.json")],
+            "fsa -d small (report)": ["-d", str(root), "-t", "1KiB"],
+        }
+        for name, case_args in cases.items():
+            timings = time_command(case_args, args.runs)
+            print(f"{name:<28} median {statistics.median(timings) * 1000:8.1f} ms"
+                  f"   min {min(timings) * 1000:8.1f} ms")
+
+    print("\nslowest imports of `fsa -h` (cumulative, us):")
+    for cumulative, name in slowest_imports(["-h"], 10):
+        print(f"{cumulative:>10}  {name}")
+
+
+if __name__ == "__main__":
+    main()
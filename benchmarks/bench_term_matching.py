@@ -0,0 +1,73 @@
+"""
+Benchmark of mapping raw libmagic descriptions to categories.
+
+Compares the former approach (one regex alternation over all terms searched with re.IGNORECASE, followed by
+.lower() and a dict lookup) with the Aho-Corasick matcher, uncached and memoized.
+
+Usage: python benchmarks/bench_term_matching.py [--files N]
+"""
+import argparse
+import random
+import re
+import timeit
+
+from file_system_analyzer.models.file_type_mappings import TERM_TO_CATEGORY
+from file_system_analyzer.models.term_matcher import TermMatcher
+from file_system_analyzer.models.utils import category_from_description
+
+# typical descriptions of files with an 'application' MIME type
+DESCRIPTIONS = [
+    "ELF 64-bit LSB shared object, x86-64, version 1 (SYSV), dynamically linked, stripped",
+    "ELF 64-bit LSB pie executable, x86-64, version 1 (SYSV), dynamically linked, interpreter /lib64/ld-linux",
+    "Mach-O 64-bit arm64 executable, flags:<NOUNDEFS|DYLDLINK|TWOLEVEL|PIE>",
+    "PE32+ executable (console) x86-64, for MS Windows, 7 sections",
+    "Zip archive data, at least v2.0 to extract, compression method=deflate",
+    "SQLite 3.x database, last written using SQLite version 3045001, file counter 12",
+    "data",
+    "Composite Document File V2 Document, Little Endian, Os: Windows, Version 10.0",
+    "Berkeley DB (Btree, version 9, native byte-order)",
+    "Java serialization data, version 5",
+    "PostgreSQL custom database dump - v1.14-0",
+    "GPG symmetrically encrypted data (AES256 cipher)",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=200_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    stream = [rng.choice(DESCRIPTIONS) for _ in range(args.files)]
+
+    pattern = re.compile("|".join(re.escape(k) for k in TERM_TO_CATEGORY), re.IGNORECASE)
+    matcher = TermMatcher(TERM_TO_CATEGORY)
+
+    def regex_path():
+        for description in stream:
+            match = pattern.search(description)
+            if match:
+                TERM_TO_CATEGORY[match.group(0).lower()]
+
+    def matcher_path():
+        for description in stream:
+            term = matcher.search(description)
+            if term:
+                TERM_TO_CATEGORY[term]
+
+    def memoized_path():
+        for description in stream:
+            category_from_description(description)
+
+    results = {}
+    for name, func in [("regex (former)", regex_path), ("aho-corasick", matcher_path),
+                       ("aho-corasick + memo", memoized_path)]:
+        results[name] = min(timeit.repeat(func, number=1, repeat=3))
+
+    baseline = results["regex (former)"]
+    for name, seconds in results.items():
+        print(f"{name:<22} {args.files / seconds:>14,.0f} descriptions/s   {baseline / seconds:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
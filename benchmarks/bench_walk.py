@@ -0,0 +1,89 @@
+"""
+Benchmark of the per-file cost of a scan on the extension-only path.
+
+Compares a bare recursive os.scandir walk, which lists directories and stats every file, with the analyzer
+classifying files by their extensions only: streaming them with iter_files, and aggregating them by category with
+categorize_files. The bare walk is the upper bound, what's left is the cost of records, classification and
+aggregation. Page caches are warm, every mode is run once before it is timed.
+
+Usage: python benchmarks/bench_walk.py [--files N] [--per-directory N] [--runs N] [--directory DIR]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from file_system_analyzer.models.classifiers import ExtensionClassifier
+from file_system_analyzer.models.file_system_analyzer import FileSystemAnalyzer
+
+EXTENSIONS = (".txt", ".py", ".jpg", ".mp4", ".zip", ".parquet", "")
+
+
+def build_tree(root, files, per_directory):
+    for i in range(files):
+        directory = os.path.join(root, f"dir_{i // per_directory:05d}")
+        if i % per_directory == 0:
+            os.makedirs(directory)
+        with open(os.path.join(directory, f"file_{i:08d}{EXTENSIONS[i % len(EXTENSIONS)]}"), "wb") as f:
+            # a few files are above the threshold, so large files are tracked too
+            if i % 100 == 0:
+                f.write(b"x" * 2048)
+
+
+def scandir_walk(path):
+    count = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False):
+                entry.stat(follow_symlinks=False)
+                count += 1
+            elif entry.is_dir(follow_symlinks=False):
+                count += scandir_walk(entry.path)
+    return count
+
+
+def iterate(directory):
+    analyzer = FileSystemAnalyzer(directory, 1024, classifiers=[ExtensionClassifier()])
+    return sum(1 for _ in analyzer.iter_files())
+
+
+def categorize(directory):
+    analyzer = FileSystemAnalyzer(directory, 1024, classifiers=[ExtensionClassifier()])
+    analyzer.categorize_files()
+    return sum(len(files.files) for files in analyzer.files_by_category.values())
+
+
+def time_mode(function, directory, runs):
+    function(directory)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        count = function(directory)
+        timings.append(time.perf_counter() - start)
+    return count, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--per-directory", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--directory", help="existing directory to scan instead of a generated one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.directory
+        if directory is None:
+            directory = tmp
+            build_tree(tmp, args.files, args.per_directory)
+
+        count, baseline = time_mode(scandir_walk, directory, args.runs)
+        print(f"{'os.scandir walk':<18} {count / baseline:>12,.0f} files/s")
+        for name, function in [("iter_files", iterate), ("categorize_files", categorize)]:
+            count, elapsed = time_mode(function, directory, args.runs)
+            print(f"{name:<18} {count / elapsed:>12,.0f} files/s   {elapsed / baseline:5.2f}x the bare walk")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Minimal FUSE file system serving one flat directory of empty files, for benchmarks of listings on FUSE mounts.
+
+Speaks the kernel protocol on /dev/fuse directly, so neither libfuse nor a Python binding is needed, but mounting
+needs root. Every READDIR request waits --latency seconds, like a daemon fetching listings from an object store.
+Like libfuse, the mount allows requests of up to 256 pages.
+
+Usage: python benchmarks/flat_fuse.py MOUNTPOINT [--files N] [--latency SECONDS]
+"""
+import argparse
+import ctypes
+import errno
+import os
+import stat
+import struct
+import subprocess
+import sys
+import time
+
+FUSE_LOOKUP, FUSE_FORGET, FUSE_GETATTR, FUSE_INIT = 1, 2, 3, 26
+FUSE_OPENDIR, FUSE_READDIR, FUSE_RELEASEDIR, FUSE_DESTROY, FUSE_BATCH_FORGET = 27, 28, 29, 38, 42
+FUSE_MAX_PAGES = 1 << 22
+MAX_PAGES = 256
+ROOT_INODE = 1
+
+IN_HEADER = struct.Struct("=IIQQIIIHH")
+OUT_HEADER = struct.Struct("=IiQ")
+ATTR = struct.Struct("=QQQQQQIIIIIIIIII")
+DIRENT = struct.Struct("=QQII")
+
+
+def attributes(inode):
+    mode = stat.S_IFDIR | 0o755 if inode == ROOT_INODE else stat.S_IFREG | 0o644
+    return ATTR.pack(inode, 0, 0, 0, 0, 0, 0, 0, 0, mode, 1, 0, 0, 0, 4096, 0)
+
+
+def serve(mountpoint, files, latency):
+    names = [b".", b".."] + [f"object_{i:08d}.parquet".encode() for i in range(files)]
+    inodes = {name: i + ROOT_INODE for i, name in enumerate(names)}
+    fd = os.open("/dev/fuse", os.O_RDWR)
+    libc = ctypes.CDLL(None, use_errno=True)
+    options = f"fd={fd},rootmode=40000,user_id=0,group_id=0".encode()
+    if libc.mount(b"flat_fuse", os.fsencode(mountpoint), b"fuse", 0, options) != 0:
+        sys.exit(f"mounting {mountpoint} failed: {os.strerror(ctypes.get_errno())}")
+    print("mounted", flush=True)
+
+    while True:
+        try:
+            request = os.read(fd, (MAX_PAGES + 1) * 4096)
+        except OSError as e:
+            if e.errno == errno.EINTR:
+                continue
+            # ENODEV once the file system is unmounted
+            return
+        _, opcode, unique, node, *_ = IN_HEADER.unpack_from(request)
+        body = request[IN_HEADER.size:]
+        error, reply = 0, b""
+        if opcode == FUSE_INIT:
+            _, _, readahead, flags = struct.unpack_from("=IIII", body)
+            reply = struct.pack("=IIIIHHIIHHII24x", 7, 31, readahead, flags & FUSE_MAX_PAGES, 16, 12,
+                                MAX_PAGES * 4096, 1, MAX_PAGES, 0, 0, 0)
+        elif opcode == FUSE_GETATTR:
+            reply = struct.pack("=QII", 1, 0, 0) + attributes(node)
+        elif opcode == FUSE_LOOKUP:
+            inode = inodes.get(body.split(b"\0", 1)[0]) if node == ROOT_INODE else None
+            if inode is None:
+                error = -errno.ENOENT
+            else:
+                reply = struct.pack("=QQQQII", inode, 0, 1, 1, 0, 0) + attributes(inode)
+        elif opcode == FUSE_OPENDIR:
+            reply = struct.pack("=QII", 0, 0, 0)
+        elif opcode == FUSE_READDIR:
+            _, offset, size = struct.unpack_from("=QQI", body)
+            time.sleep(latency)
+            records = []
+            used = 0
+            for i in range(offset, len(names)):
+                name = names[i]
+                length = (DIRENT.size + len(name) + 7) & ~7
+                if used + length > size:
+                    break
+                d_type = 4 if i < 2 else 8
+                records.append(DIRENT.pack(inodes[name], i + 1, len(name), d_type)
+                               + name.ljust(length - DIRENT.size, b"\0"))
+                used += length
+            reply = b"".join(records)
+        elif opcode in (FUSE_FORGET, FUSE_BATCH_FORGET):
+            continue
+        elif opcode == FUSE_DESTROY:
+            return
+        elif opcode != FUSE_RELEASEDIR:
+            error = -errno.ENOSYS
+        try:
+            os.write(fd, OUT_HEADER.pack(OUT_HEADER.size + len(reply), error, unique) + reply)
+        except OSError:
+            pass
+
+
+def mount(mountpoint, files, latency):
+    """Serves the file system from a child process, returning once it is mounted"""
+    process = subprocess.Popen([sys.executable, __file__, mountpoint, "--files", str(files),
+                                "--latency", str(latency)], stdout=subprocess.PIPE, text=True)
+    if process.stdout.readline().strip() != "mounted":
+        process.wait()
+        raise OSError(f"could not mount {mountpoint}")
+    return process
+
+
+def unmount(mountpoint, process):
+    subprocess.run(["umount", mountpoint], check=False)
+    process.wait(10)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("mountpoint")
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every READDIR request waits")
+    args = parser.parse_args()
+    serve(args.mountpoint, args.files, args.latency)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,253 @@
 import argparse
 import sys
 import os
+from typing import List, Optional
 
-from file_system_analyzer.models.file_system_analyzer import FileSystemAnalyzer
-from rich.console import Console
-from .utils import parse_output, convert_to_bytes
+from .utils import convert_to_bytes, parse_shard
 from ..logging_config import logger
 
+# rich, python-magic and the analyzer models are imported inside the functions which need them, so that
+# `fsa -h`, argument errors and machine-readable output don't pay for loading them
 
-def main() -> None:
+
+def merge(argv: List[str]) -> None:
+    """
+    Entry for the `fsa merge` subcommand. Combines partial results written by sharded scans into a final report.
+    :param argv: List[str]
+        Arguments following `merge`
+    :return: None
+    """
+    parser = argparse.ArgumentParser(prog="fsa merge")
+    parser.add_argument("partials", nargs="+", help="partial result files written by `fsa --shard i/N -o FILE`")
+    parser.add_argument("-o", "--output", help="write the merged partial result to this file instead of a report")
+    args = parser.parse_args(argv)
+
+    from file_system_analyzer.models.sharding import PartialResult, merge_partial_results
+
+    try:
+        result = merge_partial_results([PartialResult.load(path) for path in args.partials])
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Error when merging partial results: {e}")
+        sys.exit(1)
+
+    if args.output:
+        result.save(args.output)
+        return
+
+    from rich.console import Console
+    from .utils import parse_partial_result
+
+    console = Console()
+    console.print("FILE SYSTEM ANALYSIS REPORT", style="bold italic", justify="center")
+    parse_partial_result(console, result)
+
+
+def trends(argv: List[str]) -> None:
+    """
+    Entry for the `fsa trends` subcommand. Reports growth rates and projections from a scan history, without
+    rescanning anything.
+    :param argv: List[str]
+        Arguments following `trends`
+    :return: None
+    """
+    parser = argparse.ArgumentParser(prog="fsa trends")
+    parser.add_argument("history", help="history file written by `fsa --history FILE`")
+    parser.add_argument("-d", "--directory", help="scanned directory to report on (default: the one scanned last)")
+    parser.add_argument("--window", help="days of history over which growth rates are fitted (default: 30)",
+                        type=float, default=30.0)
+    parser.add_argument("--horizon", help="days ahead to which sizes are projected (default: 90)",
+                        type=float, default=90.0)
+    parser.add_argument("--directories", help="number of top-level directories shown (default: 10)",
+                        type=int, default=10)
+    args = parser.parse_args(argv)
+    if args.window <= 0 or args.horizon < 0:
+        parser.error("--window must be positive and --horizon must not be negative")
+
+    from file_system_analyzer.models.history import ScanHistory, compute_trends
+
+    history = ScanHistory(args.history)
+    try:
+        snapshots = history.load(os.path.abspath(args.directory) if args.directory else None)
+    except OSError as e:
+        logger.error(f"Error when reading scan history: {e}")
+        sys.exit(1)
+    if not snapshots:
+        logger.error(f"No scans of {args.directory or 'any directory'} in {args.history}")
+        sys.exit(1)
+    # without a directory, report on the one scanned last
+    dir_path = snapshots[-1].dir_path
+    report = compute_trends([s for s in snapshots if s.dir_path == dir_path], args.window, args.horizon)
+
+    from rich.console import Console
+    from .utils import parse_trends
+
+    console = Console()
+    console.print("FILE SYSTEM TRENDS REPORT", style="bold italic", justify="center")
+    parse_trends(console, report, args.directories)
+
+
+def estimate(directory: str, samples_per_stratum: int, seed: Optional[int], classifiers=None) -> None:
+    """
+    Prints estimated category totals of the directory, classifying only a stratified sample of its files
+    :param directory: str
+        Directory to be analyzed
+    :param samples_per_stratum: int
+        Maximum number of files classified per stratum
+    :param seed: Optional[int]
+        Seed of the random sample
+    :param classifiers: Optional[List[Classifier]]
+        Chain of classifiers, the default chain of the full scan if None
+    :return: None
+    """
+    from rich.console import Console
+    from file_system_analyzer.models.classifiers import default_classifiers
+    from file_system_analyzer.models.errors import ScanErrors
+    from file_system_analyzer.models.estimate import chain_classify, estimate_categories
+    from file_system_analyzer.models.utils import magic_available
+    from .utils import parse_errors, parse_estimate
+
+    # failures of single classifiers are counted with the failures of the walk
+    errors = ScanErrors()
+    classify = chain_classify(classifiers if classifiers is not None else default_classifiers(magic_available()),
+                              errors)
+    console = Console()
+    with console.status("[bold]Sampling files...[/bold]", spinner="dots"):
+        try:
+            result = estimate_categories(directory, classify, samples_per_stratum, seed, errors)
+        except Exception as e:
+            logger.error(f"Error when estimating categories: {e}")
+            sys.exit(1)
+
+    console.print("FILE SYSTEM ANALYSIS REPORT (ESTIMATE)", style="bold italic", justify="center")
+    parse_estimate(console, result)
+    if errors:
+        parse_errors(console, errors.counts, errors.samples)
+
+
+def append_history(path: str, fsa) -> None:
+    """
+    Appends totals of a finished scan to the history file
+    :param path: str
+        History file
+    :param fsa: FileSystemAnalyzer
+        Analyzer which has categorized its files
+    :return: None
+    """
+    from file_system_analyzer.models.history import ScanHistory, Snapshot
+
+    try:
+        ScanHistory(path).append(Snapshot.from_analyzer(fsa))
+    except OSError as e:
+        logger.error(f"Error when appending to scan history: {e}")
+        sys.exit(1)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
     """
     Main function which is an entry for the `fsa` command. Contains CLI interaction functionality.
+    :param argv: Optional[List[str]]
+        Command line arguments, defaults to sys.argv
     :return: None
     """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "merge":
+        merge(argv[1:])
+        return
+    if argv and argv[0] == "trends":
+        trends(argv[1:])
+        return
+    if argv and argv[0] == "serve":
+        from .serve import serve
+
+        serve(argv[1:])
+        return
+
     # collect and parse arguments
-    parser = argparse.ArgumentParser()
-    parser.add_argument("-d", "--directory", help="directory to be analyzed", required=True)
+    parser = argparse.ArgumentParser(prog="fsa", epilog="use `fsa merge -h` to combine results of sharded scans, "
+                                                       "`fsa trends -h` to report growth across a scan history and "
+                                                       "`fsa serve -h` to run a local scan service")
+    # -d and -t are required unless a scan is resumed, which is checked after parsing
+    parser.add_argument("-d", "--directory", help="directory to be analyzed")
     parser.add_argument("-t", "--threshold",
                         help="size threshold to identify large files (units: B, KiB, MiB, GiB, TiB, PiB), e.g. 10MiB",
-                        type=str, required=True)
-    args = parser.parse_args()
+                        type=str)
+    parser.add_argument("--shard", help="scan only the top-level entries of shard i out of N, e.g. 2/8")
+    parser.add_argument("-o", "--output", help="write a mergeable partial result to this file instead of a report")
+    parser.add_argument("--top-k", help="number of largest files kept in a partial result (default: 100)",
+                        type=int, default=100)
+    parser.add_argument("--stats", help="print hit rates of the category lookup caches after the report",
+                        action="store_true")
+    parser.add_argument("--audit", help="also audit ownership and setuid binaries, reported by severity",
+                        action="store_true")
+    parser.add_argument("--setuid-allowlist",
+                        help="file listing expected setuid binaries, one path per line (implies --audit)")
+    parser.add_argument("--inspect-archives", help="list members of zip and tar archives without extracting them "
+                                                   "and fold their uncompressed sizes into category totals",
+                        action="store_true")
+    parser.add_argument("--max-archive-bytes", help="maximum bytes read from a single archive (default: 16MiB)",
+                        type=str, default="16MiB")
+    parser.add_argument("--size-mode", help="size compared against the threshold: apparent (st_size, default) or "
+                                            "allocated (blocks used on disk, smaller for sparse files)",
+                        choices=("apparent", "allocated"), default="apparent")
+    parser.add_argument("--age-report", help="report bytes by modification and access age, and cold data per "
+                                             "category and directory", action="store_true")
+    parser.add_argument("--cold-after", help="days without modification or access after which data is cold "
+                                             "(default: 180, implies --age-report)", type=float)
+    parser.add_argument("--max-iops", help="maximum directory listings and stats per second", type=float)
+    parser.add_argument("--max-read-bytes-per-sec",
+                        help="maximum bytes of file contents read per second for classification, e.g. 10MiB")
+    parser.add_argument("--idle-io", help="run with the idle I/O scheduling class and the lowest CPU priority",
+                        action="store_true")
+    parser.add_argument("--checkpoint", help="periodically save the state of the scan to this file, so it can be "
+                                             "continued with --resume if interrupted")
+    parser.add_argument("--checkpoint-interval", help="seconds between two checkpoints (default: 300)",
+                        type=float, default=300.0)
+    parser.add_argument("--resume", help="continue the scan saved in this checkpoint file, with the options it was "
+                                         "started with")
+    parser.add_argument("--estimate", help="classify only a sample of files stratified by extension and size, and "
+                                           "report estimated category totals with 95%% confidence intervals",
+                        action="store_true")
+    parser.add_argument("--samples-per-stratum", help="files classified per stratum by --estimate (default: 20)",
+                        type=int, default=20)
+    parser.add_argument("--seed", help="seed of the random sample drawn by --estimate", type=int)
+    parser.add_argument("--classifier", help="classifier tried in the given order for files the previous ones "
+                                             "couldn't decide: magic, signature, extension or one provided by a "
+                                             "plugin (repeatable, default: magic then extension)",
+                        action="append")
+    parser.add_argument("--mapping", help="file of 'pattern category' rules tried before the classifiers, where a "
+                                          "pattern is an extension, a file name or a glob (repeatable)",
+                        action="append")
+    parser.add_argument("--listing-backend", help="how directories are listed: scandir (default), getdents (bulk "
+                                                  "getdents64 calls with a 1MiB buffer, Linux only) or auto "
+                                                  "(getdents on FUSE mounts of remote stores)",
+                        choices=("scandir", "getdents", "auto"), default="scandir")
+    parser.add_argument("--stat-workers", help="stat files in parallel per device: 'auto' picks the concurrency from "
+                                               "the kind of device (high for NVMe and network file systems, serial "
+                                               "for spinning disks), a number uses it for every device")
+    parser.add_argument("--read-order", help="order in which file contents are read for classification: scan "
+                                             "(default), inode or physical (extent offsets from FIEMAP, Linux), "
+                                             "which make reads of spinning disks mostly sequential",
+                        choices=("scan", "inode", "physical"), default="scan")
+    parser.add_argument("--memory-limit", help="approximate memory for the per-file listing, e.g. 512MiB. Beyond it, "
+                                               "file records are spilled to temporary files and streamed back for "
+                                               "the report")
+    parser.add_argument("--spill-dir", help="directory for the temporary files of --memory-limit "
+                                            "(default: the system temporary directory)")
+    parser.add_argument("--max-sniff-bytes", help="maximum bytes libmagic examines from the start of each file "
+                                                  "(default: 1MiB). Lower limits read less of large files, but may "
+                                                  "miss signatures further inside them")
+    parser.add_argument("--history", help="append per-category and per-directory totals of the scan to this "
+                                          "history file, read by `fsa trends`")
+    args = parser.parse_args(argv)
+
+    if args.resume:
+        if args.directory or args.threshold:
+            parser.error("--resume continues the saved scan, -d/--directory and -t/--threshold can't be given")
+    elif not (args.directory and args.threshold):
+        parser.error("the following arguments are required: -d/--directory, -t/--threshold")
 
     # check whether provided path exists, is a directory and is accessible
-    if not (os.path.exists(args.directory)
+    if not args.resume and not (os.path.exists(args.directory)
             and os.path.isdir(args.directory)
             and os.access(args.directory, os.R_OK | os.X_OK)):
         logger.error(f"Invalid directory path provided: {args.directory}")
@@ -30,25 +255,181 @@ def main() -> None:
 
     # attempt to convert provided threshold to bytes
     try:
-        threshold = convert_to_bytes(args.threshold)
+        threshold = convert_to_bytes(args.threshold) if args.threshold else None
+        shard = parse_shard(args.shard) if args.shard else None
+        max_archive_bytes = convert_to_bytes(args.max_archive_bytes)
+        max_read_bytes = convert_to_bytes(args.max_read_bytes_per_sec) if args.max_read_bytes_per_sec else None
+        memory_limit = convert_to_bytes(args.memory_limit) if args.memory_limit else None
+        max_sniff_bytes = convert_to_bytes(args.max_sniff_bytes) if args.max_sniff_bytes else None
     except ValueError as e:
-        logger.error(f"Error when parsing threshold value: {e}")
+        logger.error(f"Error when parsing arguments: {e}")
         sys.exit(1)
 
-    # initialise the file system analyzer
-    fsa = FileSystemAnalyzer(args.directory, threshold)
+    if shard and not args.output:
+        parser.error("--shard requires -o/--output")
+    if args.max_iops is not None and args.max_iops <= 0:
+        parser.error("--max-iops must be positive")
+    if max_read_bytes == 0:
+        parser.error("--max-read-bytes-per-sec must be positive")
+    if memory_limit == 0:
+        parser.error("--memory-limit must be positive")
+    if max_sniff_bytes == 0:
+        parser.error("--max-sniff-bytes must be positive")
+    if args.spill_dir and not os.path.isdir(args.spill_dir):
+        parser.error(f"--spill-dir is not a directory: {args.spill_dir}")
+    if args.estimate and (args.output or args.resume or args.history):
+        parser.error("--estimate can't be combined with -o/--output, --resume or --history")
+    if shard and args.history:
+        parser.error("--history records whole scans and can't be combined with --shard")
+    if args.samples_per_stratum < 2:
+        parser.error("--samples-per-stratum must be at least 2")
+    if args.stat_workers not in (None, "auto") and not (args.stat_workers.isdigit() and int(args.stat_workers) > 0):
+        parser.error("--stat-workers must be 'auto' or a positive number")
+
+    from file_system_analyzer.models.file_system_analyzer import FileSystemAnalyzer
+    from file_system_analyzer.models.getdents import check_listing_backend
+
+    auditor = None
+    if args.audit or args.setuid_allowlist:
+        from file_system_analyzer.models.audit import SecurityAuditor, load_allowlist
 
-    # categorize files and show a spinner while the process is running
-    console = Console()
-    with console.status("[bold]Categorizing files...[/bold]", spinner="dots"):
         try:
-            fsa.categorize_files()
-        except Exception as e:
-            logger.error(f"Error when categorizing files: {e}")
+            allowlist = load_allowlist(args.setuid_allowlist) if args.setuid_allowlist else None
+        except OSError as e:
+            logger.error(f"Error when loading setuid allowlist: {e}")
             sys.exit(1)
+        auditor = SecurityAuditor(allowlist)
+
+    age_histograms = None
+    if args.age_report or args.cold_after is not None:
+        from file_system_analyzer.models.aging import AgeHistograms
+
+        age_histograms = AgeHistograms(180 if args.cold_after is None else args.cold_after)
+
+    classifiers = None
+    if args.classifier or args.mapping or max_sniff_bytes:
+        from file_system_analyzer.models.classifiers import (MagicClassifier, MappingClassifier, default_classifiers,
+                                                             get_classifier)
+        from file_system_analyzer.models.utils import magic_available
+
+        try:
+            classifiers = [MappingClassifier(path) for path in args.mapping or []]
+        except (OSError, ValueError) as e:
+            logger.error(f"Error when loading mapping file: {e}")
+            sys.exit(1)
+        try:
+            classifiers += ([get_classifier(name) for name in args.classifier] if args.classifier
+                            else default_classifiers(magic_available()))
+        except ValueError as e:
+            parser.error(str(e))
+        if max_sniff_bytes:
+            # libmagic classifiers of the chain read at most max_sniff_bytes of each file
+            classifiers = [MagicClassifier(max_sniff_bytes) if isinstance(classifier, MagicClassifier) else classifier
+                           for classifier in classifiers]
+
+    throttle = None
+    if args.max_iops or max_read_bytes:
+        from file_system_analyzer.models.throttle import IOThrottle
+
+        throttle = IOThrottle(args.max_iops, max_read_bytes)
+
+    if args.idle_io:
+        from file_system_analyzer.models.throttle import set_idle_priority
+
+        set_idle_priority()
+
+    scheduler = None
+    if args.stat_workers:
+        from file_system_analyzer.models.devices import DeviceScheduler
+
+        scheduler = DeviceScheduler(None if args.stat_workers == "auto" else int(args.stat_workers))
+
+    if args.estimate:
+        estimate(args.directory, args.samples_per_stratum, args.seed, classifiers)
+        return
+
+    # initialise the file system analyzer, or restore it from a checkpoint together with its audit and age stages
+    if args.resume:
+        try:
+            fsa = FileSystemAnalyzer.resume(args.resume, throttle=throttle,
+                                            checkpoint_interval=args.checkpoint_interval, classifiers=classifiers,
+                                            memory_limit=memory_limit, spill_dir=args.spill_dir)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Error when resuming scan from {args.resume}: {e}")
+            sys.exit(1)
+        if args.checkpoint:
+            fsa.checkpoint_path = args.checkpoint
+        fsa.listing_backend = check_listing_backend(args.listing_backend, fsa.dir_path)
+        fsa.scheduler = scheduler
+        fsa.read_order = args.read_order
+        auditor, age_histograms = fsa.auditor, fsa.age_histograms
+    else:
+        fsa = FileSystemAnalyzer(args.directory, threshold, shard=shard, auditor=auditor,
+                                 inspect_archives=args.inspect_archives, max_archive_bytes=max_archive_bytes,
+                                 size_mode=args.size_mode, age_histograms=age_histograms, throttle=throttle,
+                                 checkpoint_path=args.checkpoint, checkpoint_interval=args.checkpoint_interval,
+                                 classifiers=classifiers, listing_backend=args.listing_backend,
+                                 scheduler=scheduler, read_order=args.read_order, memory_limit=memory_limit,
+                                 spill_dir=args.spill_dir)
+
+    # temporary files of spilled file lists are removed once the files are reported
+    try:
+        # sharded scans write a partial result which is combined later by `fsa merge`
+        if args.output:
+            from file_system_analyzer.models.sharding import PartialResult
+
+            try:
+                fsa.categorize_files()
+                PartialResult.from_analyzer(fsa, args.top_k).save(args.output)
+            except Exception as e:
+                logger.error(f"Error when categorizing files: {e}")
+                sys.exit(1)
+            if args.history:
+                append_history(args.history, fsa)
+            return
+
+        from rich.console import Console
+        from .utils import parse_output
+
+        # categorize files and show a spinner while the process is running
+        console = Console()
+        with console.status("[bold]Categorizing files...[/bold]", spinner="dots"):
+            try:
+                fsa.categorize_files()
+            except Exception as e:
+                logger.error(f"Error when categorizing files: {e}")
+                sys.exit(1)
+
+        if args.history:
+            append_history(args.history, fsa)
+
+        console.print("FILE SYSTEM ANALYSIS REPORT", style="bold italic", justify="center")
+        parse_output(console, fsa.files_by_category, fsa.large_files, fsa.unusual_permissions_files,
+                     fsa.permission_counts)
+
+        if fsa.errors:
+            from .utils import parse_errors
+
+            parse_errors(console, fsa.errors.counts, fsa.errors.samples)
+
+        if age_histograms is not None:
+            from .utils import parse_age_report
+
+            parse_age_report(console, age_histograms)
+
+        if auditor is not None:
+            from .utils import parse_audit
+
+            parse_audit(console, auditor.findings)
+
+        if args.stats:
+            from file_system_analyzer.models.utils import category_cache_stats
+            from .utils import parse_stats
+
+            parse_stats(console, category_cache_stats())
+    finally:
+        fsa.close()
 
-    console.print("FILE SYSTEM ANALYSIS REPORT", style="bold italic", justify="center")
-    parse_output(console, fsa.files_by_category, fsa.large_files, fsa.unusual_permissions_files)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,393 @@
+import argparse
+import asyncio
+import ipaddress
+import itertools
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .utils import convert_to_bytes
+from ..logging_config import logger
+
+# requests with a longer head are rejected
+MAX_REQUEST_HEAD_BYTES = 16 * 1024
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+                500: "Internal Server Error"}
+
+# upper bound of the number of large files a single request may ask for
+MAX_TOP_K = 10_000
+
+# scan parameters identifying a cached scan: root and size mode. Thresholds and numbers of large files only select
+# views of a scan, so requests which differ in them share it
+ScanKey = Tuple[str, str]
+
+
+def is_loopback(host: str) -> bool:
+    """
+    Checks whether a host name or address refers to the local machine only
+    :param host: str
+    :return: bool
+    """
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+@dataclass
+class CachedScan:
+    """
+    Threshold independent result of a finished scan
+
+    Attributes:
+        summary : PartialResult
+            Categories, unusual permissions and errors of the scan, without large files
+        files : List[Tuple[str, int]]
+            Every file of the scan as a (path, size) pair, sorted by size descending and ties by path
+        finished : float
+            Time the scan finished, as returned by the service clock
+
+    Methods:
+        view(threshold: int, top_k: int):
+            Partial result of the scan for a threshold and number of large files
+    """
+    summary: Any
+    files: List[Tuple[str, int]]
+    finished: float
+
+    def view(self, threshold: int, top_k: int) -> Dict:
+        """
+        Returns the partial result of the scan as in PartialResult.to_dict for a threshold and number of large files
+        :param threshold: int
+            Threshold which determines which files are large
+        :param top_k: int
+            Maximum number of large files in the result
+        :return: Dict
+        """
+        large_files = list(itertools.takewhile(lambda f: f[1] > threshold, self.files[:top_k]))
+        return replace(self.summary, threshold=threshold, top_k=top_k, large_files=large_files).to_dict()
+
+
+class ScanService:
+    """
+    Runs scans for many clients. A scan is identified by its root and size mode, requests for other thresholds or
+    numbers of large files are answered from the same scan. Concurrent requests for the same scan share a single
+    run, finished scans are cached and considered fresh for ttl seconds, and the least recently used ones are
+    evicted once the cache holds max_entries. Stale scans are kept until evicted, so clients which accept them get
+    the latest snapshot immediately while a refresh runs in the background.
+
+    Attributes:
+        ttl : float
+            Seconds for which a cached result is fresh
+        max_entries : int
+            Maximum number of cached scans
+        allowed_roots : List[str]
+            Directories under which scans are allowed, any directory if empty
+        counters : Dict[str, float]
+            Instrumentation counters exposed as metrics
+
+    Methods:
+        scan(root: str, threshold: int, size_mode: str, top_k: int, allow_stale: bool):
+            Returns the result of a scan, from the cache if possible
+        metrics():
+            Counters in the Prometheus text format
+    """
+    def __init__(self, ttl: float = 300.0, max_entries: int = 16, workers: int = 2,
+                 allowed_roots: Optional[List[str]] = None, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Constructs all necessary attributes for the ScanService object
+        :param ttl: float
+            Seconds for which a cached result is fresh
+        :param max_entries: int
+            Maximum number of cached scans
+        :param workers: int
+            Number of scans running at the same time
+        :param allowed_roots: Optional[List[str]]
+            Directories under which scans are allowed, any directory if empty
+        :param clock: Callable[[], float]
+            Monotonic clock in seconds
+        """
+        self.ttl: float = ttl
+        self.max_entries: int = max_entries
+        self.allowed_roots: List[str] = [os.path.realpath(root) for root in allowed_roots or []]
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="fsa-scan")
+        self._cache: "OrderedDict[ScanKey, CachedScan]" = OrderedDict()
+        self._inflight: Dict[ScanKey, asyncio.Future] = {}
+        self.counters: Dict[str, float] = {
+            "requests": 0,
+            "cache_hits": 0,
+            "stale_hits": 0,
+            "cache_misses": 0,
+            "deduplicated": 0,
+            "evictions": 0,
+            "scans": 0,
+            "scan_failures": 0,
+            "scan_seconds": 0.0,
+            "scan_errors": 0,
+        }
+
+    def check_root(self, root: str) -> str:
+        """
+        Resolves the root of a scan and checks whether it may be scanned
+        :param root: str
+        :return: str
+            Resolved root
+        """
+        root = os.path.realpath(root)
+        if not os.path.isdir(root):
+            raise ValueError(f"not a directory: {root}")
+        if self.allowed_roots and not any(os.path.commonpath([root, allowed]) == allowed
+                                          for allowed in self.allowed_roots):
+            raise PermissionError(f"scans of {root} are not allowed")
+        return root
+
+    async def scan(self, root: str, threshold: int, size_mode: str = "apparent", top_k: int = 100,
+                   allow_stale: bool = False) -> Tuple[Dict, float]:
+        """
+        Returns the result of a scan, from the cache if possible
+        :param root: str
+            Resolved directory to scan
+        :param threshold: int
+            Threshold which determines which files are large
+        :param size_mode: str
+            'apparent' or 'allocated'
+        :param top_k: int
+            Maximum number of large files in the result
+        :param allow_stale: bool
+            Whether a stale result may be returned while it is refreshed in the background
+        :return: Tuple[Dict, float]
+            Partial result of the scan and its age in seconds
+        """
+        self.counters["requests"] += 1
+        key = (root, size_mode)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            age = self._clock() - cached.finished
+            if age < self.ttl:
+                self.counters["cache_hits"] += 1
+                return cached.view(threshold, top_k), age
+            if allow_stale:
+                self.counters["stale_hits"] += 1
+                self._start(key)
+                return cached.view(threshold, top_k), age
+
+        self.counters["cache_misses"] += 1
+        if key in self._inflight:
+            self.counters["deduplicated"] += 1
+        cached = await asyncio.shield(self._start(key))
+        return cached.view(threshold, top_k), self._clock() - cached.finished
+
+    def _start(self, key: ScanKey) -> asyncio.Future:
+        # a scan of the same key which is already running is shared instead of started again
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._run(key))
+            # failures of background refreshes nobody awaits are already counted
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._inflight[key] = future
+        return future
+
+    async def _run(self, key: ScanKey) -> CachedScan:
+        started = self._clock()
+        self.counters["scans"] += 1
+        try:
+            summary, files, errors = await asyncio.get_running_loop().run_in_executor(self._executor, _scan, *key)
+        except Exception:
+            self.counters["scan_failures"] += 1
+            raise
+        finally:
+            del self._inflight[key]
+            self.counters["scan_seconds"] += self._clock() - started
+
+        self.counters["scan_errors"] += errors
+        cached = CachedScan(summary, files, self._clock())
+        self._cache[key] = cached
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+            self.counters["evictions"] += 1
+        return cached
+
+    def metrics(self) -> str:
+        """
+        Returns the counters, the cache size and hit statistics of the category lookups in the Prometheus text format
+        :return: str
+        """
+        from file_system_analyzer.models.utils import category_cache_stats
+
+        lines = []
+        for name, value in self.counters.items():
+            lines.append(f"fsa_{name}_total {value:g}")
+        lines.append(f"fsa_cached_results {len(self._cache)}")
+        lines.append(f"fsa_inflight_scans {len(self._inflight)}")
+        for cache, stats in category_cache_stats().items():
+            for stat in ("hits", "misses", "size"):
+                lines.append(f'fsa_category_cache_{stat}{{cache="{cache}"}} {stats[stat]}')
+        return "\n".join(lines) + "\n"
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _scan(root: str, size_mode: str) -> Tuple[Any, List[Tuple[str, int]], int]:
+    # runs in a worker thread, the summary keeps no large files since they depend on the threshold of a request
+    from file_system_analyzer.models.file_system_analyzer import FileSystemAnalyzer
+    from file_system_analyzer.models.sharding import PartialResult
+
+    analyzer = FileSystemAnalyzer(root, 0, size_mode=size_mode)
+    analyzer.categorize_files()
+    files = [(str(f.path), f.measured_size(size_mode))
+             for category in analyzer.files_by_category.values() for f in category.files]
+    files.sort(key=lambda f: (-f[1], f[0]))
+    return PartialResult.from_analyzer(analyzer, 0), files, analyzer.errors.total
+
+
+async def handle_request(service: ScanService, method: str, target: str,
+                         host: Optional[str] = "localhost") -> Tuple[int, str, str]:
+    """
+    Routes a request to the service. Unless scans are restricted to allowed roots, they are only answered for
+    requests addressed to the local machine, so web pages can't reach the service through a rebound DNS name
+    :param service: ScanService
+    :param method: str
+        HTTP method
+    :param target: str
+        Request target, e.g. /scan?root=/data&threshold=10MiB
+    :param host: Optional[str]
+        Host name of the Host header without the port, None if the request has none
+    :return: Tuple[int, str, str]
+        Status code, content type and body
+    """
+    url = urlsplit(target)
+    if url.path not in ("/scan", "/metrics", "/health"):
+        return 404, "application/json", json.dumps({"error": f"unknown path: {url.path}"})
+    if method != "GET":
+        return 405, "application/json", json.dumps({"error": f"method not allowed: {method}"})
+    if url.path == "/health":
+        return 200, "application/json", json.dumps({"status": "ok"})
+    if url.path == "/metrics":
+        return 200, "text/plain; version=0.0.4", service.metrics()
+
+    if not service.allowed_roots and not (host and is_loopback(host)):
+        return 403, "application/json", json.dumps({"error": "scans are only answered for localhost without --root"})
+
+    query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+    try:
+        root = service.check_root(query["root"])
+        threshold = convert_to_bytes(query.get("threshold", "10MiB"))
+        size_mode = query.get("size_mode", "apparent")
+        if size_mode not in ("apparent", "allocated"):
+            raise ValueError(f"invalid size mode: {size_mode}")
+        top_k = int(query.get("top_k", 100))
+        if not 0 <= top_k <= MAX_TOP_K:
+            raise ValueError(f"top_k must be between 0 and {MAX_TOP_K}")
+        allow_stale = query.get("stale", "0") in ("1", "true")
+    except KeyError:
+        return 400, "application/json", json.dumps({"error": "missing parameter: root"})
+    except PermissionError as e:
+        return 403, "application/json", json.dumps({"error": str(e)})
+    except ValueError as e:
+        return 400, "application/json", json.dumps({"error": str(e)})
+
+    try:
+        result, age = await service.scan(root, threshold, size_mode, top_k, allow_stale)
+    except Exception as e:
+        logger.error("Error when scanning %s: %s", root, e)
+        return 500, "application/json", json.dumps({"error": str(e)})
+    return 200, "application/json", json.dumps({"age": round(age, 3), "stale": age >= service.ttl,
+                                                "result": result})
+
+
+async def _handle_connection(service: ScanService, reader: asyncio.StreamReader,
+                             writer: asyncio.StreamWriter) -> None:
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        method, target, _ = request_line.split(" ", 2)
+        headers = dict(line.split(":", 1) for line in header_lines if ":" in line)
+        host = next((value.strip() for name, value in headers.items() if name.strip().lower() == "host"), None)
+        status, content_type, body = await handle_request(service, method, target,
+                                                          host and urlsplit(f"//{host}").hostname)
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+        status, content_type, body = 400, "application/json", json.dumps({"error": "malformed request"})
+    except ConnectionError:
+        writer.close()
+        return
+
+    payload = body.encode("utf-8")
+    writer.write(f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                 f"Content-Type: {content_type}\r\n"
+                 f"Content-Length: {len(payload)}\r\n"
+                 f"Connection: close\r\n\r\n".encode("latin-1") + payload)
+    try:
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(service: ScanService, host: str = "127.0.0.1", port: int = 8000) -> asyncio.Server:
+    """
+    Starts the HTTP server of the scan service
+    :param service: ScanService
+    :param host: str
+        Address to bind, localhost by default
+    :param port: int
+        Port to bind, 0 for any free port
+    :return: asyncio.Server
+    """
+    return await asyncio.start_server(lambda r, w: _handle_connection(service, r, w), host, port,
+                                      limit=MAX_REQUEST_HEAD_BYTES)
+
+
+def serve(argv: List[str]) -> None:
+    """
+    Entry for the `fsa serve` subcommand. Runs a local HTTP service which answers scan requests from a cache.
+    :param argv: List[str]
+        Arguments following `serve`
+    :return: None
+    """
+    parser = argparse.ArgumentParser(prog="fsa serve", epilog="GET /scan?root=DIR&threshold=10MiB[&size_mode=allocated]"
+                                                              "[&top_k=100][&stale=1], GET /metrics, GET /health")
+    parser.add_argument("--host", help="address to bind (default: 127.0.0.1)", default="127.0.0.1")
+    parser.add_argument("--port", help="port to bind (default: 8000)", type=int, default=8000)
+    parser.add_argument("--ttl", help="seconds for which a cached result is fresh (default: 300)",
+                        type=float, default=300.0)
+    parser.add_argument("--cache-size", help="maximum number of cached scans (default: 16)", type=int, default=16)
+    parser.add_argument("--workers", help="number of scans running at the same time (default: 2)",
+                        type=int, default=2)
+    parser.add_argument("--root", help="only allow scans under this directory (repeatable), required unless "
+                                       "--host is a loopback address", action="append")
+    args = parser.parse_args(argv)
+    if not args.root and not is_loopback(args.host):
+        parser.error(f"--root is required when binding to {args.host}")
+
+    service = ScanService(args.ttl, args.cache_size, args.workers, args.root)
+
+    async def run() -> None:
+        server = await start_server(service, args.host, args.port)
+        address = server.sockets[0].getsockname()
+        print(f"Serving on http://{address[0]}:{address[1]}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        logger.error("Error when starting the server: %s", e)
+        sys.exit(1)
+    finally:
+        service.close()
@@ -1,7 +1,5 @@
-from rich.table import Table
-from rich.panel import Panel
 import re
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
 from ..logging_config import logger
 
@@ -16,6 +14,9 @@ SIZE_MULTIPLIERS = {
     "PiB": 1024 ** 5
 }
 
+# maximum number of rows of a single table of files in the report
+REPORT_TABLE_ROWS = 10_000
+
 
 def validate_permissions(permissions: Dict) -> bool:
     """
@@ -44,12 +45,14 @@ def validate_permissions(permissions: Dict) -> bool:
     return True
 
 
-def create_table() -> Table:
+def create_table() -> "Table":
     """
     Creates a rich.table Table with the predefined columns 'Size', 'File path' and 'Permissions'
     :return: Table
         rich Table object
     """
+    from rich.table import Table
+
     table = Table()
     table.add_column("Size", justify="left", no_wrap=True, header_style="bold blue")
     table.add_column("File path", justify="left", header_style="bold blue")
@@ -92,7 +95,8 @@ def parse_permissions(permissions: Dict, is_unusual: bool) -> str:
         raise
 
 
-def parse_output(console, output: Dict, large_files: Dict, unusual_permissions_files: Dict) -> None:
+def parse_output(console, output: Dict, large_files: Dict, unusual_permissions_files: Dict,
+                 permission_counts: Optional[Dict[str, int]] = None) -> None:
     """
     Parse output (files grouped by category), large files and files with unusual permissions
     :param console: rich.console Console object
@@ -103,8 +107,12 @@ def parse_output(console, output: Dict, large_files: Dict, unusual_permissions_f
         Dictionary of large files with their paths and sizes
     :param unusual_permissions_files: Dict[os.PathLike, List[str]]
         Dictionary of files with unusual permissions with their paths and permission names
+    :param permission_counts: Optional[Dict[str, int]]
+        Number of files having each unusual permission
     :return: None
     """
+    from rich.panel import Panel
+
     try:
         if not isinstance(output, dict):
             raise ValueError("output must be a dictionary")
@@ -113,25 +121,39 @@ def parse_output(console, output: Dict, large_files: Dict, unusual_permissions_f
             if not hasattr(files, 'files') or not hasattr(files, 'converted_size'):
                 raise ValueError("files must have 'files' and 'converted_size' attributes")
 
-            if not files.files:
+            archived_count = getattr(files, 'archived_count', 0)
+            if not files.files and not archived_count:
                 continue
 
             # craft a title for the current category along with its size and display a rich Panel
             category_text = f"{file_type.capitalize()} - {files.converted_size}"
+            if getattr(files, 'allocated_size', 0):
+                category_text += f" ({files.converted_allocated_size} allocated)"
+            if archived_count:
+                category_text += f" (+ {files.converted_archived_size} in {archived_count} archive members)"
             console.print(Panel(category_text, expand=True), style="medium_turquoise")
+            if not files.files:
+                continue
             table = create_table()
 
-            # add rows to the current category table
-            for file in files.files:
+            # add rows to the current category table, long listings are printed in several tables so that rows of
+            # spilled file lists are streamed instead of being held by one table
+            for row, file in enumerate(files.files, start=1):
                 if not hasattr(file, 'converted_size') or not hasattr(file, 'path') or not hasattr(file, 'processed_permissions'):
                     raise ValueError("file must have 'converted_size', 'path' and 'processed_permissions' attributes")
 
                 size_text = f"[dim]{file.converted_size}[/dim]"
+                if getattr(file, 'is_sparse', False):
+                    size_text += f" [dim]({file.converted_allocated_size} allocated, sparse)[/dim]"
                 path_text = f"[light_salmon3]{file.path} (large file)[/light_salmon3]" if file.path in large_files else file.path
                 permissions = parse_permissions(file.processed_permissions, file.path in unusual_permissions_files)
                 table.add_row(size_text, path_text, permissions)
+                if row % REPORT_TABLE_ROWS == 0:
+                    console.print(table)
+                    table = create_table()
 
-            console.print(table)
+            if table.row_count:
+                console.print(table)
 
         # parse all large files
         if large_files:
@@ -144,6 +166,9 @@ def parse_output(console, output: Dict, large_files: Dict, unusual_permissions_f
             console.print(Panel("Files with unusual permissions", expand=True), style="red")
             for i, (k, v) in enumerate(unusual_permissions_files.items(), start=1):
                 console.print(f"{i}. {k}: [red]{', '.join(v)}[/red]", highlight=False)
+            if permission_counts:
+                counts_text = ", ".join(f"{name}: {count}" for name, count in permission_counts.items())
+                console.print(f"[bold]Total:[/bold] {counts_text}", highlight=False)
     except ValueError as ve:
         logger.error(f"Value error when parsing output: {ve}")
         raise
@@ -152,6 +177,293 @@ def parse_output(console, output: Dict, large_files: Dict, unusual_permissions_f
         raise
 
 
+def parse_partial_result(console, result) -> None:
+    """
+    Parse a merged partial result: category totals, largest files and files with unusual permissions
+    :param console: rich.console Console object
+        Console to which parsed output is written
+    :param result: PartialResult
+        Result merged from one or more shards
+    :return: None
+    """
+    from rich.panel import Panel
+    from rich.table import Table
+    from ..models.utils import convert_size
+
+    try:
+        if not result.complete:
+            console.print(f"[red]Incomplete result: {len(result.shards)} of {result.shard_count} shards merged[/red]")
+
+        # category totals, largest categories first
+        table = Table()
+        table.add_column("Category", justify="left", header_style="bold blue")
+        table.add_column("Files", justify="right", header_style="bold blue")
+        table.add_column("Size", justify="right", header_style="bold blue")
+        table.add_column("Allocated", justify="right", header_style="bold blue")
+        # members of archives are only shown by scans which inspected archives
+        archived = any(totals.archived_count for totals in result.categories.values())
+        if archived:
+            table.add_column("Archive members", justify="right", header_style="bold blue")
+        for category, totals in sorted(result.categories.items(), key=lambda c: -c[1].size):
+            row = [category.capitalize(), str(totals.count), convert_size(totals.size),
+                   convert_size(totals.allocated_size)]
+            if archived:
+                row.append(f"{totals.archived_count} ({convert_size(totals.archived_size)})")
+            table.add_row(*row)
+        console.print(Panel("Categories", expand=True), style="medium_turquoise")
+        console.print(table)
+
+        # parse the largest files
+        if result.large_files:
+            console.print(Panel(f"Large files (top {result.top_k})", expand=True), style="light_salmon3")
+            for i, (path, size) in enumerate(result.large_files, start=1):
+                console.print(f"{i}. {path}: [light_salmon3]{convert_size(size)}[/light_salmon3]", highlight=False)
+
+        # parse all files with unusual permissions
+        if result.unusual_permissions:
+            console.print(Panel("Files with unusual permissions", expand=True), style="red")
+            for i, (k, v) in enumerate(sorted(result.unusual_permissions.items()), start=1):
+                console.print(f"{i}. {k}: [red]{', '.join(v)}[/red]", highlight=False)
+
+        if result.errors:
+            parse_errors(console, result.errors)
+    except Exception as e:
+        logger.error(f"Unexpected error when parsing partial result: {e}")
+        raise
+
+
+# colors of audit findings by severity
+SEVERITY_STYLES = {
+    "critical": "bold red",
+    "high": "red",
+    "medium": "dark_orange",
+    "low": "yellow",
+}
+
+
+def parse_audit(console, findings: List) -> None:
+    """
+    Parse findings of the security audit, ranked by severity
+    :param console: rich.console Console object
+        Console to which parsed output is written
+    :param findings: List[AuditFinding]
+        Findings sorted from the most to the least severe
+    :return: None
+    """
+    from rich.panel import Panel
+    from rich.table import Table
+
+    console.print(Panel(f"Security audit ({len(findings)} findings)", expand=True), style="red")
+    if not findings:
+        return
+
+    table = Table()
+    for column in ("Severity", "Rule", "File path", "Detail"):
+        table.add_column(column, justify="left", header_style="bold blue")
+    for finding in findings:
+        style = SEVERITY_STYLES.get(finding.severity, "")
+        table.add_row(f"[{style}]{finding.severity}[/{style}]", finding.rule, finding.path, finding.detail)
+    console.print(table)
+
+
+def parse_estimate(console, estimate) -> None:
+    """
+    Parse estimated category totals with their 95% confidence intervals
+    :param console: rich.console Console object
+        Console to which parsed output is written
+    :param estimate: Estimate
+        Result of a sampled scan
+    :return: None
+    """
+    from rich.panel import Panel
+    from rich.table import Table
+    from ..models.utils import convert_size
+
+    console.print(f"Classified {estimate.sampled} of {estimate.files} files in {estimate.strata} strata "
+                  f"({convert_size(estimate.size)} in total)", highlight=False)
+    if estimate.failed:
+        console.print(f"{estimate.failed} sampled files couldn't be classified and were left out of the sample",
+                      highlight=False)
+    if estimate.unclassified_files:
+        console.print(f"{estimate.unclassified_files} files ({convert_size(estimate.unclassified_size)}) are in strata "
+                      f"without any classified file and aren't attributed to a category", highlight=False)
+    table = Table()
+    table.add_column("Category", justify="left", header_style="bold blue")
+    table.add_column("Size", justify="right", header_style="bold blue")
+    table.add_column("95% CI", justify="right", header_style="bold blue")
+    table.add_column("Share", justify="right", header_style="bold blue")
+    table.add_column("Files", justify="right", header_style="bold blue")
+    for category, totals in sorted(estimate.categories.items(), key=lambda c: -c[1].size):
+        low = convert_size(max(0, round(totals.size - totals.size_margin)))
+        high = convert_size(min(estimate.size, round(totals.size + totals.size_margin)))
+        share = f"{totals.size / estimate.size:.1%}" if estimate.size else "-"
+        table.add_row(category.capitalize(), convert_size(round(totals.size)), f"{low} - {high}", share,
+                      f"{totals.count:.0f} ± {totals.count_margin:.0f}")
+    console.print(Panel("Estimated categories", expand=True), style="medium_turquoise")
+    console.print(table)
+
+
+def parse_errors(console, counts, samples=()) -> None:
+    """
+    Parse counts of entries which failed during the scan and examples of their paths
+    :param console: rich.console Console object
+        Console to which parsed output is written
+    :param counts: Dict[str, int]
+        Map of 'stage: ExceptionType' keys to the number of failures
+    :param samples: Iterable[Tuple[str, str, str]]
+        Examples of failures as (stage, path, message) triples
+    :return: None
+    """
+    from rich.markup import escape
+    from rich.panel import Panel
+
+    console.print(Panel(f"Errors ({sum(counts.values())} entries skipped or classified by extension)",
+                        expand=True), style="dark_orange")
+    for key, count in sorted(counts.items(), key=lambda c: -c[1]):
+        console.print(f"{key}: [dark_orange]{count}[/dark_orange]", highlight=False)
+    for i, (stage, path, message) in enumerate(samples, start=1):
+        # paths and messages may contain brackets, which would be read as markup
+        console.print(f"{i}. {escape(f'[{stage}] {path}')}: [dark_orange]{escape(message)}[/dark_orange]",
+                      highlight=False)
+
+
+def parse_age_report(console, histograms, directories: int = 10) -> None:
+    """
+    Parse per-category histograms of bytes by age, cold bytes per category and directories with most cold bytes
+    :param console: rich.console Console object
+        Console to which parsed output is written
+    :param histograms: AgeHistograms
+        Histograms aggregated during the scan
+    :param directories: int
+        Number of directories with most cold bytes to show
+    :return: None
+    """
+    from rich.panel import Panel
+    from rich.table import Table
+    from ..models.aging import AGE_BUCKET_LABELS
+    from ..models.utils import convert_size
+
+    for title, buckets in (("modification", histograms.modified), ("access", histograms.accessed)):
+        table = Table()
+        table.add_column("Category", justify="left", header_style="bold blue")
+        for label in AGE_BUCKET_LABELS:
+            table.add_column(label, justify="right", header_style="bold blue")
+        for category, sizes in sorted(buckets.items()):
+            table.add_row(category.capitalize(), *(convert_size(size) for size in sizes))
+        console.print(Panel(f"Bytes by {title} age", expand=True), style="steel_blue")
+        console.print(table)
+
+    cold_after = f"{histograms.cold_after_days:g}"
+    console.print(Panel(f"Cold data (untouched for {cold_after} days)", expand=True), style="steel_blue")
+    table = Table()
+    table.add_column("Category", justify="left", header_style="bold blue")
+    table.add_column("Cold", justify="right", header_style="bold blue")
+    table.add_column("Share", justify="right", header_style="bold blue")
+    for category, cold in sorted(histograms.cold_bytes.items(), key=lambda c: -c[1]):
+        total = sum(histograms.modified[category])
+        table.add_row(category.capitalize(), convert_size(cold), f"{cold / total:.1%}" if total else "-")
+    console.print(table)
+
+    for i, (directory, cold) in enumerate(histograms.top_cold_directories(directories), start=1):
+        console.print(f"{i}. {directory}: [steel_blue]{convert_size(cold)}[/steel_blue]", highlight=False)
+
+
+def signed_size(change: Optional[float]) -> str:
+    """
+    Formats a change of size with its sign, e.g. '+1.5 GiB' or '-20 MiB'
+    :param change: Optional[float]
+        Change in bytes
+    :return: str
+        Formatted change, '-' if it is unknown
+    """
+    from ..models.utils import convert_size
+
+    if change is None:
+        return "-"
+    return f"{'-' if change < 0 else '+'}{convert_size(abs(round(change)))}"
+
+
+def parse_trends(console, report, directories: int = 10) -> None:
+    """
+    Parse growth of all files, of every category and of the largest top-level directories across the scan history
+    :param console: rich.console Console object
+        Console to which parsed output is written
+    :param report: TrendReport
+        Trends computed from the history
+    :param directories: int
+        Number of the largest top-level directories shown
+    :return: None
+    """
+    import datetime
+    from rich.panel import Panel
+    from rich.table import Table
+    from ..models.utils import convert_size
+
+    def date(timestamp):
+        return datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+
+    console.print(f"{report.snapshots} scans of {report.dir_path} from {date(report.first_time)} to "
+                  f"{date(report.last_time)}, rates fitted over the last {report.window_days:g} days",
+                  highlight=False)
+    horizon = f"In {report.horizon_days:g} days"
+    for title, name, trends in (("Categories", "Category", [report.total] + report.categories),
+                                ("Top-level directories", "Directory", report.directories[:directories])):
+        table = Table()
+        table.add_column(name, justify="left", header_style="bold blue")
+        for column in ("Files", "Size", "Last change", "Per day", horizon):
+            table.add_column(column, justify="right", header_style="bold blue")
+        for trend in trends:
+            projected = "-" if trend.projected_size is None else convert_size(trend.projected_size)
+            table.add_row(trend.name.capitalize() if name == "Category" else trend.name, str(trend.count),
+                          convert_size(trend.size), signed_size(trend.change), signed_size(trend.rate), projected)
+        console.print(Panel(title, expand=True), style="medium_turquoise")
+        console.print(table)
+
+
+def parse_stats(console, stats: Dict[str, Dict]) -> None:
+    """
+    Parse statistics of the memoized category lookups
+    :param console: rich.console Console object
+        Console to which parsed output is written
+    :param stats: Dict[str, Dict]
+        Map of cache name to its hits, misses, size, maximum size and hit rate
+    :return: None
+    """
+    from rich.panel import Panel
+    from rich.table import Table
+
+    table = Table()
+    for column in ("Cache", "Hits", "Misses", "Entries", "Hit rate"):
+        table.add_column(column, justify="left" if column == "Cache" else "right", header_style="bold blue")
+    for name, cache in stats.items():
+        table.add_row(name, str(cache["hits"]), str(cache["misses"]), f"{cache['size']}/{cache['maxsize']}",
+                      f"{cache['hit_rate']:.1%}")
+    console.print(Panel("Statistics", expand=True), style="grey50")
+    console.print(table)
+
+
+def parse_shard(shard_str: str) -> Tuple[int, int]:
+    """
+    Parse shard specification of the form i/N
+    :param shard_str: str
+        Shard specification, e.g. 2/8, with 1 <= i <= N
+    :return: Tuple[int, int]
+        Pair of shard index and shard count
+    """
+    try:
+        shard_match = re.match(r'^(\d+)/(\d+)$', shard_str)
+        if not shard_match:
+            raise ValueError(f"Invalid shard format: {shard_str}")
+
+        index, count = (int(g) for g in shard_match.groups())
+        if not 0 < index <= count:
+            raise ValueError(f"Shard index must be between 1 and {count}: {shard_str}")
+        return index, count
+    except ValueError as ve:
+        logger.error(f"Value error parsing shard: {ve}")
+        raise
+
+
 def convert_to_bytes(size_str: str) -> int:
     """
     Convert string size with units to size integer size in bytes
@@ -0,0 +1,114 @@
+import bisect
+import heapq
+import time
+from typing import Dict, List, Optional, Tuple
+
+# upper bounds of age buckets in days, the last bucket holds everything older
+AGE_BUCKET_DAYS = (1, 7, 30, 90, 180, 365, 730)
+AGE_BUCKET_LABELS = ("<1d", "1-7d", "7-30d", "30-90d", "90-180d", "180d-1y", "1-2y", ">2y")
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+class AgeHistograms:
+    """
+    Per-category histograms of bytes by age, aggregated with fixed-size counters so nothing is retained per file.
+    A file is cold if it was neither modified nor accessed for cold_after_days.
+
+    Attributes:
+        now : float
+            Reference time ages are computed against, as a Unix timestamp
+        cold_after_days : float
+            Age after which untouched files are considered cold
+        modified : Dict[str, List[int]]
+            Map of categories to bytes per modification age bucket
+        accessed : Dict[str, List[int]]
+            Map of categories to bytes per access age bucket
+        cold_bytes : Dict[str, int]
+            Map of categories to bytes of cold files
+        cold_directories : Dict[str, int]
+            Map of directories to bytes of cold files directly inside them
+
+    Methods:
+        add(category: str, directory: str, size: int, mtime: float, atime: float):
+            Records a single file
+        top_cold_directories(count: int):
+            Directories holding the most cold bytes
+    """
+    def __init__(self, cold_after_days: float = 180, now: Optional[float] = None) -> None:
+        """
+        Constructs all necessary attributes for the AgeHistograms object
+        :param cold_after_days: float
+            Age after which untouched files are considered cold
+        :param now: Optional[float]
+            Reference time, defaults to the current time
+        """
+        self.now: float = time.time() if now is None else now
+        self.cold_after_days: float = cold_after_days
+        self.modified: Dict[str, List[int]] = {}
+        self.accessed: Dict[str, List[int]] = {}
+        self.cold_bytes: Dict[str, int] = {}
+        self.cold_directories: Dict[str, int] = {}
+        # bucket boundaries as timestamps, in ascending order, so a timestamp is bucketed with a single bisect
+        self._edges = [self.now - days * SECONDS_PER_DAY for days in reversed(AGE_BUCKET_DAYS)]
+        self._cold_before = self.now - cold_after_days * SECONDS_PER_DAY
+
+    def _bucket(self, timestamp: float) -> int:
+        # newer timestamps land in lower buckets, timestamps in the future count as the newest
+        return len(self._edges) - bisect.bisect_right(self._edges, timestamp)
+
+    def add(self, category: str, directory: str, size: int, mtime: float, atime: float) -> None:
+        """
+        Records a single file
+        :param category: str
+            Category of the file
+        :param directory: str
+            Directory containing the file
+        :param size: int
+            Size of the file in bytes
+        :param mtime: float
+            Modification time as in stat.st_mtime
+        :param atime: float
+            Access time as in stat.st_atime
+        :return: None
+        """
+        modified = self.modified.get(category)
+        if modified is None:
+            modified = self.modified[category] = [0] * len(AGE_BUCKET_LABELS)
+            self.accessed[category] = [0] * len(AGE_BUCKET_LABELS)
+            self.cold_bytes[category] = 0
+        modified[self._bucket(mtime)] += size
+        self.accessed[category][self._bucket(atime)] += size
+
+        if max(mtime, atime) < self._cold_before:
+            self.cold_bytes[category] += size
+            self.cold_directories[directory] = self.cold_directories.get(directory, 0) + size
+
+    def top_cold_directories(self, count: int = 10) -> List[Tuple[str, int]]:
+        """
+        Returns directories holding the most cold bytes
+        :param count: int
+            Maximum number of directories returned
+        :return: List[Tuple[str, int]]
+            Pairs of directory and cold bytes, sorted by cold bytes descending
+        """
+        return heapq.nlargest(count, self.cold_directories.items(), key=lambda d: (d[1], d[0]))
+
+    def to_dict(self) -> Dict:
+        return {
+            "now": self.now,
+            "cold_after_days": self.cold_after_days,
+            "modified": self.modified,
+            "accessed": self.accessed,
+            "cold_bytes": self.cold_bytes,
+            "cold_directories": self.cold_directories,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "AgeHistograms":
+        histograms = cls(data["cold_after_days"], data["now"])
+        histograms.modified = {k: list(v) for k, v in data["modified"].items()}
+        histograms.accessed = {k: list(v) for k, v in data["accessed"].items()}
+        histograms.cold_bytes = dict(data["cold_bytes"])
+        histograms.cold_directories = dict(data["cold_directories"])
+        return histograms
@@ -0,0 +1,243 @@
+import io
+import os
+import tarfile
+import zipfile
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .utils import category_from_description, category_from_extension, category_from_mime, get_magic
+
+# default upper bound of bytes read from a single archive
+DEFAULT_MAX_ARCHIVE_BYTES = 16 * 1024 ** 2
+
+# number of leading bytes of a member used to classify it by its signature
+MEMBER_HEADER_BYTES = 2048
+
+# signatures used to detect the archive format
+ZIP_SIGNATURES = (b"PK\x03\x04", b"PK\x05\x06")
+GZIP_SIGNATURE = b"\x1f\x8b"
+# tarfile modes by signature of the compressed stream, given explicitly since probing with "r:*" reads
+# several blocks per compression method
+TAR_COMPRESSIONS = {GZIP_SIGNATURE: "gz", b"BZh": "bz2", b"\xfd7zXZ\x00": "xz"}
+TAR_MAGIC = b"ustar"
+TAR_MAGIC_OFFSET = 257
+
+# errors of archives which can't be read, e.g. corrupt ones. Reading a member also fails for encrypted zip members
+# (RuntimeError) and unsupported compression methods (NotImplementedError)
+ARCHIVE_ERRORS = (OSError, EOFError, RuntimeError, NotImplementedError, zipfile.BadZipFile, tarfile.TarError,
+                  zlib.error)
+
+
+class ArchiveBudgetExceeded(Exception):
+    """
+    Raised when reading an archive would exceed its byte budget
+    """
+
+
+class BoundedReader(io.RawIOBase):
+    """
+    Read-only file wrapper which counts bytes read and raises ArchiveBudgetExceeded once the budget is spent.
+    Seeking is free, so formats which can skip member data (zip, uncompressed tar) only pay for headers.
+
+    Attributes:
+        bytes_read : int
+            Bytes read so far
+        max_bytes : int
+            Budget of bytes which may be read
+        _throttle : Optional[IOThrottle]
+            Rate limiter charged for every read, if provided
+    """
+    def __init__(self, raw, max_bytes: int, throttle=None) -> None:
+        super().__init__()
+        self._raw = raw
+        self.max_bytes = max_bytes
+        self._throttle = throttle
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._raw.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._raw.tell()
+
+    def readinto(self, buffer) -> int:
+        # a short read would look like a truncated archive to the parsers, so requests over budget fail instead
+        if self.bytes_read + len(buffer) > self.max_bytes:
+            raise ArchiveBudgetExceeded(f"more than {self.max_bytes} bytes needed")
+        if self._throttle is not None:
+            self._throttle.read(len(buffer))
+        count = self._raw.readinto(buffer)
+        self.bytes_read += count
+        return count
+
+
+@dataclass
+class ArchiveSummary:
+    """
+    Members of an archive aggregated by category
+
+    Attributes:
+        path : str
+            Path to the archive
+        members : int
+            Number of classified members
+        sizes : Dict[str, int]
+            Map of categories to the uncompressed size of their members
+        counts : Dict[str, int]
+            Map of categories to the number of their members
+        truncated : bool
+            True if the byte budget was exhausted before all members were listed
+        unreadable : int
+            Number of members whose contents couldn't be read (e.g. encrypted ones), classified by extension only
+        errors : List[Tuple[str, Exception]]
+            Names of the unreadable members with their errors, not part of the serialized summary
+    """
+    path: str
+    members: int = 0
+    sizes: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    counts: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    truncated: bool = False
+    unreadable: int = 0
+    errors: List[Tuple[str, Exception]] = field(default_factory=list, compare=False, repr=False)
+
+    def add(self, category: str, size: int) -> None:
+        self.members += 1
+        self.sizes[category] += size
+        self.counts[category] += 1
+
+    def to_dict(self) -> Dict:
+        return {
+            "path": self.path,
+            "members": self.members,
+            "sizes": dict(self.sizes),
+            "counts": dict(self.counts),
+            "truncated": self.truncated,
+            "unreadable": self.unreadable,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ArchiveSummary":
+        return cls(data["path"], data["members"], defaultdict(int, data["sizes"]), defaultdict(int, data["counts"]),
+                   data["truncated"], data["unreadable"])
+
+    def read_member(self, name: str, read: Callable[[], bytes]) -> bytes:
+        """
+        Reads the leading bytes of a member. A member which can't be read doesn't fail the whole archive, it is
+        counted as unreadable and its header is empty
+        :param name: str
+            Name of the member
+        :param read: Callable[[], bytes]
+            Returns the leading bytes of the member
+        :return: bytes
+        """
+        try:
+            return read()
+        except ARCHIVE_ERRORS as e:
+            self.unreadable += 1
+            self.errors.append((name, e))
+            return b""
+
+
+def classify_member(name: str, read_header: Optional[Callable[[], bytes]]) -> str:
+    """
+    Classifies an archive member with the same logic as files on disk: by extension first, and by signature of its
+    leading bytes if the extension is unknown and libmagic is available
+    :param name: str
+        Name of the member
+    :param read_header: Optional[Callable[[], bytes]]
+        Returns the leading bytes of the member, None if content classification is disabled
+    :return: str
+        Inferred category
+    """
+    category = category_from_extension(os.path.splitext(name)[1])
+    if category != "other" or read_header is None:
+        return category
+
+    header = read_header()
+    if not header:
+        return category
+    category = category_from_mime(get_magic(mime=True).from_buffer(header))
+    if category is None:
+        category = category_from_description(get_magic().from_buffer(header))
+    return category
+
+
+def _inspect_zip(reader: BoundedReader, summary: ArchiveSummary, sniff: bool) -> None:
+    with zipfile.ZipFile(reader) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            read_header = (lambda: summary.read_member(
+                info.filename, lambda: archive.open(info).read(MEMBER_HEADER_BYTES))) if sniff else None
+            summary.add(classify_member(info.filename, read_header), info.file_size)
+
+
+def _inspect_tar(reader: BoundedReader, summary: ArchiveSummary, sniff: bool, compression: str) -> None:
+    with tarfile.open(fileobj=reader, mode=f"r:{compression}") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            read_header = (lambda: summary.read_member(
+                member.name, lambda: archive.extractfile(member).read(MEMBER_HEADER_BYTES))) if sniff else None
+            summary.add(classify_member(member.name, read_header), member.size)
+
+
+def _inspect_gzip(reader: BoundedReader, summary: ArchiveSummary, path: str) -> None:
+    # a plain gzip stream has a single member, its uncompressed size (modulo 2^32) is stored in the trailer
+    reader.seek(-4, io.SEEK_END)
+    size = int.from_bytes(reader.read(4), "little")
+    summary.add(category_from_extension(os.path.splitext(os.path.splitext(path)[0])[1]), size)
+
+
+def inspect_archive(path: str, max_bytes: int = DEFAULT_MAX_ARCHIVE_BYTES,
+                    sniff: bool = False, throttle=None) -> Optional[ArchiveSummary]:
+    """
+    Lists members of a zip, tar (optionally compressed) or gzip archive without extracting it, reading at most
+    max_bytes from the archive
+    :param path: str
+        Path to the archive
+    :param max_bytes: int
+        Budget of bytes read from the archive
+    :param sniff: bool
+        Whether members with unknown extensions are classified by their signature using libmagic
+    :param throttle: Optional[IOThrottle]
+        Rate limiter charged for bytes read from the archive
+    :return: Optional[ArchiveSummary]
+        Summary of the members, None if the format is not supported. Archives which can't be read (e.g. corrupt ones)
+        raise one of ARCHIVE_ERRORS
+    """
+    summary = ArchiveSummary(path)
+    try:
+        with open(path, "rb") as f:
+            reader = BoundedReader(f, max_bytes, throttle)
+            header = reader.read(TAR_MAGIC_OFFSET + len(TAR_MAGIC))
+            reader.seek(0)
+            compression = next((c for sig, c in TAR_COMPRESSIONS.items() if header.startswith(sig)), None)
+
+            if header.startswith(ZIP_SIGNATURES):
+                _inspect_zip(reader, summary, sniff)
+            elif header[TAR_MAGIC_OFFSET:] == TAR_MAGIC:
+                _inspect_tar(reader, summary, sniff, "")
+            elif compression is not None and _has_tar_name(path):
+                _inspect_tar(reader, summary, sniff, compression)
+            elif header.startswith(GZIP_SIGNATURE):
+                _inspect_gzip(reader, summary, path)
+            else:
+                # e.g. 7z and rar, which the standard library can't read
+                return None
+    except ArchiveBudgetExceeded:
+        summary.truncated = True
+    return summary
+
+
+def _has_tar_name(path: str) -> bool:
+    name = path.lower()
+    return name.endswith((".tgz", ".tbz", ".tbz2", ".txz")) or ".tar." in name
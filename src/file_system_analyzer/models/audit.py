@@ -0,0 +1,205 @@
+import functools
+import os
+import stat
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from ..logging_config import logger
+
+# optional dependencies (pwd and grp are only available on Unix)
+try:
+    import grp
+    import pwd
+except ImportError:
+    grp = pwd = None
+
+# severities from the most to the least severe
+SEVERITIES = ("critical", "high", "medium", "low")
+
+# setuid binaries shipped by common distributions
+DEFAULT_SETUID_ALLOWLIST = frozenset({
+    "/bin/mount",
+    "/bin/ping",
+    "/bin/su",
+    "/bin/umount",
+    "/sbin/unix_chkpwd",
+    "/usr/bin/chage",
+    "/usr/bin/chfn",
+    "/usr/bin/chsh",
+    "/usr/bin/crontab",
+    "/usr/bin/expiry",
+    "/usr/bin/fusermount",
+    "/usr/bin/fusermount3",
+    "/usr/bin/gpasswd",
+    "/usr/bin/mount",
+    "/usr/bin/newgrp",
+    "/usr/bin/passwd",
+    "/usr/bin/pkexec",
+    "/usr/bin/ping",
+    "/usr/bin/su",
+    "/usr/bin/sudo",
+    "/usr/bin/umount",
+    "/usr/lib/dbus-1.0/dbus-daemon-launch-helper",
+    "/usr/lib/openssh/ssh-keysign",
+    "/usr/lib/policykit-1/polkit-agent-helper-1",
+    "/usr/libexec/openssh/ssh-keysign",
+    "/usr/sbin/pam_timestamp_check",
+    "/usr/sbin/unix_chkpwd",
+})
+
+
+@dataclass(frozen=True)
+class AuditFinding:
+    """
+    Single finding of the security audit
+
+    Attributes:
+        severity : str
+            One of SEVERITIES
+        rule : str
+            Name of the rule which produced the finding
+        path : str
+            Path to the file
+        detail : str
+            Human-readable explanation
+    """
+    severity: str
+    rule: str
+    path: str
+    detail: str
+
+
+@functools.lru_cache(maxsize=4096)
+def user_exists(uid: int) -> bool:
+    """
+    Checks whether the user exists. Lookups are cached since a tree usually has only a handful of owners
+    :param uid: int
+    :return: bool
+    """
+    try:
+        pwd.getpwuid(uid)
+        return True
+    except KeyError:
+        return False
+
+
+@functools.lru_cache(maxsize=4096)
+def group_exists(gid: int) -> bool:
+    """
+    Checks whether the group exists. Lookups are cached since a tree usually has only a handful of groups
+    :param gid: int
+    :return: bool
+    """
+    try:
+        grp.getgrgid(gid)
+        return True
+    except KeyError:
+        return False
+
+
+def load_allowlist(path: os.PathLike) -> frozenset:
+    """
+    Loads an allowlist of setuid binaries, one absolute path per line. Empty lines and lines starting with # are ignored
+    :param path: os.PathLike
+        Path to the allowlist file
+    :return: frozenset
+        Paths of allowed setuid binaries
+    """
+    with open(path, encoding="utf-8") as f:
+        lines = (line.strip() for line in f)
+        return frozenset(os.path.abspath(line) for line in lines if line and not line.startswith("#"))
+
+
+def is_user_writable(dir_stat: os.stat_result) -> bool:
+    """
+    Checks whether files of a directory can be replaced by someone other than root. In a sticky directory (e.g. /tmp)
+    only the owners of the files and of the directory can rename or remove them, so write access of its group and
+    others doesn't count there
+    :param dir_stat: os.stat_result
+        Stat of the directory
+    :return: bool
+    """
+    mode = dir_stat.st_mode
+    if dir_stat.st_uid != 0 and mode & stat.S_IWUSR:
+        return True
+    if mode & stat.S_ISVTX:
+        return False
+    return bool((dir_stat.st_gid != 0 and mode & stat.S_IWGRP) or mode & stat.S_IWOTH)
+
+
+class SecurityAuditor:
+    """
+    Audit stage of the scan. Checks ownership and setuid bits of files using stat results which were already
+    collected by the traversal, so no extra system calls are made per file.
+
+    Attributes:
+        setuid_allowlist : frozenset
+            Paths of setuid binaries which are expected
+        _findings : List[AuditFinding]
+            Findings collected so far
+
+    Methods:
+        check_file(path: str, file_stat: os.stat_result, dir_stat: os.stat_result):
+            Runs all rules against a single file
+        findings:
+            Findings ranked by severity
+    """
+    def __init__(self, setuid_allowlist: Optional[Iterable[str]] = None) -> None:
+        """
+        Constructs all necessary attributes for the SecurityAuditor object
+        :param setuid_allowlist: Optional[Iterable[str]]
+            Paths of setuid binaries which are expected, defaults to DEFAULT_SETUID_ALLOWLIST
+        """
+        self.setuid_allowlist = frozenset(DEFAULT_SETUID_ALLOWLIST if setuid_allowlist is None else setuid_allowlist)
+        self._findings: List[AuditFinding] = []
+        self._ownership_available = pwd is not None and grp is not None
+        if not self._ownership_available:
+            logger.warning("Ownership checks unavailable since pwd and grp modules are missing on this platform.")
+
+    def check_file(self, path: str, file_stat: os.stat_result, dir_stat: Optional[os.stat_result]) -> None:
+        """
+        Runs all rules against a single file
+        :param path: str
+            Path to the file
+        :param file_stat: os.stat_result
+            Stat of the file
+        :param dir_stat: Optional[os.stat_result]
+            Stat of the directory containing the file
+        :return: None
+        """
+        uid, gid, mode = file_stat.st_uid, file_stat.st_gid, file_stat.st_mode
+
+        if self._ownership_available:
+            if not user_exists(uid):
+                self._add("medium", "orphan-uid", path, f"owned by nonexistent user {uid}")
+            if not group_exists(gid):
+                self._add("medium", "orphan-gid", path, f"owned by nonexistent group {gid}")
+
+        if uid == 0 and dir_stat is not None and is_user_writable(dir_stat):
+            self._add("high", "root-in-user-writable-dir", path,
+                      "root-owned file can be replaced by non-root users of its directory")
+
+        if mode & stat.S_ISUID and os.path.abspath(path) not in self.setuid_allowlist:
+            if uid == 0:
+                self._add("critical", "unexpected-setuid", path, "setuid root binary not in allowlist")
+            else:
+                self._add("high", "unexpected-setuid", path, f"setuid binary of user {uid} not in allowlist")
+
+    @property
+    def findings(self) -> List[AuditFinding]:
+        return sorted(self._findings, key=lambda f: (SEVERITIES.index(f.severity), f.rule, f.path))
+
+    def to_dict(self) -> Dict:
+        return {
+            "setuid_allowlist": sorted(self.setuid_allowlist),
+            "findings": [[f.severity, f.rule, f.path, f.detail] for f in self._findings],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SecurityAuditor":
+        auditor = cls(data["setuid_allowlist"])
+        auditor._findings = [AuditFinding(*finding) for finding in data["findings"]]
+        return auditor
+
+    def _add(self, severity: str, rule: str, path: str, detail: str) -> None:
+        self._findings.append(AuditFinding(severity, rule, path, detail))
@@ -0,0 +1,183 @@
+"""
+Build step compiling the mapping tables of file_type_mappings.py into compiled_mappings.py.
+
+The source tables are validated (duplicate keys, which a dict literal silently drops, key formats and unknown
+categories) and compiled into tables which load without any work at import: keys sorted into tuples with one byte
+per key indexing a tuple of categories, and the transition tables of the term matcher, so its automaton doesn't have
+to be built in every process.
+
+Usage: python -m file_system_analyzer.models.build_mappings [--check]
+"""
+import argparse
+import ast
+import os
+import sys
+from typing import Dict, List, Sequence
+
+from .term_matcher import TermMatcher
+
+SOURCE_PATH = os.path.join(os.path.dirname(__file__), "file_type_mappings.py")
+COMPILED_PATH = os.path.join(os.path.dirname(__file__), "compiled_mappings.py")
+
+# categories a mapping may resolve to, 'other' is the fallback of every lookup
+KNOWN_CATEGORIES = ("archive", "audio", "document", "executable", "image", "presentation", "spreadsheet", "text",
+                    "video")
+
+TABLES = ("APPLICATION_MIME_TO_CATEGORY", "TERM_TO_CATEGORY", "EXTENSION_TO_CATEGORY")
+
+LINE_LENGTH = 120
+
+
+def load_mappings(source: str, filename: str = SOURCE_PATH) -> Dict[str, Dict[str, str]]:
+    """
+    Parses and validates the mapping tables
+    :param source: str
+        Source code of file_type_mappings.py
+    :param filename: str
+        Name of the source used in error messages
+    :return: Dict[str, Dict[str, str]]
+        Map of table names to their contents
+    """
+    tables = {}
+    problems = []
+    for node in ast.parse(source, filename).body:
+        if not (isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)
+                and node.targets[0].id in TABLES):
+            continue
+        name = node.targets[0].id
+        if not isinstance(node.value, ast.Dict):
+            problems.append(f"{filename}:{node.lineno}: {name} must be a dict literal")
+            continue
+        table = {}
+        lines = {}
+        for key, value in zip(node.value.keys, node.value.values):
+            line = key.lineno if key is not None else node.lineno
+            if not (isinstance(key, ast.Constant) and isinstance(key.value, str)
+                    and isinstance(value, ast.Constant) and isinstance(value.value, str)):
+                problems.append(f"{filename}:{line}: {name} must map string literals to string literals")
+                continue
+            key, category = key.value, value.value
+            if key in table:
+                problems.append(f"{filename}:{line}: duplicate key {key!r} in {name}, first defined on line "
+                                f"{lines[key]}")
+                continue
+            problems.extend(f"{filename}:{line}: {problem}" for problem in check_entry(name, key, category))
+            table[key] = category
+            lines[key] = line
+        tables[name] = table
+
+    problems.extend(f"{filename}: {name} is missing" for name in TABLES if name not in tables)
+    if problems:
+        raise ValueError("invalid mappings:\n" + "\n".join(problems))
+    return tables
+
+
+def check_entry(table: str, key: str, category: str) -> List[str]:
+    """
+    Checks a single entry of a mapping table
+    :param table: str
+        Name of the table
+    :param key: str
+    :param category: str
+    :return: List[str]
+        Problems of the entry, empty if it is valid
+    """
+    problems = []
+    if category not in KNOWN_CATEGORIES:
+        problems.append(f"unknown category {category!r} of {key!r} in {table}")
+    # lookups lowercase their input, so keys which aren't lowercase could never match
+    if not key or key != key.lower() or key != key.strip():
+        problems.append(f"key {key!r} of {table} must be lowercase and non-empty, without surrounding whitespace")
+    if table == "EXTENSION_TO_CATEGORY" and (not key.startswith(".") or len(key) < 2 or "." in key[1:]):
+        problems.append(f"extension {key!r} must start with a dot and contain no other dots")
+    if table == "APPLICATION_MIME_TO_CATEGORY" and not key.startswith("application/"):
+        problems.append(f"MIME type {key!r} must be an application type")
+    return problems
+
+
+def render_sequence(items: Sequence[str], indent: str = "    ") -> str:
+    # items are packed into lines of at most LINE_LENGTH characters
+    lines = []
+    line = indent
+    for item in items:
+        if len(line) + len(item) + 2 > LINE_LENGTH and line.strip():
+            lines.append(line.rstrip())
+            line = indent
+        line += item + ", "
+    lines.append(line.rstrip())
+    return "\n".join(lines)
+
+
+def render_table(name: str, table: Dict[str, str]) -> str:
+    keys = sorted(table)
+    codes = bytes(KNOWN_CATEGORIES.index(table[key]) for key in keys)
+    prefix = name.split("_TO_")[0]
+    private = "_" + prefix
+    # 25 escaped bytes per line
+    code_lines = "\n".join(f"    {codes[i:i + 25]!r}" for i in range(0, len(codes), 25))
+    return (f"{private}_KEYS = (\n{render_sequence([repr(key) for key in keys])}\n)\n"
+            f"{private}_CODES = (\n{code_lines}\n)\n"
+            f"{name}, {prefix.lower()}_category = _table({private}_KEYS, {private}_CODES)\n")
+
+
+def render(tables: Dict[str, Dict[str, str]]) -> str:
+    """
+    Renders the compiled module
+    :param tables: Dict[str, Dict[str, str]]
+        Validated tables returned by load_mappings
+    :return: str
+        Source code of compiled_mappings.py
+    """
+    goto, fail, depth, longest = TermMatcher(tables["TERM_TO_CATEGORY"]).tables()
+    parts = [
+        "# Generated by `python -m file_system_analyzer.models.build_mappings` from file_type_mappings.py,\n"
+        "# do not edit.\n"
+        "# Keys are sorted and their categories are stored as indices into CATEGORIES, one byte per key.\n"
+        "from types import MappingProxyType\n",
+        f"CATEGORIES = {KNOWN_CATEGORIES!r}\n\n\n"
+        "def _table(keys, codes):\n"
+        "    # read-only view of the table, and its get method for lookups which skip the view\n"
+        "    table = dict(zip(keys, map(CATEGORIES.__getitem__, codes)))\n"
+        "    return MappingProxyType(table), table.get\n",
+        *(render_table(name, tables[name]) for name in TABLES),
+        "# transitions, failure links, depths and lengths of the longest terms of the TermMatcher states\n"
+        "TERM_MATCHER_TABLES = (\n"
+        "    (\n" + render_sequence([repr(transitions) for transitions in goto], "        ") + "\n    ),\n"
+        "    (\n" + render_sequence([str(state) for state in fail], "        ") + "\n    ),\n"
+        "    (\n" + render_sequence([str(length) for length in depth], "        ") + "\n    ),\n"
+        "    (\n" + render_sequence([str(length) for length in longest], "        ") + "\n    ),\n"
+        ")\n",
+    ]
+    return "\n\n".join(parts)
+
+
+def main(argv: Sequence[str] = None) -> None:
+    """
+    Validates the mappings and writes compiled_mappings.py, or checks that it is up to date
+    :param argv: Sequence[str]
+    :return: None
+    """
+    parser = argparse.ArgumentParser(prog="python -m file_system_analyzer.models.build_mappings")
+    parser.add_argument("--check", help="fail if compiled_mappings.py is out of date instead of writing it",
+                        action="store_true")
+    args = parser.parse_args(argv)
+
+    with open(SOURCE_PATH, encoding="utf-8") as f:
+        try:
+            compiled = render(load_mappings(f.read()))
+        except ValueError as e:
+            sys.exit(str(e))
+
+    if args.check:
+        with open(COMPILED_PATH, encoding="utf-8") as f:
+            if f.read() != compiled:
+                sys.exit("compiled_mappings.py is out of date, "
+                         "run python -m file_system_analyzer.models.build_mappings")
+        return
+    with open(COMPILED_PATH, "w", encoding="utf-8") as f:
+        f.write(compiled)
+    print(f"wrote {COMPILED_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import json
+import os
+from typing import Dict, Iterable, Iterator, List
+
+# format version of checkpoint files, bumped on incompatible changes
+CHECKPOINT_VERSION = 3
+
+# default number of seconds between two checkpoints
+DEFAULT_CHECKPOINT_INTERVAL = 300.0
+
+# the journal of file records is kept next to the checkpoint, in a file with this suffix
+JOURNAL_SUFFIX = ".files"
+
+# bytes buffered when the journal is written
+JOURNAL_BUFFER_BYTES = 1024 ** 2
+
+
+def journal_path(path: os.PathLike) -> str:
+    """
+    Returns the path of the journal of file records belonging to a checkpoint
+    :param path: os.PathLike
+        Checkpoint file
+    :return: str
+    """
+    return f"{os.fspath(path)}{JOURNAL_SUFFIX}"
+
+
+class RecordJournal:
+    """
+    Append-only file of the file records of a scan, kept next to its checkpoint. Records are appended as the files of
+    directories are recorded and a checkpoint only stores the committed length of the journal, so every record is
+    written once and checkpoints stay small however long the scan runs. Records past the committed length, written
+    after the last checkpoint, are dropped when the scan is resumed.
+
+    Attributes:
+        path : str
+            Path to the journal
+
+    Methods:
+        append(files: Iterable[FileMetadata]):
+            Appends file records
+        commit():
+            Syncs the records appended so far to disk and returns the committed length
+        close():
+            Closes the journal
+    """
+    def __init__(self, path: str, offset: int = 0) -> None:
+        """
+        Constructs all necessary attributes for the RecordJournal object
+        :param path: str
+            Path to the journal, created if it doesn't exist
+        :param offset: int
+            Committed length of an existing journal, anything after it is discarded
+        """
+        self.path: str = path
+        self._file = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), "r+b", buffering=JOURNAL_BUFFER_BYTES)
+        self._file.truncate(offset)
+        self._file.seek(offset)
+
+    def append(self, files: Iterable) -> None:
+        """
+        Appends file records, one JSON array per line
+        :param files: Iterable[FileMetadata]
+        :return: None
+        """
+        write, dumps = self._file.write, json.dumps
+        for file in files:
+            write(dumps([os.fspath(file.path), file.size, file.permissions, file.allocated_size, file.category,
+                         file.flags]).encode() + b"\n")
+
+    def commit(self) -> int:
+        """
+        Syncs the records appended so far to disk
+        :return: int
+            Committed length of the journal in bytes
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def read_journal(path: os.PathLike, offset: int) -> Iterator[List]:
+    """
+    Reads the committed records of a journal
+    :param path: os.PathLike
+        Path to the journal
+    :param offset: int
+        Committed length of the journal
+    :return: Iterator[List]
+        Records as [path, size, permissions, allocated size, category, flags]
+    """
+    with open(path, "rb", buffering=JOURNAL_BUFFER_BYTES) as f:
+        position = 0
+        for line in f:
+            position += len(line)
+            if position > offset:
+                return
+            yield json.loads(line)
+
+
+def write_checkpoint(state: Dict, path: os.PathLike) -> None:
+    """
+    Writes the state of a scan as JSON. The data is synced to disk before the file atomically replaces the
+    previous checkpoint, so a crash at any moment leaves either the old or the new checkpoint intact
+    :param state: Dict
+        State of the scan as returned by FileSystemAnalyzer.checkpoint_state
+    :param path: os.PathLike
+        Destination file
+    :return: None
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": CHECKPOINT_VERSION, **state}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_checkpoint(path: os.PathLike) -> Dict:
+    """
+    Reads the state of a scan written by write_checkpoint
+    :param path: os.PathLike
+        Checkpoint file
+    :return: Dict
+    """
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"unsupported checkpoint version: {state.get('version')}")
+    return state
@@ -0,0 +1,317 @@
+import codecs
+import fnmatch
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .throttle import LIBMAGIC_READ_BYTES
+from .compiled_mappings import extension_category
+from .utils import category_from_extension, file_extension, infer_file_type_magic_header, magic_available
+from ..logging_config import logger
+
+# number of leading bytes read by the signature classifier, enough to reach the tar magic at offset 257
+SIGNATURE_BYTES = 512
+
+# entry point group through which other packages can provide classifiers
+ENTRY_POINT_GROUP = "file_system_analyzer.classifiers"
+
+# signatures as (offset, bytes, category), checked in order
+SIGNATURES = (
+    (0, b"\x89PNG\r\n\x1a\n", "image"),
+    (0, b"\xff\xd8\xff", "image"),
+    (0, b"GIF87a", "image"),
+    (0, b"GIF89a", "image"),
+    (0, b"II*\x00", "image"),
+    (0, b"MM\x00*", "image"),
+    (0, b"%PDF-", "document"),
+    (0, b"{\\rtf", "document"),
+    (0, b"\x1f\x8b", "archive"),
+    (0, b"BZh", "archive"),
+    (0, b"\xfd7zXZ\x00", "archive"),
+    (0, b"7z\xbc\xaf\x27\x1c", "archive"),
+    (0, b"Rar!\x1a\x07", "archive"),
+    (0, b"\x28\xb5\x2f\xfd", "archive"),
+    (257, b"ustar", "archive"),
+    (0, b"\x7fELF", "executable"),
+    (0, b"\xcf\xfa\xed\xfe", "executable"),
+    (0, b"\xce\xfa\xed\xfe", "executable"),
+    (0, b"\xca\xfe\xba\xbe", "executable"),
+    (0, b"MZ", "executable"),
+    (0, b"ID3", "audio"),
+    (0, b"fLaC", "audio"),
+    (0, b"OggS", "audio"),
+    (8, b"WAVE", "audio"),
+    (8, b"M4A ", "audio"),
+    (8, b"WEBP", "image"),
+    (8, b"AVI ", "video"),
+    (4, b"ftyp", "video"),
+    (0, b"\x1a\x45\xdf\xa3", "video"),
+)
+
+# containers shared by several formats (zip for OOXML and OpenDocument, OLE2 for legacy Office), their category
+# is taken from the extension if it is known
+CONTAINER_SIGNATURES = (
+    (b"PK\x03\x04", "archive"),
+    (b"PK\x05\x06", "archive"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "document"),
+)
+
+
+class Classifier(ABC):
+    """
+    Base class of classifiers. A classifier either decides the category of a file or returns None, in which case
+    the next classifier of the chain is asked. Implementations must define classify, so a classifier missing it fails
+    when it is created, and may also override classify_many if they can amortize setup and I/O across the files of
+    a directory.
+
+    Attributes:
+        name : str
+            Name of the classifier in the registry
+        read_bytes : int
+            Upper bound of bytes read from the contents of each file, 0 if contents aren't read
+
+    Methods:
+        classify(file: FileMetadata):
+            Infers the category of a single file
+        classify_many(files: Sequence[FileMetadata], errors: Optional[ScanErrors]):
+            Infers categories of a batch of files
+    """
+    name = "classifier"
+    read_bytes = 0
+
+    @abstractmethod
+    def classify(self, file) -> Optional[str]:
+        """
+        Infers the category of a single file
+        :param file: FileMetadata
+            File with its path and size
+        :return: Optional[str]
+            Category, None if the classifier can't decide
+        """
+
+    def classify_many(self, files: Sequence, errors=None) -> List[Optional[str]]:
+        """
+        Infers categories of a batch of files. A failing file doesn't affect the rest of the batch
+        :param files: Sequence[FileMetadata]
+            Files with their paths and sizes
+        :param errors: Optional[ScanErrors]
+            Failures are counted here if provided
+        :return: List[Optional[str]]
+            Categories in the order of the files, None where the classifier can't decide or failed
+        """
+        categories = []
+        for file in files:
+            try:
+                categories.append(self.classify(file))
+            except Exception as e:
+                if errors is not None:
+                    errors.record("classify", file.path, e)
+                logger.debug("Error classifying %s with %s: %s", file.path, self.name, e)
+                categories.append(None)
+        return categories
+
+
+class ExtensionClassifier(Classifier):
+    """
+    Classifies files by their extension only, without touching their contents
+    """
+    name = "extension"
+
+    def classify(self, file) -> Optional[str]:
+        category = category_from_extension(file_extension(file.path))
+        return None if category == "other" else category
+
+    def classify_many(self, files: Sequence, errors=None) -> List[Optional[str]]:
+        # a plain table lookup can't fail, so the batch skips the per-file exception handling, and the lookup is
+        # inlined since this is the whole per-file cost of extension-only scans
+        lookup = extension_category
+        return [lookup(file_extension(file.path).lower()) for file in files]
+
+
+class MagicClassifier(Classifier):
+    """
+    Classifies files by their signature using libmagic, with MIME types first and raw descriptions for
+    application types. It is the most accurate classifier, but reads up to 1MiB of every file by default. The
+    leading bytes are read once into a reused buffer and handed to libmagic, instead of libmagic opening and reading
+    the file for each of its lookups
+    """
+    name = "magic"
+    read_bytes = LIBMAGIC_READ_BYTES
+
+    def __init__(self, max_bytes: int = LIBMAGIC_READ_BYTES) -> None:
+        """
+        Constructs all necessary attributes for the MagicClassifier object
+        :param max_bytes: int
+            Maximum number of leading bytes read from each file. Libmagic reads 1MiB of a file by itself, lower
+            limits read less of large files but may miss signatures further inside them
+        """
+        if not magic_available():
+            raise ValueError("libmagic is not available on this machine")
+        from .sniffing import HeaderReader
+        self.read_bytes = max_bytes
+        self._reader = HeaderReader(max_bytes)
+
+    def classify(self, file) -> Optional[str]:
+        with self._reader.read(file.path) as header:
+            return infer_file_type_magic_header(file.path, header)
+
+
+class SignatureClassifier(Classifier):
+    """
+    Classifies files by well-known signatures of their first 512 bytes in pure Python, which is much cheaper than
+    libmagic. Files without a known signature are classified as text if they look like UTF-8 text
+    """
+    name = "signature"
+    read_bytes = SIGNATURE_BYTES
+
+    def __init__(self) -> None:
+        # sniffing (ctypes) is imported only by the classifiers which read file contents
+        from .sniffing import HeaderReader
+        self._reader = HeaderReader(SIGNATURE_BYTES)
+
+    def classify(self, file) -> Optional[str]:
+        with self._reader.read(file.path) as header:
+            # bytes.startswith on a copy of the 512 bytes is faster than comparing slices of the view
+            return self.classify_header(file.path, header.tobytes())
+
+    @staticmethod
+    def classify_header(path: str, header: bytes) -> Optional[str]:
+        """
+        Infers the category from the leading bytes of a file
+        :param path: str
+            Path to the file, its extension disambiguates container formats
+        :param header: bytes
+            Leading bytes of the file
+        :return: Optional[str]
+            Category, None if the header is empty or unknown
+        """
+        if not header:
+            return None
+        for offset, signature, category in SIGNATURES:
+            if header.startswith(signature, offset):
+                return category
+        for signature, category in CONTAINER_SIGNATURES:
+            if header.startswith(signature):
+                by_extension = category_from_extension(os.path.splitext(path)[1])
+                return category if by_extension == "other" else by_extension
+        if b"\x00" in header:
+            return None
+        try:
+            # a multi-byte character may be cut at the end of a full header, which isn't an error
+            codecs.getincrementaldecoder("utf-8")().decode(header, final=len(header) < SIGNATURE_BYTES)
+        except UnicodeDecodeError:
+            return None
+        return "text"
+
+
+class MappingClassifier(Classifier):
+    """
+    Classifies files by rules of a user-supplied mapping file, compiled into lookup tables when it is loaded.
+    Every line holds a pattern and a category separated by whitespace, empty lines and lines starting with #
+    are ignored. A pattern is either an extension ('.log'), an exact file name ('Makefile') or a glob on the
+    file name ('core.[0-9]*'). Exact names take precedence over globs (first matching one wins), and globs over
+    extensions.
+
+    Attributes:
+        path : os.PathLike
+            Path to the mapping file
+        extensions : Dict[str, str]
+            Map of lowercase extensions to categories
+        names : Dict[str, str]
+            Map of exact file names to categories
+    """
+    name = "mapping"
+
+    def __init__(self, path: os.PathLike) -> None:
+        """
+        Loads and compiles the mapping file
+        :param path: os.PathLike
+            Path to the mapping file
+        """
+        self.path: os.PathLike = path
+        self.extensions: Dict[str, str] = {}
+        self.names: Dict[str, str] = {}
+        self._glob_categories: List[str] = []
+        globs = []
+        with open(path, encoding="utf-8") as f:
+            for number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                fields = line.split()
+                if len(fields) != 2:
+                    raise ValueError(f"{path}:{number}: expected a pattern and a category, got {line!r}")
+                pattern, category = fields
+                if pattern.startswith(".") and not any(c in pattern for c in "*?["):
+                    self.extensions[pattern.lower()] = category
+                elif any(c in pattern for c in "*?["):
+                    globs.append(f"(?P<g{len(globs)}>{fnmatch.translate(pattern)})")
+                    self._glob_categories.append(category)
+                else:
+                    self.names[pattern] = category
+        # all globs are matched in one pass of a single regex, the name of the matching group identifies the rule
+        self._globs = re.compile("|".join(globs)) if globs else None
+
+    def classify(self, file) -> Optional[str]:
+        name = os.path.basename(file.path)
+        category = self.names.get(name)
+        if category is not None:
+            return category
+        if self._globs is not None:
+            match = self._globs.match(name)
+            if match is not None:
+                return self._glob_categories[int(match.lastgroup[1:])]
+        return self.extensions.get(os.path.splitext(name)[1].lower())
+
+    def classify_many(self, files: Sequence, errors=None) -> List[Optional[str]]:
+        return [self.classify(file) for file in files]
+
+
+# built-in classifiers by name, extended by register_classifier and entry points
+CLASSIFIERS: Dict[str, Callable[[], Classifier]] = {
+    "extension": ExtensionClassifier,
+    "magic": MagicClassifier,
+    "signature": SignatureClassifier,
+}
+
+
+def register_classifier(name: str, factory: Callable[[], Classifier]) -> None:
+    """
+    Registers a classifier so it can be selected by name, e.g. with `fsa --classifier NAME`
+    :param name: str
+        Name of the classifier
+    :param factory: Callable[[], Classifier]
+        Creates the classifier, usually the class itself
+    :return: None
+    """
+    CLASSIFIERS[name] = factory
+
+
+def get_classifier(name: str) -> Classifier:
+    """
+    Creates a registered classifier. Names which aren't registered are looked up among entry points of the
+    'file_system_analyzer.classifiers' group, so other packages can provide classifiers
+    :param name: str
+        Name of the classifier
+    :return: Classifier
+    """
+    if name not in CLASSIFIERS:
+        from importlib.metadata import entry_points
+
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP, name=name):
+            CLASSIFIERS[name] = entry_point.load()
+    if name not in CLASSIFIERS:
+        raise ValueError(f"unknown classifier: {name}")
+    return CLASSIFIERS[name]()
+
+
+def default_classifiers(magic_available: bool) -> List[Classifier]:
+    """
+    Returns the default chain: libmagic if it is available, and extensions for files libmagic failed to read
+    :param magic_available: bool
+    :return: List[Classifier]
+    """
+    if magic_available:
+        return [MagicClassifier(), ExtensionClassifier()]
+    return [ExtensionClassifier()]
@@ -0,0 +1,150 @@
+# Generated by `python -m file_system_analyzer.models.build_mappings` from file_type_mappings.py,
+# do not edit.
+# Keys are sorted and their categories are stored as indices into CATEGORIES, one byte per key.
+from types import MappingProxyType
+
+
+CATEGORIES = ('archive', 'audio', 'document', 'executable', 'image', 'presentation', 'spreadsheet', 'text', 'video')
+
+
+def _table(keys, codes):
+    # read-only view of the table, and its get method for lookups which skip the view
+    table = dict(zip(keys, map(CATEGORIES.__getitem__, codes)))
+    return MappingProxyType(table), table.get
+
+
+_APPLICATION_MIME_KEYS = (
+    'application/epub+zip', 'application/gzip', 'application/java-archive', 'application/java-vm',
+    'application/msword', 'application/octet-stream', 'application/pdf', 'application/postscript', 'application/rtf',
+    'application/vnd.amazon.ebook', 'application/vnd.android.package-archive', 'application/vnd.debian.binary-package',
+    'application/vnd.ms-excel', 'application/vnd.ms-excel.sheet.binary.macroenabled.12',
+    'application/vnd.ms-excel.sheet.macroenabled.12', 'application/vnd.ms-excel.template.macroenabled.12',
+    'application/vnd.ms-powerpoint', 'application/vnd.ms-powerpoint.presentation.macroenabled.12',
+    'application/vnd.ms-word.document.macroenabled.12', 'application/vnd.ms-word.template.macroenabled.12',
+    'application/vnd.ms-xpsdocument', 'application/vnd.nokia.n-gage.symbian.install',
+    'application/vnd.oasis.opendocument.presentation', 'application/vnd.oasis.opendocument.presentation-template',
+    'application/vnd.oasis.opendocument.spreadsheet', 'application/vnd.oasis.opendocument.spreadsheet-template',
+    'application/vnd.oasis.opendocument.text', 'application/vnd.oasis.opendocument.text-master',
+    'application/vnd.oasis.opendocument.text-template', 'application/vnd.oasis.opendocument.text-web',
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+    'application/vnd.openxmlformats-officedocument.presentationml.slide',
+    'application/vnd.openxmlformats-officedocument.presentationml.slideshow',
+    'application/vnd.openxmlformats-officedocument.presentationml.template',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.template',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.template', 'application/vnd.rar',
+    'application/x-7z-compressed', 'application/x-bzip', 'application/x-bzip2', 'application/x-debian-package',
+    'application/x-gzip', 'application/x-mach-binary', 'application/x-msdownload', 'application/x-rar-compressed',
+    'application/x-redhat-package-manager', 'application/x-rpm', 'application/x-sh', 'application/x-shellscript',
+    'application/x-tar', 'application/x-zip-compressed', 'application/zip',
+)
+_APPLICATION_MIME_CODES = (
+    b'\x02\x00\x03\x03\x02\x03\x02\x02\x02\x02\x03\x00\x06\x06\x06\x06\x05\x05\x02\x02\x02\x03\x05\x05\x06'
+    b'\x06\x02\x02\x02\x02\x05\x05\x05\x05\x06\x06\x02\x02\x00\x00\x00\x00\x00\x00\x03\x03\x00\x00\x00\x03'
+    b'\x03\x00\x00\x00'
+)
+APPLICATION_MIME_TO_CATEGORY, application_mime_category = _table(_APPLICATION_MIME_KEYS, _APPLICATION_MIME_CODES)
+
+
+_TERM_KEYS = (
+    'apple numbers', 'apple pages', 'archive', 'comma-separated', 'compress', 'csv', 'disc image', 'disk image',
+    'document', 'excel', 'executable', 'installer', 'iso', 'keynote', 'latex document', 'mach-o', 'microsoft word',
+    'opendocument text', 'package', 'powerpoint', 'presentation', 'rich text format', 'shared object', 'shell script',
+    'spreadsheet', 'spreadsheetml', 'tab-separated', 'tar', 'tsv', 'zip',
+)
+_TERM_CODES = (
+    b'\x06\x02\x00\x06\x00\x06\x00\x00\x02\x06\x03\x03\x00\x05\x02\x03\x02\x02\x00\x05\x05\x02\x03\x03\x06'
+    b'\x06\x06\x00\x06\x00'
+)
+TERM_TO_CATEGORY, term_category = _table(_TERM_KEYS, _TERM_CODES)
+
+
+_EXTENSION_KEYS = (
+    '.3g2', '.3gp', '.3gpp', '.3gpp2', '.7z', '.a', '.aac', '.adts', '.ai', '.aif', '.aifc', '.aiff', '.apk', '.app',
+    '.ass', '.au', '.avi', '.avif', '.bat', '.bin', '.bmp', '.bz2', '.c', '.cab', '.cmd', '.com', '.command', '.css',
+    '.csv', '.deb', '.dll', '.dmg', '.doc', '.docx', '.dot', '.dotx', '.ear', '.eps', '.etx', '.exe', '.fods', '.gif',
+    '.gz', '.h', '.heic', '.heif', '.htm', '.html', '.ico', '.ief', '.ipynb', '.iso', '.jar', '.jpe', '.jpeg', '.jpg',
+    '.json', '.key', '.ksh', '.kth', '.loas', '.lz', '.lzma', '.m1v', '.mov', '.movie', '.mp2', '.mp3', '.mp4', '.mpa',
+    '.mpe', '.mpeg', '.mpg', '.msi', '.n3', '.numbers', '.o', '.obj', '.odp', '.ods', '.odt', '.opus', '.otp', '.ots',
+    '.ott', '.out', '.pages', '.pbm', '.pdf', '.pecha', '.pgm', '.pl', '.png', '.pnm', '.pot', '.potx', '.ppa', '.ppm',
+    '.pps', '.ppsx', '.ppt', '.pptx', '.prezi', '.ps', '.ps1', '.pwz', '.py', '.qt', '.ra', '.rar', '.ras', '.rgb',
+    '.rpm', '.rtf', '.rtx', '.run', '.scr', '.sdd', '.sgm', '.sgml', '.sh', '.snd', '.so', '.srt', '.svg', '.tar',
+    '.tex', '.tgz', '.tif', '.tiff', '.tsv', '.txt', '.vcf', '.vtt', '.war', '.wasm', '.wav', '.webm', '.wiz', '.xbm',
+    '.xlb', '.xls', '.xlsb', '.xlsm', '.xlstm', '.xlsx', '.xlt', '.xltx', '.xml', '.xpm', '.xwd', '.xz', '.z', '.zip',
+)
+_EXTENSION_CODES = (
+    b'\x01\x01\x01\x01\x00\x03\x01\x01\x02\x01\x01\x01\x00\x03\x07\x01\x08\x04\x03\x03\x04\x00\x07\x00\x03'
+    b'\x03\x03\x07\x06\x00\x03\x00\x02\x02\x02\x02\x00\x02\x07\x03\x06\x04\x00\x07\x04\x04\x07\x07\x04\x04'
+    b'\x02\x00\x00\x04\x04\x04\x07\x05\x03\x05\x01\x00\x00\x08\x08\x08\x01\x01\x08\x01\x08\x08\x08\x03\x07'
+    b'\x06\x03\x03\x05\x06\x02\x01\x05\x06\x02\x03\x02\x04\x02\x05\x04\x07\x04\x04\x05\x05\x05\x04\x05\x05'
+    b'\x05\x05\x05\x02\x03\x05\x07\x08\x01\x00\x04\x04\x00\x02\x07\x03\x03\x05\x07\x07\x03\x01\x03\x07\x04'
+    b'\x00\x02\x00\x04\x04\x06\x07\x07\x07\x00\x03\x01\x08\x02\x04\x06\x06\x06\x06\x06\x06\x06\x06\x07\x04'
+    b'\x04\x00\x00\x00'
+)
+EXTENSION_TO_CATEGORY, extension_category = _table(_EXTENSION_KEYS, _EXTENSION_CODES)
+
+
+# transitions, failure links, depths and lengths of the longest terms of the TermMatcher states
+TERM_MATCHER_TABLES = (
+    (
+        {'d': 1, 'm': 9, 'o': 23, 'a': 40, 'r': 51, 'l': 67, 'p': 81, 'k': 102, 'e': 109, 's': 114, 'c': 132, 't': 135, 'z': 172, 'i': 187},
+        {'o': 2, 'i': 190}, {'c': 3}, {'u': 4}, {'m': 5}, {'e': 6}, {'n': 7}, {'t': 8}, {}, {'i': 10, 'a': 244},
+        {'c': 11}, {'r': 12}, {'o': 13}, {'s': 14}, {'o': 15}, {'f': 16}, {'t': 17}, {' ': 18}, {'w': 19}, {'o': 20},
+        {'r': 21}, {'d': 22}, {}, {'p': 24}, {'e': 25}, {'n': 26}, {'d': 27}, {'o': 28}, {'c': 29}, {'u': 30},
+        {'m': 31}, {'e': 32}, {'n': 33}, {'t': 34}, {' ': 35}, {'t': 36}, {'e': 37}, {'x': 38}, {'t': 39}, {},
+        {'p': 41, 'r': 166}, {'p': 42}, {'l': 43}, {'e': 44}, {' ': 45}, {'p': 46, 'n': 125}, {'a': 47}, {'g': 48},
+        {'e': 49}, {'s': 50}, {}, {'i': 52}, {'c': 53}, {'h': 54}, {' ': 55}, {'t': 56}, {'e': 57}, {'x': 58},
+        {'t': 59}, {' ': 60}, {'f': 61}, {'o': 62}, {'r': 63}, {'m': 64}, {'a': 65}, {'t': 66}, {}, {'a': 68},
+        {'t': 69}, {'e': 70}, {'x': 71}, {' ': 72}, {'d': 73}, {'o': 74}, {'c': 75}, {'u': 76}, {'m': 77}, {'e': 78},
+        {'n': 79}, {'t': 80}, {}, {'o': 82, 'r': 91, 'a': 181}, {'w': 83}, {'e': 84}, {'r': 85}, {'p': 86}, {'o': 87},
+        {'i': 88}, {'n': 89}, {'t': 90}, {}, {'e': 92}, {'s': 93}, {'e': 94}, {'n': 95}, {'t': 96}, {'a': 97},
+        {'t': 98}, {'i': 99}, {'o': 100}, {'n': 101}, {}, {'e': 103}, {'y': 104}, {'n': 105}, {'o': 106}, {'t': 107},
+        {'e': 108}, {}, {'x': 110}, {'c': 111, 'e': 206}, {'e': 112}, {'l': 113}, {}, {'p': 115, 'h': 222}, {'r': 116},
+        {'e': 117}, {'a': 118}, {'d': 119}, {'s': 120}, {'h': 121}, {'e': 122}, {'e': 123}, {'t': 124}, {'m': 138},
+        {'u': 126}, {'m': 127}, {'b': 128}, {'e': 129}, {'r': 130}, {'s': 131}, {}, {'s': 133, 'o': 140}, {'v': 134},
+        {}, {'s': 136, 'a': 154}, {'v': 137}, {}, {'l': 139}, {}, {'m': 141}, {'m': 142, 'p': 175}, {'a': 143},
+        {'-': 144}, {'s': 145}, {'e': 146}, {'p': 147}, {'a': 148}, {'r': 149}, {'a': 150}, {'t': 151}, {'e': 152},
+        {'d': 153}, {}, {'b': 155, 'r': 180}, {'-': 156}, {'s': 157}, {'e': 158}, {'p': 159}, {'a': 160}, {'r': 161},
+        {'a': 162}, {'t': 163}, {'e': 164}, {'d': 165}, {}, {'c': 167}, {'h': 168}, {'i': 169}, {'v': 170}, {'e': 171},
+        {}, {'i': 173}, {'p': 174}, {}, {'r': 176}, {'e': 177}, {'s': 178}, {'s': 179}, {}, {}, {'c': 182}, {'k': 183},
+        {'a': 184}, {'g': 185}, {'e': 186}, {}, {'s': 188, 'n': 214}, {'o': 189}, {}, {'s': 191}, {'c': 192, 'k': 199},
+        {' ': 193}, {'i': 194}, {'m': 195}, {'a': 196}, {'g': 197}, {'e': 198}, {}, {' ': 200}, {'i': 201}, {'m': 202},
+        {'a': 203}, {'g': 204}, {'e': 205}, {}, {'c': 207}, {'u': 208}, {'t': 209}, {'a': 210}, {'b': 211}, {'l': 212},
+        {'e': 213}, {}, {'s': 215}, {'t': 216}, {'a': 217}, {'l': 218}, {'l': 219}, {'e': 220}, {'r': 221}, {},
+        {'e': 223, 'a': 233}, {'l': 224}, {'l': 225}, {' ': 226}, {'s': 227}, {'c': 228}, {'r': 229}, {'i': 230},
+        {'p': 231}, {'t': 232}, {}, {'r': 234}, {'e': 235}, {'d': 236}, {' ': 237}, {'o': 238}, {'b': 239}, {'j': 240},
+        {'e': 241}, {'c': 242}, {'t': 243}, {}, {'c': 245}, {'h': 246}, {'-': 247}, {'o': 248}, {},
+    ),
+    (
+        0, 0, 23, 132, 0, 9, 109, 0, 135, 0, 187, 132, 51, 23, 114, 23, 0, 135, 0, 0, 23, 51, 1, 0, 81, 109, 0, 1, 2,
+        3, 4, 5, 6, 7, 8, 0, 135, 109, 110, 135, 0, 81, 81, 67, 109, 0, 81, 181, 0, 109, 114, 0, 187, 132, 0, 0, 135,
+        109, 110, 135, 0, 0, 23, 51, 9, 244, 135, 0, 40, 135, 109, 110, 0, 1, 2, 3, 4, 5, 6, 7, 8, 0, 23, 0, 109, 51,
+        81, 82, 187, 214, 135, 51, 109, 114, 109, 0, 135, 154, 135, 187, 23, 0, 0, 109, 0, 0, 23, 135, 109, 0, 0, 132,
+        109, 67, 0, 81, 91, 92, 40, 1, 114, 222, 223, 109, 135, 0, 0, 9, 0, 109, 51, 114, 0, 114, 0, 0, 114, 0, 9, 67,
+        23, 9, 9, 244, 0, 114, 109, 81, 181, 166, 40, 135, 109, 1, 40, 0, 0, 114, 109, 81, 181, 166, 40, 135, 109, 1,
+        51, 132, 0, 187, 0, 109, 0, 187, 81, 81, 91, 92, 93, 114, 166, 40, 132, 102, 40, 0, 109, 0, 114, 23, 187, 188,
+        132, 0, 187, 9, 244, 0, 109, 102, 0, 187, 9, 244, 0, 109, 109, 132, 0, 135, 154, 155, 67, 109, 0, 114, 135,
+        154, 67, 67, 109, 51, 0, 109, 67, 67, 0, 114, 132, 51, 52, 81, 135, 40, 166, 109, 1, 0, 23, 0, 0, 109, 132,
+        135, 40, 132, 0, 0, 23,
+    ),
+    (
+        0, 1, 2, 3, 4, 5, 6, 7, 8, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11,
+        12, 13, 14, 15, 16, 17, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15,
+        16, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 2, 3, 4, 5, 6, 7, 8, 9, 10,
+        11, 12, 1, 2, 3, 4, 5, 6, 7, 1, 2, 3, 4, 5, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 7, 8, 9, 10, 11, 12, 13, 1, 2,
+        3, 1, 2, 3, 12, 13, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 2,
+        3, 4, 5, 6, 7, 1, 2, 3, 4, 5, 6, 7, 8, 3, 2, 3, 4, 5, 6, 7, 1, 2, 3, 2, 3, 4, 5, 6, 7, 8, 9, 10, 4, 5, 6, 7, 8,
+        9, 10, 3, 4, 5, 6, 7, 8, 9, 10, 2, 3, 4, 5, 6, 7, 8, 9, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 3, 4, 5, 6, 7, 8,
+        9, 10, 11, 12, 13, 2, 3, 4, 5, 6,
+    ),
+    (
+        0, 0, 0, 0, 0, 0, 0, 0, 8, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 14, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 8, 0, 0,
+        0, 0, 17, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 11, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 16, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 14, 0, 0, 0, 0, 0, 0, 0, 0, 0, 10, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 12, 0, 0, 0, 0, 0, 0, 7,
+        0, 0, 0, 0, 5, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 11, 0, 0, 0, 0, 0, 0, 13, 0, 0, 3, 0, 0, 3, 0, 13, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 15, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 13, 0, 0, 0, 0, 0, 7, 0, 0, 3, 0, 0, 0, 0, 8, 3,
+        0, 0, 0, 0, 0, 7, 0, 0, 3, 0, 0, 0, 0, 0, 0, 0, 0, 10, 0, 0, 0, 0, 0, 0, 10, 0, 0, 0, 0, 0, 0, 0, 10, 0, 0, 0,
+        0, 0, 0, 0, 9, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 12, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 13, 0, 0, 0, 0, 6,
+    ),
+)
@@ -0,0 +1,259 @@
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+from ..logging_config import logger
+
+# stat calls in flight per device, by kind of device. Solid state and network storage serve many requests in
+# parallel (deep NVMe queues, round trips to NFS servers overlap), while parallel requests make a spinning disk seek
+# back and forth, and memory file systems are bound by the CPU
+DEVICE_CONCURRENCY = {
+    "nvme": 16,
+    "network": 16,
+    "ssd": 8,
+    "unknown": 4,
+    "rotational": 1,
+    "memory": 1,
+}
+
+# file system types whose every metadata operation is a round trip to a server
+NETWORK_FILE_SYSTEMS = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "ceph", "glusterfs", "lustre", "9p", "afs",
+                        "fuse.sshfs", "fuse.s3fs", "fuse.gcsfuse", "fuse.rclone", "fuse.juicefs"}
+
+# file system types backed by memory
+MEMORY_FILE_SYSTEMS = {"tmpfs", "ramfs", "devtmpfs", "proc", "sysfs"}
+
+# FS_IOC_FIEMAP ioctl, see linux/fiemap.h. A request maps the whole file into at most one extent:
+# struct fiemap { u64 fm_start; u64 fm_length; u32 fm_flags; u32 fm_mapped_extents; u32 fm_extent_count;
+#                 u32 fm_reserved; struct fiemap_extent fm_extents[]; }
+# struct fiemap_extent { u64 fe_logical; u64 fe_physical; u64 fe_length; u64 fe_reserved64[2]; u32 fe_flags;
+#                        u32 fe_reserved[3]; }
+FS_IOC_FIEMAP = 0xC020660B
+_FIEMAP_REQUEST = struct.pack("=QQIIII", 0, 2 ** 64 - 1, 0, 0, 1, 0) + bytes(56)
+# extents whose physical location isn't known yet, e.g. with delayed allocation
+FIEMAP_EXTENT_UNKNOWN = 0x2
+FIEMAP_EXTENT_DELALLOC = 0x4
+
+# orders in which files of a batch are read by content classifiers
+READ_ORDERS = ("scan", "inode", "physical")
+
+
+def statx_function(owner: bool) -> Optional[Callable[[str], os.stat_result]]:
+    """
+    Returns a function fetching only the fields the scan needs with statx (os.statx, Linux), which lets network
+    and FUSE file systems skip computing the rest
+    :param owner: bool
+        Whether owners are needed too, by the audit stage
+    :return: Optional[Callable[[str], os.stat_result]]
+        Function taking a path and not following symbolic links, None if os.statx isn't available
+    """
+    if not hasattr(os, "statx"):
+        return None
+    mask = (os.STATX_TYPE | os.STATX_MODE | os.STATX_SIZE | os.STATX_BLOCKS | os.STATX_INO | os.STATX_ATIME
+            | os.STATX_MTIME)
+    if owner:
+        mask |= os.STATX_UID | os.STATX_GID
+    return lambda path: os.statx(path, mask, follow_symlinks=False)
+
+
+def physical_offset(path: os.PathLike) -> Optional[int]:
+    """
+    Returns the physical offset of the first extent of a file on its device, with the FIEMAP ioctl (Linux). The file
+    is opened, but none of its contents are read
+    :param path: os.PathLike
+    :return: Optional[int]
+        Offset in bytes, None if it is unknown, e.g. for empty files, file systems without FIEMAP (tmpfs, NFS) or
+        other systems
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return None
+    request = bytearray(_FIEMAP_REQUEST)
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0) | getattr(os, "O_CLOEXEC", 0))
+        try:
+            fcntl.ioctl(fd, FS_IOC_FIEMAP, request, True)
+        finally:
+            os.close(fd)
+    except OSError:
+        return None
+    mapped_extents, = struct.unpack_from("=I", request, 20)
+    physical, = struct.unpack_from("=Q", request, 40)
+    flags, = struct.unpack_from("=I", request, 72)
+    if not mapped_extents or flags & (FIEMAP_EXTENT_UNKNOWN | FIEMAP_EXTENT_DELALLOC):
+        return None
+    return physical
+
+
+def read_order(stats: Sequence[os.stat_result], paths: Sequence[str], order: str) -> List[int]:
+    """
+    Returns the order in which files are read, so reads of a spinning disk go mostly in one direction instead of
+    seeking back and forth. Inode numbers roughly follow the on-disk layout on ext4 and XFS, whose inodes are placed
+    near the data of their block group, while physical offsets give the exact layout
+    :param stats: Sequence[os.stat_result]
+        Stats of the files
+    :param paths: Sequence[str]
+        Paths of the files, used to look up physical offsets
+    :param order: str
+        'scan' (as listed), 'inode' or 'physical' (files without a known offset follow in inode order)
+    :return: List[int]
+        Indices of the files in reading order
+    """
+    indices = range(len(stats))
+    if order == "scan":
+        return list(indices)
+    if order == "inode":
+        return sorted(indices, key=lambda i: stats[i].st_ino)
+    if order == "physical":
+        offsets = [physical_offset(path) for path in paths]
+        return sorted(indices, key=lambda i: (offsets[i] is None, offsets[i] or 0, stats[i].st_ino))
+    raise ValueError(f"invalid read order: {order}")
+
+
+def read_mount_types(mountinfo: os.PathLike = "/proc/self/mountinfo") -> Dict[str, str]:
+    """
+    Reads the file system type of every mounted device
+    :param mountinfo: os.PathLike
+        Path to the mountinfo file of the process
+    :return: Dict[str, str]
+        Map of 'major:minor' device numbers to file system types, empty if mountinfo can't be read
+    """
+    types = {}
+    try:
+        with open(mountinfo, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                # 36 35 98:0 /mnt1 /mnt2 rw,noatime master:1 - ext3 /dev/root rw,errors=continue
+                fields, _, rest = line.partition(" - ")
+                fields, rest = fields.split(), rest.split()
+                if len(fields) > 2 and rest:
+                    types.setdefault(fields[2], rest[0])
+    except OSError as e:
+        logger.debug("Could not read %s: %s", mountinfo, e)
+    return types
+
+
+def file_system_type(path: os.PathLike, mountinfo: os.PathLike = "/proc/self/mountinfo") -> str:
+    """
+    Returns the type of the file system holding a path
+    :param path: os.PathLike
+    :param mountinfo: os.PathLike
+        Path to the mountinfo file of the process
+    :return: str
+        Type as in the mount table, e.g. 'ext4' or 'fuse.sshfs', empty if it isn't known
+    """
+    st_dev = os.stat(path).st_dev
+    return read_mount_types(mountinfo).get(f"{os.major(st_dev)}:{os.minor(st_dev)}", "")
+
+
+def device_kind(st_dev: int, mount_types: Dict[str, str], sys_root: os.PathLike = "/sys") -> str:
+    """
+    Classifies the device holding a file system from the mount table and block device metadata in sysfs
+    :param st_dev: int
+        Device number as in st_dev
+    :param mount_types: Dict[str, str]
+        Map of 'major:minor' device numbers to file system types, as returned by read_mount_types
+    :param sys_root: os.PathLike
+        Mount point of sysfs
+    :return: str
+        'network', 'memory', 'nvme', 'ssd', 'rotational' or 'unknown'
+    """
+    device = f"{os.major(st_dev)}:{os.minor(st_dev)}"
+    fs_type = mount_types.get(device, "")
+    if fs_type in NETWORK_FILE_SYSTEMS or fs_type.startswith("fuse."):
+        return "network"
+    if fs_type in MEMORY_FILE_SYSTEMS:
+        return "memory"
+
+    block = os.path.realpath(os.path.join(sys_root, "dev", "block", device))
+    if not os.path.isdir(block):
+        return "unknown"
+    # partitions inherit the queue of their disk
+    if os.path.exists(os.path.join(block, "partition")):
+        block = os.path.dirname(block)
+    if os.path.basename(block).startswith("nvme"):
+        return "nvme"
+    try:
+        with open(os.path.join(block, "queue", "rotational")) as f:
+            return "rotational" if f.read().strip() == "1" else "ssd"
+    except OSError:
+        return "unknown"
+
+
+class DeviceScheduler:
+    """
+    Runs stat calls of every device in its own pool of threads, sized by the kind of the device unless the number
+    of workers is fixed, so each mount of a scan runs at the concurrency it handles best and a slow device doesn't
+    take workers from a fast one.
+
+    Attributes:
+        workers : Optional[int]
+            Number of workers used for every device, chosen per kind of device if None
+        kinds : Dict[int, str]
+            Map of device numbers seen so far to their kinds
+
+    Methods:
+        concurrency(st_dev: int):
+            Number of calls run in parallel on the device
+        map(st_dev: int, function: Callable, items: Sequence):
+            Calls the function with every item, in parallel on the pool of the device
+        close():
+            Shuts the pools down, they are started again by the next call of map
+    """
+    def __init__(self, workers: Optional[int] = None, sys_root: os.PathLike = "/sys",
+                 mountinfo: os.PathLike = "/proc/self/mountinfo") -> None:
+        """
+        Constructs all necessary attributes for the DeviceScheduler object
+        :param workers: Optional[int]
+            Number of workers used for every device, chosen per kind of device if None
+        :param sys_root: os.PathLike
+            Mount point of sysfs
+        :param mountinfo: os.PathLike
+            Path to the mountinfo file of the process
+        """
+        if workers is not None and workers < 1:
+            raise ValueError("at least one worker is needed")
+        self.workers: Optional[int] = workers
+        self.kinds: Dict[int, str] = {}
+        self._sys_root = sys_root
+        self._mount_types = read_mount_types(mountinfo) if workers is None else {}
+        self._pools: Dict[int, ThreadPoolExecutor] = {}
+
+    def concurrency(self, st_dev: int) -> int:
+        """
+        Returns the number of calls run in parallel on the device
+        :param st_dev: int
+        :return: int
+        """
+        if self.workers is not None:
+            return self.workers
+        kind = self.kinds.get(st_dev)
+        if kind is None:
+            kind = self.kinds[st_dev] = device_kind(st_dev, self._mount_types, self._sys_root)
+            logger.debug("Device %s:%s is %s", os.major(st_dev), os.minor(st_dev), kind)
+        return DEVICE_CONCURRENCY[kind]
+
+    def map(self, st_dev: int, function: Callable, items: Sequence) -> List:
+        """
+        Calls the function with every item, in parallel on the pool of the device
+        :param st_dev: int
+            Device holding the items
+        :param function: Callable
+            Function which must not raise, e.g. one returning exceptions
+        :param items: Sequence
+        :return: List
+            Results in the order of the items
+        """
+        workers = self.concurrency(st_dev)
+        if workers == 1 or len(items) < 2:
+            return [function(item) for item in items]
+        pool = self._pools.get(st_dev)
+        if pool is None:
+            pool = self._pools[st_dev] = ThreadPoolExecutor(workers, thread_name_prefix=f"fsa-dev{st_dev}")
+        return list(pool.map(function, items))
+
+    def close(self) -> None:
+        for pool in self._pools.values():
+            pool.shutdown()
+        self._pools.clear()
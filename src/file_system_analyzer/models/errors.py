@@ -0,0 +1,66 @@
+from typing import Dict, List, Tuple
+
+# maximum number of failing paths kept as examples
+MAX_ERROR_SAMPLES = 20
+
+
+class ScanErrors:
+    """
+    Aggregated errors of a scan. Every failure is counted by stage and exception type, but only the first
+    MAX_ERROR_SAMPLES failing paths are kept, so a volume with heavy churn can't exhaust memory or flood the output.
+
+    Attributes:
+        counts : Dict[str, int]
+            Map of 'stage: ExceptionType' keys to the number of failures
+        samples : List[Tuple[str, str, str]]
+            First failures as (stage, path, message) triples
+        max_samples : int
+            Maximum number of samples kept
+
+    Methods:
+        record(stage: str, path: str, error: BaseException):
+            Counts a failure
+        total:
+            Number of failures
+    """
+    def __init__(self, max_samples: int = MAX_ERROR_SAMPLES) -> None:
+        """
+        Constructs all necessary attributes for the ScanErrors object
+        :param max_samples: int
+            Maximum number of failing paths kept as examples
+        """
+        self.max_samples: int = max_samples
+        self.counts: Dict[str, int] = {}
+        self.samples: List[Tuple[str, str, str]] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.counts)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def record(self, stage: str, path: str, error: BaseException) -> None:
+        """
+        Counts a failure
+        :param stage: str
+            Part of the scan which failed, e.g. 'directory', 'stat' or 'classify'
+        :param path: str
+            Path of the entry which failed
+        :param error: BaseException
+        :return: None
+        """
+        key = f"{stage}: {type(error).__name__}"
+        self.counts[key] = self.counts.get(key, 0) + 1
+        if len(self.samples) < self.max_samples:
+            self.samples.append((stage, str(path), str(error)))
+
+    def to_dict(self) -> Dict:
+        return {"counts": self.counts, "samples": [list(s) for s in self.samples]}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ScanErrors":
+        errors = cls()
+        errors.counts = dict(data["counts"])
+        errors.samples = [tuple(s) for s in data["samples"]]
+        return errors
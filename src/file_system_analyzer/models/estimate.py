@@ -0,0 +1,285 @@
+import math
+import os
+import random
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .errors import ScanErrors
+from ..logging_config import logger
+
+# number of files classified per stratum by default
+DEFAULT_SAMPLES_PER_STRATUM = 20
+
+# standard normal quantile of the two-sided 95% confidence interval
+Z_95 = 1.959964
+
+
+@dataclass
+class Stratum:
+    """
+    Files sharing an extension and a size bucket
+
+    Attributes:
+        count : int
+            Number of files of the stratum
+        size : int
+            Cumulative size of all files of the stratum
+        sample : List[Tuple[str, int]]
+            Uniform random sample of (path, size) pairs of the stratum's files
+    """
+    count: int = 0
+    size: int = 0
+    sample: List[Tuple[str, int]] = field(default_factory=list)
+
+
+@dataclass
+class CategoryEstimate:
+    """
+    Estimated totals of a category with margins of their 95% confidence intervals
+
+    Attributes:
+        size : float
+            Estimated cumulative size of the category's files
+        size_margin : float
+            Half-width of the confidence interval of size
+        count : float
+            Estimated number of the category's files
+        count_margin : float
+            Half-width of the confidence interval of count
+    """
+    size: float = 0.0
+    size_margin: float = 0.0
+    count: float = 0.0
+    count_margin: float = 0.0
+
+
+@dataclass
+class Estimate:
+    """
+    Result of a sampled scan
+
+    Attributes:
+        categories : Dict[str, CategoryEstimate]
+            Map of categories to their estimated totals
+        files : int
+            Number of files found by the walk
+        size : int
+            Cumulative size of all files found by the walk
+        sampled : int
+            Number of files which were classified
+        strata : int
+            Number of strata the files were divided into
+        failed : int
+            Number of sampled files which couldn't be classified, they are left out of their strata's samples
+        unclassified_files : int
+            Number of files of strata none of whose sampled files could be classified
+        unclassified_size : int
+            Cumulative size of the files of those strata, which isn't attributed to any category
+        errors : ScanErrors
+            Entries which failed during the walk and sampled files which failed to be classified
+    """
+    categories: Dict[str, CategoryEstimate]
+    files: int
+    size: int
+    sampled: int
+    strata: int
+    failed: int = 0
+    unclassified_files: int = 0
+    unclassified_size: int = 0
+    errors: ScanErrors = field(default_factory=ScanErrors)
+
+
+class StratifiedSampler:
+    """
+    Keeps a fixed-size uniform sample of files per stratum (extension and power-of-two size bucket) using reservoir
+    sampling, so the number of classified files is bounded however large the tree is. Category totals are
+    extrapolated with ratio estimators against the exactly known totals of every stratum.
+
+    Attributes:
+        samples_per_stratum : int
+            Maximum number of files classified per stratum
+        strata : Dict[Tuple[str, int], Stratum]
+            Map of (extension, size bucket) pairs to their strata
+
+    Methods:
+        add(path: str, size: int):
+            Records a file found by the walk
+        estimate(classify: Callable[[str], str]):
+            Classifies the sampled files and extrapolates category totals
+    """
+    def __init__(self, samples_per_stratum: int = DEFAULT_SAMPLES_PER_STRATUM, seed: Optional[int] = None) -> None:
+        """
+        Constructs all necessary attributes for the StratifiedSampler object
+        :param samples_per_stratum: int
+            Maximum number of files classified per stratum, at least 2 so the variance can be estimated
+        :param seed: Optional[int]
+            Seed of the random generator, for reproducible samples
+        """
+        if samples_per_stratum < 2:
+            raise ValueError("at least 2 samples per stratum are needed")
+        self.samples_per_stratum: int = samples_per_stratum
+        self.strata: Dict[Tuple[str, int], Stratum] = defaultdict(Stratum)
+        self._random = random.Random(seed)
+
+    def add(self, path: str, size: int) -> None:
+        """
+        Records a file found by the walk
+        :param path: str
+            Path to the file
+        :param size: int
+            Size of the file in bytes
+        :return: None
+        """
+        stratum = self.strata[(os.path.splitext(path)[1].lower(), size.bit_length())]
+        stratum.count += 1
+        stratum.size += size
+        if len(stratum.sample) < self.samples_per_stratum:
+            stratum.sample.append((path, size))
+        else:
+            # algorithm R: the i-th file replaces a random sampled one with probability k/i
+            i = self._random.randrange(stratum.count)
+            if i < self.samples_per_stratum:
+                stratum.sample[i] = (path, size)
+
+    def estimate(self, classify: Callable[[str], str], z: float = Z_95,
+                 errors: Optional[ScanErrors] = None) -> Estimate:
+        """
+        Classifies the sampled files and extrapolates category totals. A sampled file which fails to be classified
+        (e.g. one removed since the walk) is left out of the sample of its stratum, whose remaining files are still
+        a uniform sample of it. Strata without any classified file are reported as unclassified
+        :param classify: Callable[[str], str]
+            Function inferring the category of a file from its path
+        :param z: float
+            Quantile of the standard normal distribution for the confidence level, 95% by default
+        :param errors: Optional[ScanErrors]
+            Failures are counted here, a new ScanErrors is created if None
+        :return: Estimate
+        """
+        errors = ScanErrors() if errors is None else errors
+        sizes = defaultdict(float)
+        size_variances = defaultdict(float)
+        counts = defaultdict(float)
+        count_variances = defaultdict(float)
+        sampled = failed = unclassified_files = unclassified_size = 0
+
+        for stratum in self.strata.values():
+            classified = []
+            for path, size in stratum.sample:
+                try:
+                    classified.append((classify(path), size))
+                except Exception as e:
+                    errors.record("classify", path, e)
+                    logger.debug("Error classifying sampled file %s: %s", path, e)
+            failed += len(stratum.sample) - len(classified)
+            n, population = len(classified), stratum.count
+            sampled += n
+            if not n:
+                unclassified_files += population
+                unclassified_size += stratum.size
+                continue
+            sample_size = 0
+            sample_squares = 0
+            category_sizes = defaultdict(int)
+            category_squares = defaultdict(int)
+            category_counts = defaultdict(int)
+            for category, size in classified:
+                sample_size += size
+                sample_squares += size * size
+                category_sizes[category] += size
+                category_squares[category] += size * size
+                category_counts[category] += 1
+
+            # finite population correction, strata which were sampled completely are exact
+            correction = (1 - n / population) * population ** 2 / n
+            for category in category_counts:
+                # ratio estimator of the category's share of the stratum's bytes, which are known exactly. With
+                # residuals d = x * (1[c] - r), the sum of d^2 has a closed form in the sums of squares
+                ratio = category_sizes[category] / sample_size if sample_size else 0.0
+                sizes[category] += ratio * stratum.size
+                if n > 1 and sample_size:
+                    squares = category_squares[category]
+                    residuals = squares * (1 - ratio) ** 2 + (sample_squares - squares) * ratio ** 2
+                    size_variances[category] += correction * residuals / (n - 1)
+
+                share = category_counts[category] / n
+                counts[category] += share * population
+                if n > 1:
+                    count_variances[category] += correction * share * (1 - share) * n / (n - 1)
+
+        categories = {
+            category: CategoryEstimate(sizes[category], z * math.sqrt(size_variances[category]),
+                                       counts[category], z * math.sqrt(count_variances[category]))
+            for category in counts
+        }
+        return Estimate(categories, sum(s.count for s in self.strata.values()),
+                        sum(s.size for s in self.strata.values()), sampled, len(self.strata), failed,
+                        unclassified_files, unclassified_size, errors)
+
+
+def estimate_categories(dir_path: os.PathLike, classify: Callable[[str], str],
+                        samples_per_stratum: int = DEFAULT_SAMPLES_PER_STRATUM,
+                        seed: Optional[int] = None, errors: Optional[ScanErrors] = None) -> Estimate:
+    """
+    Walks the directory tree collecting sizes of all files, but classifies only a stratified sample of them
+    :param dir_path: os.PathLike
+        Directory to be analyzed
+    :param classify: Callable[[str], str]
+        Function inferring the category of a file from its path
+    :param samples_per_stratum: int
+        Maximum number of files classified per stratum
+    :param seed: Optional[int]
+        Seed of the random generator, for reproducible samples
+    :param errors: Optional[ScanErrors]
+        Failures of the walk and of the classification are counted here, a new ScanErrors is created if None
+    :return: Estimate
+    """
+    sampler = StratifiedSampler(samples_per_stratum, seed)
+    errors = ScanErrors() if errors is None else errors
+    pending = [dir_path]
+    while pending:
+        path = pending.pop()
+        try:
+            with os.scandir(path) as entries:
+                entries = list(entries)
+        except OSError as e:
+            errors.record("directory", path, e)
+            logger.debug("Error listing directory %s: %s", path, e)
+            continue
+        for entry in entries:
+            # a failing entry, e.g. one removed since the directory was listed, doesn't drop its siblings from the
+            # strata, which would bias the estimate
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    sampler.add(entry.path, entry.stat(follow_symlinks=False).st_size)
+            except OSError as e:
+                errors.record("stat", entry.path, e)
+                logger.debug("Error reading metadata of %s: %s", entry.path, e)
+    return sampler.estimate(classify, errors=errors)
+
+
+def chain_classify(classifiers: Sequence, errors: Optional[ScanErrors] = None) -> Callable[[str], str]:
+    """
+    Returns a function classifying a single file with a chain of classifiers, the same way as the full scan: every
+    classifier is asked in turn and files none of them can decide are 'other'
+    :param classifiers: Sequence[Classifier]
+        Chain of classifiers
+    :param errors: Optional[ScanErrors]
+        Failures of single classifiers are counted here if provided
+    :return: Callable[[str], str]
+        Function raising OSError for files which can't be stat'ed, e.g. ones removed since the walk
+    """
+    from .file_system_analyzer import FileMetadata
+
+    def classify(path: str) -> str:
+        file_stat = os.stat(path, follow_symlinks=False)
+        file = FileMetadata(path, file_stat.st_size, file_stat.st_mode)
+        for classifier in classifiers:
+            category = classifier.classify_many([file], errors)[0]
+            if category is not None:
+                return category
+        return "other"
+
+    return classify
@@ -1,28 +1,45 @@
 import os
+import time
 from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import List, Dict
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Dict, Optional, Sequence, Tuple
 
 from .utils import (
     get_permissions,
-    infer_file_type_magic,
-    infer_file_type_extension,
     detect_unusual_permissions,
     convert_size,
+    allocated_size,
+    magic_available,
 )
+from .aging import AgeHistograms
+from .audit import SecurityAuditor
+from .errors import ScanErrors
+from .devices import READ_ORDERS, DeviceScheduler, read_order, statx_function
+from .getdents import check_listing_backend, list_directory
+from .checkpoint import (DEFAULT_CHECKPOINT_INTERVAL, RecordJournal, journal_path, read_checkpoint, read_journal,
+                         write_checkpoint)
+from .permissions import FLAG_NAMES, analyze_modes, decode_counts, decode_flags
+from .spill import SpillStore
+from .throttle import IOThrottle
 from ..logging_config import logger
 
-# optional dependency (python-magic)
-try:
-    import magic
-except ImportError:
-    magic = None
+# archives (zipfile, tarfile), classifiers (sniffing) and sharding are imported only by the scans which use them
+if TYPE_CHECKING:
+    from .archives import ArchiveSummary
+    from .classifiers import Classifier
 
+# sizes which can drive the large file threshold
+SIZE_MODES = ("apparent", "allocated")
 
-@dataclass
+# number of journaled file records aggregated at once when a scan is resumed
+JOURNAL_REPLAY_BATCH = 1000
+
+
+@dataclass(slots=True)
 class FileMetadata:
     """
-    Holds metadata for a file
+    Holds metadata for a file. Instances are slotted, since one is created for every file of the scan
 
     Attributes:
         path : os.PathLike
@@ -31,10 +48,19 @@ class FileMetadata:
             File size in bytes
         permissions : int
             Raw permission bits (mode)
+        allocated_size : Optional[int]
+            Size the file occupies on disk in bytes, the apparent size is assumed if unknown
+        category : Optional[str]
+            Inferred category of the file, None until it is classified
+        flags : int
+            Unusual permission flags as returned by permissions.permission_flags
     """
     path: os.PathLike
     size: int
     permissions: int
+    allocated_size: Optional[int] = None
+    category: Optional[str] = None
+    flags: int = 0
 
     @property
     def processed_permissions(self) -> Dict:
@@ -48,6 +74,25 @@ class FileMetadata:
     def converted_size(self) -> str:
         return convert_size(self.size)
 
+    @property
+    def converted_allocated_size(self) -> str:
+        return convert_size(self.size if self.allocated_size is None else self.allocated_size)
+
+    @property
+    def is_sparse(self) -> bool:
+        return self.allocated_size is not None and self.allocated_size < self.size
+
+    def measured_size(self, size_mode: str) -> int:
+        """
+        Returns the size selected by the size mode
+        :param size_mode: str
+            'apparent' for st_size, 'allocated' for the size occupied on disk
+        :return: int
+        """
+        if size_mode == "allocated" and self.allocated_size is not None:
+            return self.allocated_size
+        return self.size
+
 
 @dataclass
 class CategoryFiles:
@@ -58,15 +103,33 @@ class CategoryFiles:
         size : int
             Cumulative size of all files of the category
         files : List[FileMetadata]
-            Collection of all individual files that belong to this category
+            Collection of all individual files that belong to this category, a SpilledFiles list in scans with a
+            memory limit
+        archived_size : int
+            Cumulative uncompressed size of archive members that belong to this category
+        archived_count : int
+            Number of archive members that belong to this category
+        allocated_size : int
+            Cumulative size all files of the category occupy on disk
     """
     size: int = 0
     files: List[FileMetadata] = field(default_factory=list)
+    archived_size: int = 0
+    archived_count: int = 0
+    allocated_size: int = 0
 
     @property
     def converted_size(self) -> str:
         return convert_size(self.size)
 
+    @property
+    def converted_archived_size(self) -> str:
+        return convert_size(self.archived_size)
+
+    @property
+    def converted_allocated_size(self) -> str:
+        return convert_size(self.allocated_size)
+
 
 class FileSystemAnalyzer:
     """
@@ -77,109 +140,697 @@ class FileSystemAnalyzer:
             Path to the directory to traverse and categorize
         threshold : int
             Threshold which determines which files are large
+        size_mode : str
+            Size compared against the threshold, 'apparent' (st_size) or 'allocated' (st_blocks * 512)
+        age_histograms : Optional[AgeHistograms]
+            Per-category histograms of bytes by modification and access age, if provided
         _files_by_category : dict[str, dict]
             Map of categories to their files and total size
-        _large_files : list[os.PathLike]
-            List of paths of the large files
-        _unusual_permissions_files : list[os.PathLike]
-            List of paths of files with unusual permissions
+        _large_files : dict[os.PathLike, int]
+            Map of paths of the large files to their measured sizes in bytes, formatted only when read
+        _unusual_permissions_files : dict[os.PathLike, int]
+            Map of paths of files with unusual permissions to their permission flags
+        _permission_counts : list[int]
+            Number of files having each unusual permission, indexed like permissions.UNUSUAL_PERMISSIONS
         _magic_available: bool
             True if magic was imported successfully, otherwise false
+        shard : Optional[Tuple[int, int]]
+            Pair (index, count) restricting the scan to top-level entries of one shard, 1-based index
+        auditor : Optional[SecurityAuditor]
+            Security audit stage run against every file in the same pass, if provided
+        inspect_archives : bool
+            Whether members of archives are listed and folded into category totals
+        max_archive_bytes : Optional[int]
+            Budget of bytes read from a single archive, if archives are inspected
+        archive_workers : int
+            Number of worker threads inspecting archives
+        _archive_summaries : dict[os.PathLike, ArchiveSummary]
+            Map of paths of inspected archives to their members aggregated by category
+        throttle : Optional[IOThrottle]
+            Rate limiter charged for directory listings, stats and content reads, if provided
+        checkpoint_path : Optional[os.PathLike]
+            File the state of the scan is periodically written to, if provided
+        checkpoint_interval : float
+            Minimum number of seconds between two checkpoints
+        _journal : Optional[RecordJournal]
+            Journal of file records next to the checkpoint, open while a checkpointed scan runs
+        _pending : Optional[List[str]]
+            Stack of directories which are still to be traversed, None before the scan starts
+        visitors : List[Callable[[FileMetadata], None]]
+            Functions called with every file as soon as it is classified
+        errors : ScanErrors
+            Counts of entries which failed, with a bounded sample of their paths
+        classifiers : List[Classifier]
+            Chain of classifiers, each one is asked about the files the previous ones couldn't decide
+        listing_backend : str
+            How directories are listed, 'scandir' or 'getdents', 'auto' is resolved for the root
+        scheduler : Optional[DeviceScheduler]
+            Runs stat calls of every device in parallel at a concurrency suiting the device, if provided
+        read_order : str
+            Order in which content classifiers read the files of a directory, 'scan', 'inode' or 'physical'
+        spill_store : Optional[SpillStore]
+            Keeps file lists of categories within a memory limit by spilling them to temporary files, if provided
 
     Methods:
         categorize_files():
             Calls directory traversal method on the provided dir_path
+        iter_files():
+            Yields classified files as they are produced, without keeping them in memory
+        _walk_directories(checkpoints: bool):
+            Traverses pending directories depth-first, yielding the classified files of one directory at a time
         get_files_by_category():
             Getter for _files_by_category
         get_large_files():
             Getter for _large_files
         get_unusual_permissions_files():
             Getter for _unusual_permissions_files
+        close():
+            Removes the temporary files of spilled file lists
+        save_checkpoint(path: os.PathLike):
+            Atomically writes the pending directories and the aggregates collected so far
+        resume(path: os.PathLike, throttle: Optional[IOThrottle]):
+            Creates an analyzer which continues the scan saved in a checkpoint
         _traverse_directory(path: os.PathLike):
-            Recursively traverses the directory and stored necessary metadata
+            Returns the classified files of a directory and pushes its subdirectories onto the pending stack
+        _process_entries(path: os.PathLike, entries: List[os.DirEntry], dir_stat: Optional[os.stat_result]):
+            Classifies files among the entries of a directory in one batch and returns them with its subdirectories
+        _run_file_stages(path: os.PathLike, files: List[FileMetadata], stats: List[os.stat_result],
+                         dir_stat: Optional[os.stat_result]):
+            Runs the audit, archive, age and visitor stages on the files of a directory, counting their failures
+        _stat_entries(entries: List[os.DirEntry], dir_stat: Optional[os.stat_result]):
+            Stats files of a directory, in parallel on its device if a scheduler is set
+        _classify(files: List[FileMetadata], stats: Sequence[os.stat_result]):
+            Infers categories of a batch of files with the chain of classifiers
+        _record_files(files: List[FileMetadata]):
+            Adds the classified files of a directory to the in-memory result
     """
-    def __init__(self, dir_path: os.PathLike, threshold: int) -> None:
+    def __init__(self, dir_path: os.PathLike, threshold: int, shard: Optional[Tuple[int, int]] = None,
+                 auditor: Optional[SecurityAuditor] = None, inspect_archives: bool = False,
+                 max_archive_bytes: Optional[int] = None, archive_workers: int = 4,
+                 size_mode: str = "apparent", age_histograms: Optional[AgeHistograms] = None,
+                 throttle: Optional[IOThrottle] = None, checkpoint_path: Optional[os.PathLike] = None,
+                 checkpoint_interval: float = DEFAULT_CHECKPOINT_INTERVAL,
+                 visitors: Optional[Iterable[Callable[[FileMetadata], None]]] = None,
+                 classifiers: Optional[Sequence["Classifier"]] = None, listing_backend: str = "scandir",
+                 scheduler: Optional[DeviceScheduler] = None, read_order: str = "scan",
+                 memory_limit: Optional[int] = None, spill_dir: Optional[os.PathLike] = None) -> None:
         """
         Constructs all necessary attributes for the FileSystemAnalyzer object
         :param dir_path: os.PathLike
             Path to the directory to traverse and categorize
         :param threshold: int
             Threshold which determines which files are large
+        :param shard: Optional[Tuple[int, int]]
+            Pair (index, count) with 1 <= index <= count. If provided, only top-level entries assigned
+            to this shard are scanned
+        :param auditor: Optional[SecurityAuditor]
+            Security audit stage run against every file in the same pass
+        :param inspect_archives: bool
+            Whether members of zip and tar archives are listed, without extracting them, and folded into
+            category totals
+        :param max_archive_bytes: Optional[int]
+            Budget of bytes read from a single archive, DEFAULT_MAX_ARCHIVE_BYTES of the archives module if None
+        :param archive_workers: int
+            Number of worker threads inspecting archives, so big archives don't serialize the scan
+        :param size_mode: str
+            Size compared against the threshold, 'apparent' (st_size) or 'allocated' (st_blocks * 512), which
+            differ for sparse files
+        :param age_histograms: Optional[AgeHistograms]
+            Histograms of bytes by age aggregated in the same pass, for tiering decisions
+        :param throttle: Optional[IOThrottle]
+            Rate limiter for metadata operations and content reads, so scans of busy hosts don't cause latency spikes
+        :param checkpoint_path: Optional[os.PathLike]
+            File the state of the scan is periodically written to, so an interrupted scan can be resumed
+        :param checkpoint_interval: float
+            Minimum number of seconds between two checkpoints
+        :param visitors: Optional[Iterable[Callable[[FileMetadata], None]]]
+            Functions called with every file as soon as it is classified, e.g. to filter or ship records
+        :param classifiers: Optional[Sequence[Classifier]]
+            Chain of classifiers, files none of them can decide are 'other'. Defaults to libmagic with a fallback
+            to extensions, or extensions only if libmagic is missing
+        :param listing_backend: str
+            How directories are listed: 'scandir' (portable), 'getdents' (bulk getdents64 calls with a large buffer,
+            Linux only, falls back to scandir elsewhere) or 'auto', which uses getdents if the root is on a FUSE
+            mount of a remote store
+        :param scheduler: Optional[DeviceScheduler]
+            Runs stat calls of the files of a directory in parallel, with a concurrency chosen for the device
+            holding the directory. Stats are serial if not provided
+        :param read_order: str
+            Order in which classifiers reading file contents get the files of a directory: 'scan' (as listed),
+            'inode' or 'physical' (FIEMAP offsets), which make reads of spinning disks mostly sequential
+        :param memory_limit: Optional[int]
+            Approximate bytes of file records kept in memory. Beyond it, file lists of categories are spilled to
+            sorted run files and streamed back when iterated, so scans of any size finish in fixed memory
+        :param spill_dir: Optional[os.PathLike]
+            Directory for the run files, the system temporary directory if None
         """
+        if size_mode not in SIZE_MODES:
+            raise ValueError(f"invalid size mode: {size_mode}")
+        if read_order not in READ_ORDERS:
+            raise ValueError(f"invalid read order: {read_order}")
+        if shard is not None and not (0 < shard[0] <= shard[1]):
+            raise ValueError(f"invalid shard: {shard[0]}/{shard[1]}")
         self.dir_path: os.PathLike = dir_path
         self.threshold: int = threshold
+        self.size_mode: str = size_mode
+        self.age_histograms: Optional[AgeHistograms] = age_histograms
+        self.throttle: Optional[IOThrottle] = throttle
+        self.checkpoint_path: Optional[os.PathLike] = checkpoint_path
+        self.checkpoint_interval: float = checkpoint_interval
+        self._journal: Optional[RecordJournal] = None
+        # journal of the checkpoint the scan was resumed from, with its committed length
+        self._resumed_journal: Optional[Tuple[str, int]] = None
+        self._pending: Optional[List[str]] = None
+        self.visitors: List[Callable[[FileMetadata], None]] = list(visitors or [])
+        self.errors: ScanErrors = ScanErrors()
+        self.listing_backend: str = check_listing_backend(listing_backend, dir_path)
+        self.scheduler: Optional[DeviceScheduler] = scheduler
+        self.read_order: str = read_order
+        self.spill_store: Optional[SpillStore] = SpillStore(memory_limit, spill_dir) if memory_limit else None
+        self.shard: Optional[Tuple[int, int]] = shard
+        self.auditor: Optional[SecurityAuditor] = auditor
+        # statx fetches only the fields used by the scan, owners only if they are audited
+        self._statx = statx_function(auditor is not None)
+        self.inspect_archives: bool = inspect_archives
+        if inspect_archives and max_archive_bytes is None:
+            from .archives import DEFAULT_MAX_ARCHIVE_BYTES
+            max_archive_bytes = DEFAULT_MAX_ARCHIVE_BYTES
+        self.max_archive_bytes: Optional[int] = max_archive_bytes
+        self.archive_workers: int = archive_workers
+        self._archive_pool: Optional[ThreadPoolExecutor] = None
+        self._archive_futures: List[Tuple[os.PathLike, Future]] = []
+        self._archive_summaries: Dict[os.PathLike, "ArchiveSummary"] = {}
         self._files_by_category: Dict[str, CategoryFiles] = defaultdict(CategoryFiles)
-        self._large_files = {}
-        self._unusual_permissions_files = {}
-        self._magic_available = magic is not None
+        self._large_files: Dict[os.PathLike, int] = {}
+        self._unusual_permissions_files: Dict[os.PathLike, int] = {}
+        self._permission_counts: List[int] = [0] * len(FLAG_NAMES)
+        # optional dependency (python-magic), imported only once an analyzer is created
+        self._magic_available = magic_available()
         if not self._magic_available:
             logger.warning("File type inference by file signatures unavailable due to libmagic missing on the machine."
                         "File extensions will be used to categorize files instead.")
+        if classifiers is None:
+            from .classifiers import default_classifiers
+            classifiers = default_classifiers(self._magic_available)
+        self.classifiers: List["Classifier"] = list(classifiers)
 
     def categorize_files(self) -> None:
         """
-        Calls directory traversal method on the provided dir_path
+        Traverses the provided dir_path, or continues the traversal of a resumed scan, keeping all files in memory.
+        In shard mode only the top-level entries which belong to the shard are traversed
         :return: None
         """
-        self._traverse_directory(self.dir_path)
+        if self.inspect_archives:
+            self._archive_pool = ThreadPoolExecutor(self.archive_workers, thread_name_prefix="fsa-archive")
+        try:
+            # records are journaled as they are recorded, so checkpoints don't rewrite them
+            if self.checkpoint_path is not None:
+                self._open_journal(self.checkpoint_path)
+            for files in self._walk_directories(checkpoints=True):
+                self._record_files(files)
+
+            # the final checkpoint has no pending directories, resuming it only reproduces the report
+            if self.checkpoint_path is not None:
+                self.save_checkpoint(self.checkpoint_path)
+        finally:
+            if self._archive_pool is not None:
+                self._collect_archive_summaries()
+                self._archive_pool.shutdown()
+                self._archive_pool = None
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            # pools of the scheduler are started again by its next scan
+            if self.scheduler is not None:
+                self.scheduler.close()
+
+    def iter_files(self) -> Iterator[FileMetadata]:
+        """
+        Traverses the provided dir_path like categorize_files, but yields classified files as they are produced
+        instead of keeping them, so memory stays constant. Audit, age histograms, permission counts and visitors
+        still see every file, while files_by_category, large_files and unusual_permissions_files stay empty and
+        archives aren't inspected. The traversal can be consumed only once
+        :return: Iterator[FileMetadata]
+        """
+        try:
+            for files in self._walk_directories(checkpoints=False):
+                yield from files
+        finally:
+            if self.scheduler is not None:
+                self.scheduler.close()
+
+    def _scan_root(self) -> List[FileMetadata]:
+        if self.shard is None:
+            return self._traverse_directory(self.dir_path)
+
+        from .sharding import shard_for_name
+        index, count = self.shard
+        try:
+            if self.throttle is not None:
+                self.throttle.op()
+            # top-level entries are partitioned deterministically by their name
+            entries = [entry for entry in list_directory(self.dir_path, self.listing_backend)
+                       if shard_for_name(entry.name, count) == index]
+            dir_stat = self._directory_stat(self.dir_path)
+            files, stats, subdirectories = self._process_entries(self.dir_path, entries, dir_stat)
+        except Exception as e:
+            self._fail("directory", self.dir_path, e)
+            return []
+        self._pending.extend(reversed(subdirectories))
+        self._run_file_stages(self.dir_path, files, stats, dir_stat)
+        return files
+
+    def _walk_directories(self, checkpoints: bool) -> Iterator[List[FileMetadata]]:
+        """
+        Traverses pending directories depth-first, in the same order as a recursive walk, yielding the files of
+        one directory at a time, so the consumer handles them in a batch instead of resuming the walk for every file
+        :param checkpoints: bool
+            Whether checkpoints are written between directories. Files of a directory are consumed before the
+            walk moves on, so a checkpoint always covers whole directories
+        :return: Iterator[List[FileMetadata]]
+        """
+        if self._pending is None:
+            self._pending = []
+            yield self._scan_root()
+
+        last_checkpoint = time.monotonic()
+        while self._pending:
+            yield self._traverse_directory(self._pending.pop())
+            if (checkpoints and self.checkpoint_path is not None
+                    and time.monotonic() - last_checkpoint >= self.checkpoint_interval):
+                self.save_checkpoint(self.checkpoint_path)
+                last_checkpoint = time.monotonic()
+
+    def _record_files(self, files: List[FileMetadata]) -> None:
+        """
+        Adds the classified files of a directory to the in-memory result. This runs for every file of the scan,
+        so attributes are bound to locals once per directory and every file looks up its category only once
+        :param files: List[FileMetadata]
+        :return: None
+        """
+        unusual_permissions_files = self._unusual_permissions_files
+        large_files = self._large_files
+        files_by_category = self._files_by_category
+        threshold = self.threshold
+        allocated = self.size_mode == "allocated"
+        spill_store = self.spill_store
+        for file in files:
+            # Track files with unusual permissions
+            if file.flags:
+                unusual_permissions_files[file.path] = file.flags
+
+            # Track large files (size above threshold), sizes are formatted only when the report is built
+            size = file.size
+            measured = file.allocated_size if allocated and file.allocated_size is not None else size
+            if measured > threshold:
+                large_files[file.path] = measured
+
+            # record size and files for the category
+            category_files = files_by_category[file.category]
+            if spill_store is not None and isinstance(category_files.files, list):
+                category_files.files = spill_store.new_list(file.category, category_files.files)
+            category_files.files.append(file)
+            category_files.size += size
+            category_files.allocated_size += file.allocated_size
+
+        if self._journal is not None:
+            self._journal.append(files)
+
+    def _open_journal(self, path: os.PathLike) -> RecordJournal:
+        """
+        Opens the journal of file records belonging to a checkpoint. The journal a scan was resumed from is continued
+        after its committed records, any other one is started with the records collected so far
+        :param path: os.PathLike
+            Checkpoint file
+        :return: RecordJournal
+        """
+        journal_file = journal_path(path)
+        if self._journal is not None:
+            if self._journal.path == journal_file:
+                return self._journal
+            self._journal.close()
+        if self._resumed_journal is not None and self._resumed_journal[0] == journal_file:
+            self._journal = RecordJournal(journal_file, self._resumed_journal[1])
+        else:
+            self._journal = RecordJournal(journal_file)
+            for category_files in self._files_by_category.values():
+                self._journal.append(category_files.files)
+        return self._journal
+
+    def _collect_archive_summaries(self) -> None:
+        """
+        Waits for archive inspections and folds uncompressed sizes of members into category totals. Archives and
+        members which couldn't be read are counted as errors instead of failing the scan
+        :return: None
+        """
+        for path, future in self._archive_futures:
+            try:
+                summary = future.result()
+            except Exception as e:
+                self._fail("archive", path, e)
+                continue
+            if summary is None:
+                continue
+            for name, error in summary.errors:
+                self._fail("archive member", f"{path}:{name}", error)
+            summary.errors = []
+            self._add_archive_summary(summary)
+        self._archive_futures = []
+
+    def _add_archive_summary(self, summary: "ArchiveSummary") -> None:
+        self._archive_summaries[summary.path] = summary
+        for category, size in summary.sizes.items():
+            category_files = self._files_by_category[category]
+            category_files.archived_size += size
+            category_files.archived_count += summary.counts[category]
 
     @property
     def files_by_category(self):
         return self._files_by_category
 
     @property
-    def large_files(self):
-        return self._large_files
+    def large_files(self) -> Dict[os.PathLike, str]:
+        # sizes are converted to strings with a unit only when the report is built
+        return {path: convert_size(size) for path, size in self._large_files.items()}
 
     @property
-    def unusual_permissions_files(self):
-        return self._unusual_permissions_files
+    def unusual_permissions_files(self) -> Dict[os.PathLike, List[str]]:
+        # flags are decoded to permission names only when the report is built
+        return {path: decode_flags(flags) for path, flags in self._unusual_permissions_files.items()}
 
-    def _traverse_directory(self, path: os.PathLike) -> None:
+    @property
+    def permission_counts(self) -> Dict[str, int]:
+        return decode_counts(self._permission_counts)
+
+    @property
+    def archive_summaries(self) -> Dict[os.PathLike, "ArchiveSummary"]:
+        return self._archive_summaries
+
+    def close(self) -> None:
+        """
+        Removes the temporary files of spilled file lists, once the files have been reported
+        :return: None
         """
-        Recursively traverses the directory and stored necessary metadata
+        if self.spill_store is not None:
+            self.spill_store.close()
+
+    def save_checkpoint(self, path: os.PathLike) -> None:
+        """
+        Atomically writes the pending directories and the aggregates collected so far. File records are appended
+        to a journal next to the checkpoint as they are recorded, the checkpoint only holds its committed length, so
+        a checkpoint costs the same however many files were scanned. Running archive inspections are awaited first,
+        so their results are part of the checkpoint
         :param path: os.PathLike
-            Directory to be traversed
+            Destination file
         :return: None
         """
+        if self._archive_futures:
+            self._collect_archive_summaries()
         try:
-            for entry in os.scandir(path):
-                # handle regular files
-                if entry.is_file():
-                    # skip symbolic links
-                    if entry.is_symlink():
-                        continue
-
-                    file_path = entry.path
-                    file_metadata = entry.stat()
-                    file_size = file_metadata.st_size
-                    file_mode = file_metadata.st_mode
-
-                    file = FileMetadata(file_path, file_size, file_mode)
-
-                    # Track files with unusual permissions
-                    if file.unusual_permissions:
-                        self._unusual_permissions_files[file_path] = file.unusual_permissions
-
-                    # Track large files (size above threshold)
-                    if file.size > self.threshold:
-                        self._large_files[file_path] = file.converted_size
-
-                    if self._magic_available:
-                        # if libmagic is available, use it to infer file type
-                        inferred_type = infer_file_type_magic(file_path)
-                    else:
-                        # if libmagic unavailable, use file extensions
-                        inferred_type = infer_file_type_extension(file_path)
-
-                    # record size and files for the category
-                    self._files_by_category[inferred_type].files.append(file)
-                    self._files_by_category[inferred_type].size += file_size
-
-                # recursively scan subdirectories
-                else:
-                    self._traverse_directory(entry.path)
-        except PermissionError as pe:
-            logger.error(f"Permission denied when traversing directory: {pe}")
+            journal_offset = self._open_journal(path).commit()
+            write_checkpoint({**self.checkpoint_state(), "journal_offset": journal_offset}, path)
+        except OSError as e:
+            logger.error(f"Error when writing checkpoint: {e}")
+            raise
+
+    def checkpoint_state(self) -> Dict:
+        """
+        Returns the state of the scan as a JSON-serializable dict. File records aren't part of it, category totals,
+        large files and unusual permissions are rebuilt from the journal when the scan is resumed
+        :return: Dict
+        """
+        return {
+            "dir_path": os.fspath(self.dir_path),
+            "threshold": self.threshold,
+            "shard": list(self.shard) if self.shard else None,
+            "size_mode": self.size_mode,
+            "inspect_archives": self.inspect_archives,
+            "max_archive_bytes": self.max_archive_bytes,
+            "pending": self._pending,
+            "permission_counts": self._permission_counts,
+            "archive_summaries": [summary.to_dict() for summary in self._archive_summaries.values()],
+            "auditor": self.auditor.to_dict() if self.auditor is not None else None,
+            "age_histograms": self.age_histograms.to_dict() if self.age_histograms is not None else None,
+            "errors": self.errors.to_dict(),
+        }
+
+    @classmethod
+    def resume(cls, path: os.PathLike, throttle: Optional[IOThrottle] = None,
+               checkpoint_interval: float = DEFAULT_CHECKPOINT_INTERVAL,
+               classifiers: Optional[Sequence["Classifier"]] = None, memory_limit: Optional[int] = None,
+               spill_dir: Optional[os.PathLike] = None) -> "FileSystemAnalyzer":
+        """
+        Creates an analyzer which continues the scan saved in a checkpoint, further checkpoints are written
+        to the same file. File records are restored from the journal of the checkpoint
+        :param path: os.PathLike
+            Checkpoint file written by save_checkpoint
+        :param throttle: Optional[IOThrottle]
+            Rate limiter for the rest of the scan
+        :param checkpoint_interval: float
+            Minimum number of seconds between two checkpoints
+        :param classifiers: Optional[Sequence[Classifier]]
+            Chain of classifiers for the rest of the scan, which isn't part of the checkpoint
+        :param memory_limit: Optional[int]
+            Approximate bytes of file records kept in memory, restored records are spilled beyond it too
+        :param spill_dir: Optional[os.PathLike]
+            Directory for the run files, the system temporary directory if None
+        :return: FileSystemAnalyzer
+        """
+        state = read_checkpoint(path)
+        analyzer = cls(
+            state["dir_path"], state["threshold"],
+            shard=tuple(state["shard"]) if state["shard"] else None,
+            auditor=SecurityAuditor.from_dict(state["auditor"]) if state["auditor"] is not None else None,
+            inspect_archives=state["inspect_archives"],
+            max_archive_bytes=state["max_archive_bytes"],
+            size_mode=state["size_mode"],
+            age_histograms=(AgeHistograms.from_dict(state["age_histograms"])
+                            if state["age_histograms"] is not None else None),
+            throttle=throttle,
+            checkpoint_path=path,
+            checkpoint_interval=checkpoint_interval,
+            classifiers=classifiers,
+            memory_limit=memory_limit,
+            spill_dir=spill_dir,
+        )
+        analyzer._pending = state["pending"]
+        # records are replayed in batches, so they are aggregated (and spilled) like the files of a live scan
+        journal_file, offset = journal_path(path), state["journal_offset"]
+        batch = []
+        for record in read_journal(journal_file, offset):
+            batch.append(FileMetadata(*record))
+            if len(batch) == JOURNAL_REPLAY_BATCH:
+                analyzer._record_files(batch)
+                batch = []
+        analyzer._record_files(batch)
+        analyzer._resumed_journal = (journal_file, offset)
+        analyzer._permission_counts = state["permission_counts"]
+        if state["archive_summaries"]:
+            from .archives import ArchiveSummary
+            for summary in state["archive_summaries"]:
+                analyzer._add_archive_summary(ArchiveSummary.from_dict(summary))
+        analyzer.errors = ScanErrors.from_dict(state["errors"])
+        return analyzer
+
+    def _traverse_directory(self, path: os.PathLike) -> List[FileMetadata]:
+        """
+        Returns the classified files of a directory and pushes its subdirectories onto the pending stack
+        :param path: os.PathLike
+            Directory to be traversed
+        :return: List[FileMetadata]
+            Files of the directory, empty if it can't be listed
+        """
+        try:
+            if self.throttle is not None:
+                self.throttle.op()
+            entries = list_directory(path, self.listing_backend)
+            dir_stat = self._directory_stat(path)
+            files, stats, subdirectories = self._process_entries(path, entries, dir_stat)
         except Exception as e:
-            logger.error(f"Error occurred when traversing the directory: {e}")
\ No newline at end of file
+            self._fail("directory", path, e)
+            return []
+        # pushed in reverse so subdirectories are popped in the order of a recursive walk
+        self._pending.extend(reversed(subdirectories))
+        # the per-file stages run once the directory is processed, so a failing one can't discard it
+        self._run_file_stages(path, files, stats, dir_stat)
+        return files
+
+    def _classify(self, files: List[FileMetadata], stats: Sequence[os.stat_result] = ()) -> List[str]:
+        """
+        Infers categories of a batch of files. Every classifier of the chain gets the files the previous ones
+        couldn't decide, or failed to read (e.g. files which vanished since they were listed). Classifiers reading
+        file contents get them in the read order
+        :param files: List[FileMetadata]
+        :param stats: Sequence[os.stat_result]
+            Stats of the files, needed unless the read order is 'scan'
+        :return: List[str]
+            Categories in the order of the files, 'other' where no classifier could decide
+        """
+        categories: List[Optional[str]] = [None] * len(files)
+        undecided = list(range(len(files)))
+        ranks = None
+        for classifier in self.classifiers:
+            if not undecided:
+                break
+            if classifier.read_bytes and self.read_order != "scan":
+                # the order is computed once per batch, only if some files are left to be read
+                if ranks is None:
+                    ranks = [0] * len(files)
+                    for rank, i in enumerate(read_order(stats, [file.path for file in files], self.read_order)):
+                        ranks[i] = rank
+                undecided.sort(key=ranks.__getitem__)
+            batch = [files[i] for i in undecided]
+            # content reads are charged before the classifier reads the files
+            if classifier.read_bytes and self.throttle is not None:
+                for file in batch:
+                    self.throttle.read(min(file.size, classifier.read_bytes))
+            still_undecided = []
+            for i, category in zip(undecided, classifier.classify_many(batch, self.errors)):
+                if category is None:
+                    still_undecided.append(i)
+                else:
+                    categories[i] = category
+            undecided = still_undecided
+        return [category or "other" for category in categories]
+
+    def _fail(self, stage: str, path: os.PathLike, error: Exception) -> None:
+        # failures are counted instead of logged one by one, debug logging is formatted only if enabled
+        self.errors.record(stage, path, error)
+        logger.debug("Error at %s stage for %s: %s", stage, path, error)
+
+    def _directory_stat(self, path: os.PathLike) -> Optional[os.stat_result]:
+        # stat of a directory is only needed by the audit stage, and by the scheduler to find its device
+        if self.auditor is None and self.scheduler is None:
+            return None
+        if self.throttle is not None:
+            self.throttle.op()
+        return os.stat(path)
+
+    def _stat_entries(self, entries: List[os.DirEntry], dir_stat: Optional[os.stat_result]) -> List:
+        """
+        Stats files of a directory, in parallel on the device of the directory if a scheduler is set
+        :param entries: List[os.DirEntry]
+            Entries of regular files
+        :param dir_stat: Optional[os.stat_result]
+            Stat of the directory, which identifies its device
+        :return: List[os.stat_result | OSError]
+            Stats in the order of the entries, or the errors of entries which failed
+        """
+        def stat_entry(entry):
+            try:
+                if self.throttle is not None:
+                    self.throttle.op()
+                if self._statx is not None:
+                    return self._statx(entry.path)
+                return entry.stat(follow_symlinks=False)
+            except OSError as e:
+                return e
+
+        if self.scheduler is None or dir_stat is None:
+            if self.throttle is None and self._statx is None:
+                # plain stats of DirEntry objects, without a function call per file around them
+                stats = []
+                for entry in entries:
+                    try:
+                        stats.append(entry.stat(follow_symlinks=False))
+                    except OSError as e:
+                        stats.append(e)
+                return stats
+            return [stat_entry(entry) for entry in entries]
+        return self.scheduler.map(dir_stat.st_dev, stat_entry, entries)
+
+    def _process_entries(self, path: os.PathLike, entries: List[os.DirEntry], dir_stat: Optional[os.stat_result] = None
+                         ) -> Tuple[List[FileMetadata], List[os.stat_result], List[str]]:
+        """
+        Classifies files among the entries of a directory in one batch
+        :param path: os.PathLike
+            Directory containing the entries
+        :param entries: List[os.DirEntry]
+            Entries produced by os.scandir, or Dirent entries of the getdents backend
+        :param dir_stat: Optional[os.stat_result]
+            Stat of the directory containing the entries, used by the scheduler
+        :return: Tuple[List[FileMetadata], List[os.stat_result], List[str]]
+            Classified files, their stats and paths of the subdirectories among the entries
+        """
+        files = []
+        stats = []
+        subdirectories = []
+        regular = []
+        # bound methods are looked up once per directory instead of once per entry
+        add_subdirectory, add_regular = subdirectories.append, regular.append
+        for entry in entries:
+            # a failing entry, e.g. one removed since the directory was listed, doesn't affect its siblings
+            try:
+                # most entries are regular files, so they are told apart with a single call
+                if entry.is_file(follow_symlinks=False):
+                    add_regular(entry)
+                elif entry.is_dir(follow_symlinks=False):
+                    add_subdirectory(entry.path)
+                # symbolic links and special files (devices, sockets, pipes) are skipped
+            except OSError as e:
+                self._fail("stat", entry.path, e)
+
+        add_file, add_stat = files.append, stats.append
+        for entry, file_metadata in zip(regular, self._stat_entries(regular, dir_stat)):
+            if isinstance(file_metadata, OSError):
+                self._fail("stat", entry.path, file_metadata)
+                continue
+            add_file(FileMetadata(entry.path, file_metadata.st_size, file_metadata.st_mode,
+                                  allocated_size(file_metadata)))
+            add_stat(file_metadata)
+
+        # permissions of all files of the directory are checked in one batch
+        permissions = analyze_modes([file.permissions for file in files])
+        for i, count in enumerate(permissions.counts):
+            self._permission_counts[i] += count
+
+        categories = self._classify(files, stats)
+        for file, flags, inferred_type in zip(files, permissions.flags.tolist(), categories):
+            file.flags = flags
+            file.category = inferred_type
+        return files, stats, subdirectories
+
+    def _run_file_stages(self, path: os.PathLike, files: List[FileMetadata], stats: List[os.stat_result],
+                         dir_stat: Optional[os.stat_result]) -> None:
+        """
+        Runs the optional per-file stages on the classified files of a directory. A stage failing on a file is
+        counted under its own stage, like 'visitor', and neither affects the other stages nor the rest of the scan
+        :param path: os.PathLike
+            Directory containing the files
+        :param files: List[FileMetadata]
+        :param stats: List[os.stat_result]
+            Stats of the files
+        :param dir_stat: Optional[os.stat_result]
+            Stat of the directory containing the files, used by the audit stage
+        :return: None
+        """
+        # the optional per-file stages cost nothing to scans which don't use them
+        auditor, age_histograms, visitors = self.auditor, self.age_histograms, self.visitors
+        if auditor is None and age_histograms is None and not visitors and self._archive_pool is None:
+            return
+
+        for file, file_metadata in zip(files, stats):
+            if auditor is not None:
+                try:
+                    auditor.check_file(file.path, file_metadata, dir_stat)
+                except Exception as e:
+                    self._fail("audit", file.path, e)
+
+            # list members of archives in the worker pool
+            if file.category == "archive" and self._archive_pool is not None:
+                from .archives import inspect_archive
+                self._archive_futures.append((file.path, self._archive_pool.submit(
+                    inspect_archive, file.path, self.max_archive_bytes, self._magic_available, self.throttle)))
+
+            if age_histograms is not None:
+                try:
+                    age_histograms.add(file.category, os.fspath(path), file.size, file_metadata.st_mtime,
+                                       file_metadata.st_atime)
+                except Exception as e:
+                    self._fail("age", file.path, e)
+
+            for visitor in visitors:
+                try:
+                    visitor(file)
+                except Exception as e:
+                    self._fail("visitor", file.path, e)
@@ -1,5 +1,3 @@
-import re
-
 APPLICATION_MIME_TO_CATEGORY = {
     "application/pdf": "document",
     "application/rtf": "document",
@@ -98,8 +96,6 @@ TERM_TO_CATEGORY = {
     "mach-o": "executable"
 }
 
-TERM_PATTERN = re.compile("|".join(re.escape(k) for k in TERM_TO_CATEGORY), re.IGNORECASE)
-
 EXTENSION_TO_CATEGORY = {
     ".3g2": "audio",
     ".3gp": "audio",
@@ -113,7 +109,7 @@ EXTENSION_TO_CATEGORY = {
     ".aif": "audio",
     ".aifc": "audio",
     ".aiff": "audio",
-    ".ass": "audio",
+    ".ass": "text",
     ".au": "audio",
     ".avi": "video",
     ".avif": "image",
@@ -158,7 +154,7 @@ EXTENSION_TO_CATEGORY = {
     ".jpeg": "image",
     ".jpg": "image",
     ".json": "text",
-    ".ksh": "text",
+    ".ksh": "executable",
     ".key": "presentation",
     ".kth": "presentation",
     ".loas": "audio",
@@ -170,7 +166,7 @@ EXTENSION_TO_CATEGORY = {
     ".mp2": "audio",
     ".mp3": "audio",
     ".mp4": "video",
-    ".mpa": "video",
+    ".mpa": "audio",
     ".mpe": "video",
     ".mpeg": "video",
     ".mpg": "video",
@@ -196,7 +192,7 @@ EXTENSION_TO_CATEGORY = {
     ".pnm": "image",
     ".pot": "presentation",
     ".potx": "presentation",
-    ".ppa": "document",
+    ".ppa": "presentation",
     ".ppm": "image",
     ".pps": "presentation",
     ".ppsx": "presentation",
@@ -204,7 +200,7 @@ EXTENSION_TO_CATEGORY = {
     ".pptx": "presentation",
     ".ps": "document",
     ".ps1": "executable",
-    ".pwz": "document",
+    ".pwz": "presentation",
     ".prezi": "presentation",
     ".pecha": "presentation",
     ".py": "text",
@@ -241,7 +237,7 @@ EXTENSION_TO_CATEGORY = {
     ".webm": "video",
     ".wiz": "document",
     ".xbm": "image",
-    ".xlb": "document",
+    ".xlb": "spreadsheet",
     ".xls": "spreadsheet",
     ".xlsx": "spreadsheet",
     ".xlsm": "spreadsheet",
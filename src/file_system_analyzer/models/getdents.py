@@ -0,0 +1,259 @@
+import os
+import platform
+import stat
+import struct
+import sys
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+from ..logging_config import logger
+
+# listing backends accepted by list_directory
+LISTING_BACKENDS = ("scandir", "getdents", "auto")
+
+# size of the buffer filled by one getdents64 call, glibc's readdir uses 32KiB
+GETDENTS_BUFFER_BYTES = 1024 ** 2
+
+# syscall numbers of getdents64 by machine architecture
+GETDENTS64_SYSCALLS = {
+    "x86_64": 217,
+    "i386": 220,
+    "i686": 220,
+    "aarch64": 61,
+    "riscv64": 61,
+    "armv7l": 217,
+    "ppc64le": 202,
+    "s390x": 220,
+}
+
+# d_type values of linux_dirent64, see dirent.h
+DT_UNKNOWN = 0
+DT_DIR = 4
+DT_REG = 8
+DT_LNK = 10
+
+# struct linux_dirent64 { u64 d_ino; s64 d_off; u16 d_reclen; u8 d_type; char d_name[]; }, only d_reclen and
+# d_type are unpacked
+_RECLEN_OFFSET = 16
+_RECLEN_TYPE = struct.Struct("=HB")
+_NAME_OFFSET = 19
+
+_getdents = None
+
+# buffers are reused by the listings of a thread instead of allocated per directory
+_buffers = threading.local()
+
+
+class Dirent:
+    """
+    Directory entry produced by the getdents backend, with the subset of the os.DirEntry interface used by the
+    analyzer. The type reported by the kernel answers is_dir and is_file without a stat, unless the file system
+    doesn't fill in d_type, and the result of stat is cached like os.DirEntry does.
+
+    Attributes:
+        name : str
+            Name of the entry
+        path : str
+            Path of the entry, joined with the path of the listed directory
+        d_type : int
+            Type of the entry reported by the kernel, DT_UNKNOWN if the file system doesn't report it
+    """
+    __slots__ = ("name", "path", "d_type", "_lstat")
+
+    def __init__(self, name: str, path: str, d_type: int) -> None:
+        self.name: str = name
+        self.path: str = path
+        self.d_type: int = d_type
+        self._lstat: Optional[os.stat_result] = None
+
+    def __repr__(self) -> str:
+        return f"<Dirent {self.name!r}>"
+
+    def __fspath__(self) -> str:
+        return self.path
+
+    def stat(self, *, follow_symlinks: bool = True) -> os.stat_result:
+        if follow_symlinks and self.d_type in (DT_LNK, DT_UNKNOWN):
+            return os.stat(self.path)
+        if self._lstat is None:
+            self._lstat = os.lstat(self.path)
+        return self._lstat
+
+    def is_dir(self, *, follow_symlinks: bool = True) -> bool:
+        if self.d_type == DT_DIR:
+            return True
+        return self._is(DT_DIR, stat.S_ISDIR, follow_symlinks)
+
+    def is_file(self, *, follow_symlinks: bool = True) -> bool:
+        if self.d_type == DT_REG:
+            return True
+        return self._is(DT_REG, stat.S_ISREG, follow_symlinks)
+
+    def is_symlink(self) -> bool:
+        if self.d_type != DT_UNKNOWN:
+            return self.d_type == DT_LNK
+        return stat.S_ISLNK(self.stat(follow_symlinks=False).st_mode)
+
+    def _is(self, d_type: int, test, follow_symlinks: bool) -> bool:
+        if self.d_type != DT_UNKNOWN and not (follow_symlinks and self.d_type == DT_LNK):
+            return self.d_type == d_type
+        try:
+            return test(self.stat(follow_symlinks=follow_symlinks).st_mode)
+        except FileNotFoundError:
+            return False
+
+
+def getdents_available() -> bool:
+    """
+    Checks whether the getdents64 system call can be used on this machine
+    :return: bool
+    """
+    return _load_getdents() is not None
+
+
+def _load_getdents():
+    global _getdents
+    if _getdents is None:
+        syscall = GETDENTS64_SYSCALLS.get(platform.machine())
+        if not sys.platform.startswith("linux") or syscall is None:
+            _getdents = False
+        else:
+            import ctypes
+
+            libc = ctypes.CDLL(None, use_errno=True)
+            function = libc.syscall
+            function.restype = ctypes.c_long
+
+            def getdents(fd: int, buffer) -> int:
+                count = function(syscall, fd, buffer, ctypes.sizeof(buffer))
+                if count < 0:
+                    errno = ctypes.get_errno()
+                    raise OSError(errno, os.strerror(errno))
+                return count
+
+            _getdents = getdents
+    return _getdents or None
+
+
+def iter_dirent_batches(path: os.PathLike, buffer_size: int = GETDENTS_BUFFER_BYTES) -> Iterator[List[Dirent]]:
+    """
+    Lists a directory with getdents64, yielding the entries returned by every call as one batch. Records are parsed
+    straight from a buffer reused by the thread, so a huge flat directory takes few system calls. A batch is fully
+    parsed before it is yielded, so listings interleaved in one thread can share the buffer
+    :param path: os.PathLike
+        Directory to be listed
+    :param buffer_size: int
+        Size of the buffer filled by one call, bounding the size of a batch
+    :return: Iterator[List[Dirent]]
+    """
+    getdents = _load_getdents()
+    if getdents is None:
+        raise OSError(f"getdents64 isn't available on {sys.platform} {platform.machine()}")
+
+    prefix = os.fspath(path)
+    prefix = prefix if prefix.endswith(os.sep) else prefix + os.sep
+    buffer, c_buffer, view = _buffer(buffer_size)
+    unpack = _RECLEN_TYPE.unpack_from
+    encoding = sys.getfilesystemencoding()
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY | os.O_CLOEXEC)
+    try:
+        while True:
+            count = getdents(fd, c_buffer)
+            if count == 0:
+                return
+            # the records of a call are decoded at once and names are sliced out of the text: latin-1 maps every byte
+            # to one character, so offsets carry over. Names with other than ASCII bytes are decoded again like
+            # os.fsdecode does
+            text = str(view[:count], "latin-1")
+            find = text.index
+            batch = []
+            offset = 0
+            while offset < count:
+                length, d_type = unpack(buffer, offset + _RECLEN_OFFSET)
+                end = find("\0", offset + _NAME_OFFSET, offset + length)
+                name = text[offset + _NAME_OFFSET:end]
+                if not name.isascii():
+                    name = buffer[offset + _NAME_OFFSET:end].decode(encoding, "surrogateescape")
+                offset += length
+                if name == "." or name == "..":
+                    continue
+                batch.append(Dirent(name, prefix + name, d_type))
+            if batch:
+                yield batch
+    finally:
+        os.close(fd)
+
+
+def _buffer(size: int) -> Tuple[bytearray, object, memoryview]:
+    # the kernel fills a bytearray through a ctypes view of it, which is parsed in place
+    cached = getattr(_buffers, "cached", None)
+    if cached is None or len(cached[0]) != size:
+        import ctypes
+
+        buffer = bytearray(size)
+        cached = _buffers.cached = (buffer, (ctypes.c_char * size).from_buffer(buffer), memoryview(buffer))
+    return cached
+
+
+def auto_listing_backend(path: os.PathLike) -> str:
+    """
+    Chooses the listing backend for a directory. Every readdir of a FUSE mount is a request to its daemon, sized by
+    the buffer of the caller up to the max_pages of the mount, so getdents takes fewer of them. That pays off once a
+    request takes about a millisecond, i.e. on mounts of remote stores, while os.scandir costs less CPU per entry
+    everywhere else. NFS and SMB clients size their requests by mount options, whatever the buffer
+    :param path: os.PathLike
+    :return: str
+        'getdents' on FUSE mounts of remote stores, 'scandir' elsewhere
+    """
+    if not getdents_available():
+        return "scandir"
+    from .devices import NETWORK_FILE_SYSTEMS, file_system_type
+
+    try:
+        fs_type = file_system_type(path)
+    except OSError:
+        return "scandir"
+    return "getdents" if fs_type.startswith("fuse.") and fs_type in NETWORK_FILE_SYSTEMS else "scandir"
+
+
+def list_directory(path: os.PathLike, backend: str = "scandir") -> List:
+    """
+    Lists the entries of a directory with the chosen backend
+    :param path: os.PathLike
+        Directory to be listed
+    :param backend: str
+        'scandir' (portable), 'getdents' (Linux only, fewer requests to FUSE daemons) or 'auto', which chooses
+        one of them for the directory as auto_listing_backend does
+    :return: List[os.DirEntry] | List[Dirent]
+    """
+    if backend == "auto":
+        backend = auto_listing_backend(path)
+    if backend == "scandir":
+        with os.scandir(path) as entries:
+            return list(entries)
+    if backend not in LISTING_BACKENDS:
+        raise ValueError(f"invalid listing backend: {backend}")
+    entries = []
+    for batch in iter_dirent_batches(path):
+        entries.extend(batch)
+    return entries
+
+
+def check_listing_backend(backend: str, path: Optional[os.PathLike] = None) -> str:
+    """
+    Validates a listing backend, falling back to scandir with a warning where getdents isn't available
+    :param backend: str
+    :param path: Optional[os.PathLike]
+        Root of the scan, for which 'auto' is resolved once instead of for every directory
+    :return: str
+        Backend which will be used
+    """
+    if backend not in LISTING_BACKENDS:
+        raise ValueError(f"invalid listing backend: {backend}")
+    if backend == "auto" and path is not None:
+        backend = auto_listing_backend(path)
+        logger.debug("Listing %s with %s", path, backend)
+    if backend == "getdents" and not getdents_available():
+        logger.warning("getdents64 is only available on Linux, os.scandir will be used instead.")
+        return "scandir"
+    return backend
@@ -0,0 +1,404 @@
+import json
+import math
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .aging import SECONDS_PER_DAY
+from .sharding import CategoryTotals
+from ..logging_config import logger
+
+# format version of the history records, bumped on incompatible changes
+HISTORY_VERSION = 1
+
+# top-level directories kept per snapshot, the smaller ones are summed up under OTHER_DIRECTORIES
+MAX_DIRECTORIES = 50
+OTHER_DIRECTORIES = "(other)"
+# key of files directly inside the scanned directory
+ROOT_FILES = "."
+
+# snapshots kept by age: all of the last 90 days, then the latest of every 7 days up to 2 years, then the latest of
+# every 30 days, so years of daily scans stay at a few hundred records
+RETENTION = ((90, 0), (730, 7), (math.inf, 30))
+
+# compaction rewrites the history only once it drops this many snapshots, appends are plain appends in between
+COMPACT_MIN_DROPPED = 30
+
+
+@dataclass
+class Snapshot:
+    """
+    Aggregates of a single scan, as stored in the history
+
+    Attributes:
+        dir_path : str
+            Root directory of the scan
+        time : int
+            Time the scan finished, as a Unix timestamp
+        categories : Dict[str, CategoryTotals]
+            Map of categories to their totals
+        directories : Dict[str, CategoryTotals]
+            Map of the largest top-level directories to their totals, ROOT_FILES for files directly inside dir_path
+            and OTHER_DIRECTORIES for the remaining directories
+        errors : int
+            Number of entries which failed during the scan
+    """
+    dir_path: str
+    time: int
+    categories: Dict[str, CategoryTotals] = field(default_factory=dict)
+    directories: Dict[str, CategoryTotals] = field(default_factory=dict)
+    errors: int = 0
+
+    @property
+    def size(self) -> int:
+        return sum(totals.size for totals in self.categories.values())
+
+    @property
+    def count(self) -> int:
+        return sum(totals.count for totals in self.categories.values())
+
+    @classmethod
+    def from_analyzer(cls, analyzer, now: Optional[float] = None,
+                      max_directories: int = MAX_DIRECTORIES) -> "Snapshot":
+        """
+        Builds a snapshot out of a FileSystemAnalyzer which has already categorized its files
+        :param analyzer: FileSystemAnalyzer
+            Analyzer to summarize
+        :param now: Optional[float]
+            Time of the snapshot, defaults to the current time
+        :param max_directories: int
+            Number of the largest top-level directories kept
+        :return: Snapshot
+        """
+        # paths of files are joined onto dir_path, so the top-level directory follows the prefix
+        prefix = os.path.join(os.fspath(analyzer.dir_path), "")
+        categories = {}
+        directories: Dict[str, CategoryTotals] = {}
+        for category, files in analyzer.files_by_category.items():
+            categories[category] = CategoryTotals(files.size, len(files.files), files.allocated_size)
+            for f in files.files:
+                top, separator, _ = os.fspath(f.path)[len(prefix):].partition(os.sep)
+                totals = directories.get(top if separator else ROOT_FILES)
+                if totals is None:
+                    totals = directories[top if separator else ROOT_FILES] = CategoryTotals()
+                totals.size += f.size
+                totals.count += 1
+                totals.allocated_size += f.allocated_size
+
+        if len(directories) > max_directories:
+            largest = sorted(directories.items(), key=lambda d: (-d[1].size, d[0]))
+            directories = dict(largest[:max_directories])
+            other = directories[OTHER_DIRECTORIES] = CategoryTotals()
+            for _, totals in largest[max_directories:]:
+                other.size += totals.size
+                other.count += totals.count
+                other.allocated_size += totals.allocated_size
+
+        return cls(
+            dir_path=os.path.abspath(analyzer.dir_path),
+            time=int(time.time() if now is None else now),
+            categories=categories,
+            directories=directories,
+            errors=sum(analyzer.errors.counts.values()),
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": HISTORY_VERSION,
+            "dir_path": self.dir_path,
+            "time": self.time,
+            "categories": {k: [v.size, v.count, v.allocated_size] for k, v in self.categories.items()},
+            "directories": {k: [v.size, v.count, v.allocated_size] for k, v in self.directories.items()},
+            "errors": self.errors,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Snapshot":
+        if data.get("version") != HISTORY_VERSION:
+            raise ValueError(f"unsupported history version: {data.get('version')}")
+        return cls(
+            dir_path=data["dir_path"],
+            time=data["time"],
+            categories={k: CategoryTotals(*v) for k, v in data["categories"].items()},
+            directories={k: CategoryTotals(*v) for k, v in data["directories"].items()},
+            errors=data.get("errors", 0),
+        )
+
+
+def retained(snapshots: List[Snapshot], now: Optional[float] = None) -> List[Snapshot]:
+    """
+    Thins out old snapshots according to RETENTION, keeping the latest snapshot of every period. Periods are aligned
+    to the Unix epoch, so a snapshot kept once stays kept until it moves on to a longer period
+    :param snapshots: List[Snapshot]
+        Snapshots in the order they were taken
+    :param now: Optional[float]
+        Reference time ages are computed against, defaults to the current time
+    :return: List[Snapshot]
+        Snapshots kept, in their original order
+    """
+    now = time.time() if now is None else now
+    latest = {}
+    for i, snapshot in enumerate(snapshots):
+        age = (now - snapshot.time) / SECONDS_PER_DAY
+        tier, period = next((tier, period) for tier, (max_age, period) in enumerate(RETENTION) if age < max_age)
+        # later snapshots of a period replace earlier ones
+        key = (snapshot.dir_path, tier, snapshot.time // (period * SECONDS_PER_DAY)) if period else i
+        latest[key] = i
+    kept = set(latest.values())
+    return [snapshot for i, snapshot in enumerate(snapshots) if i in kept]
+
+
+class ScanHistory:
+    """
+    Append-only file of scan snapshots, one JSON record per line. Each scan appends a single line with one write,
+    so concurrent scans don't interleave their records, and old snapshots are thinned out once enough of them
+    expired. Appends hold a shared flock of the file and compactions an exclusive one (where fcntl is available),
+    so no append is lost to a concurrent compaction.
+
+    Attributes:
+        path : os.PathLike
+            Path to the history file
+
+    Methods:
+        append(snapshot: Snapshot):
+            Appends a snapshot and compacts the history if enough snapshots expired
+        load(dir_path: Optional[str]):
+            Reads all snapshots, optionally of a single root directory
+        compact(now: Optional[float], min_dropped: int):
+            Rewrites the history without expired snapshots
+    """
+    def __init__(self, path: os.PathLike) -> None:
+        """
+        Constructs all necessary attributes for the ScanHistory object
+        :param path: os.PathLike
+            Path to the history file, created on the first append
+        """
+        self.path: os.PathLike = path
+
+    def append(self, snapshot: Snapshot) -> None:
+        """
+        Appends a snapshot and compacts the history if enough snapshots expired
+        :param snapshot: Snapshot
+        :return: None
+        """
+        line = (json.dumps(snapshot.to_dict(), separators=(",", ":")) + "\n").encode()
+        # appends don't exclude each other, O_APPEND writes of a line don't interleave
+        fd = self._open_locked(os.O_WRONLY | os.O_APPEND | os.O_CREAT, shared=True)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        self.compact(snapshot.time)
+
+    def load(self, dir_path: Optional[str] = None) -> List[Snapshot]:
+        """
+        Reads all snapshots, sorted by time. Unreadable records, e.g. a line cut short by a crash, are skipped
+        :param dir_path: Optional[str]
+            Root directory whose snapshots are returned, all snapshots if None
+        :return: List[Snapshot]
+        """
+        snapshots = []
+        with open(self.path, encoding="utf-8") as f:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    snapshot = Snapshot.from_dict(json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.warning("Skipping record %s of %s: %s", number, self.path, e)
+                    continue
+                if dir_path is None or snapshot.dir_path == dir_path:
+                    snapshots.append(snapshot)
+        snapshots.sort(key=lambda s: s.time)
+        return snapshots
+
+    def compact(self, now: Optional[float] = None, min_dropped: int = COMPACT_MIN_DROPPED) -> int:
+        """
+        Rewrites the history without expired snapshots, under an exclusive lock so appends wait for it. The file is
+        replaced atomically, so a concurrent reader sees either the old or the new history
+        :param now: Optional[float]
+            Reference time ages are computed against, defaults to the current time
+        :param min_dropped: int
+            Minimum number of expired snapshots for the history to be rewritten
+        :return: int
+            Number of snapshots dropped
+        """
+        fd = self._open_locked(os.O_RDONLY, shared=False)
+        try:
+            snapshots = self.load()
+            kept = retained(snapshots, now)
+            dropped = len(snapshots) - len(kept)
+            if not dropped or dropped < min_dropped:
+                return 0
+            # the temporary file is unique, so compactions on machines without flock don't write into each other
+            directory, name = os.path.split(os.path.abspath(self.path))
+            tmp_fd, tmp_path = tempfile.mkstemp(prefix=f"{name}.", suffix=".tmp", dir=directory)
+            try:
+                with open(tmp_fd, "w", encoding="utf-8") as f:
+                    os.fchmod(f.fileno(), os.fstat(fd).st_mode & 0o777)
+                    for snapshot in kept:
+                        f.write(json.dumps(snapshot.to_dict(), separators=(",", ":")) + "\n")
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        finally:
+            os.close(fd)
+        logger.debug("Compacted %s, dropped %s snapshots", self.path, dropped)
+        return dropped
+
+    def _open_locked(self, flags: int, shared: bool) -> int:
+        """
+        Opens the history file and locks it. A compaction replaces the file, so a lock acquired on a file which was
+        replaced meanwhile is given up and taken on the new file instead
+        :param flags: int
+            Flags of os.open
+        :param shared: bool
+            Whether the lock is shared or exclusive
+        :return: int
+            File descriptor holding the lock, which is released when it is closed
+        """
+        while True:
+            fd = os.open(self.path, flags, 0o644)
+            if fcntl is None:
+                return fd
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+                locked, current = os.fstat(fd), os.stat(self.path)
+                if (locked.st_dev, locked.st_ino) == (current.st_dev, current.st_ino):
+                    return fd
+            except FileNotFoundError:
+                pass
+            except BaseException:
+                os.close(fd)
+                raise
+            os.close(fd)
+
+
+@dataclass
+class Trend:
+    """
+    Growth of a category or directory across the history
+
+    Attributes:
+        name : str
+            Category or directory
+        size : int
+            Size in the latest snapshot
+        count : int
+            Number of files in the latest snapshot
+        change : Optional[int]
+            Change of size since the previous snapshot, None if there is only one
+        rate : Optional[float]
+            Growth in bytes per day, the least-squares slope over the snapshots in the window, None if fewer than two
+        projected_size : Optional[int]
+            Size expected at the end of the horizon if the growth continues, never below 0
+    """
+    name: str
+    size: int
+    count: int
+    change: Optional[int] = None
+    rate: Optional[float] = None
+    projected_size: Optional[int] = None
+
+
+@dataclass
+class TrendReport:
+    """
+    Growth of a scanned directory, computed from its snapshots
+
+    Attributes:
+        dir_path : str
+            Root directory of the scans
+        snapshots : int
+            Number of snapshots in the history
+        first_time : int
+            Time of the oldest snapshot
+        last_time : int
+            Time of the latest snapshot
+        window_days : float
+            Days before the latest snapshot over which rates are fitted
+        horizon_days : float
+            Days after the latest snapshot to which sizes are projected
+        total : Trend
+            Growth of all files
+        categories : List[Trend]
+            Growth of every category, largest first
+        directories : List[Trend]
+            Growth of every top-level directory of the latest snapshot, largest first
+    """
+    dir_path: str
+    snapshots: int
+    first_time: int
+    last_time: int
+    window_days: float
+    horizon_days: float
+    total: Trend
+    categories: List[Trend] = field(default_factory=list)
+    directories: List[Trend] = field(default_factory=list)
+
+
+def _trend(name: str, points: List[tuple], window_start: float, horizon_days: float) -> Trend:
+    # points are (time, totals) pairs, totals are None where the snapshot has no record of the name
+    known = [(t, totals) for t, totals in points if totals is not None]
+    last_time, last = known[-1]
+    trend = Trend(name, last.size, last.count)
+    if len(known) > 1:
+        trend.change = last.size - known[-2][1].size
+
+    window = [((t - last_time) / SECONDS_PER_DAY, totals.size) for t, totals in known if t >= window_start]
+    if len(window) > 1:
+        mean_x = sum(x for x, _ in window) / len(window)
+        mean_y = sum(y for _, y in window) / len(window)
+        variance = sum((x - mean_x) ** 2 for x, _ in window)
+        if variance:
+            trend.rate = sum((x - mean_x) * (y - mean_y) for x, y in window) / variance
+            trend.projected_size = max(0, round(last.size + trend.rate * horizon_days))
+    return trend
+
+
+def compute_trends(snapshots: List[Snapshot], window_days: float = 30, horizon_days: float = 90) -> TrendReport:
+    """
+    Computes growth rates and projections of a directory from its snapshots, without rescanning it
+    :param snapshots: List[Snapshot]
+        Snapshots of a single root directory, sorted by time
+    :param window_days: float
+        Days before the latest snapshot over which rates are fitted
+    :param horizon_days: float
+        Days after the latest snapshot to which sizes are projected
+    :return: TrendReport
+    """
+    if not snapshots:
+        raise ValueError("no snapshots to compute trends from")
+    latest = snapshots[-1]
+    window_start = latest.time - window_days * SECONDS_PER_DAY
+    times = [s.time for s in snapshots]
+
+    empty = CategoryTotals()
+
+    def trends(tables, names):
+        # a name missing from a snapshot had no files, unless the directory table of the snapshot was truncated
+        missing = [None if OTHER_DIRECTORIES in table else empty for table in tables]
+        return sorted((_trend(name, [(t, table.get(name, default))
+                                     for t, table, default in zip(times, tables, missing)], window_start, horizon_days)
+                       for name in names), key=lambda trend: (-trend.size, trend.name))
+
+    totals = [(s.time, CategoryTotals(s.size, s.count)) for s in snapshots]
+    return TrendReport(
+        dir_path=latest.dir_path,
+        snapshots=len(snapshots),
+        first_time=snapshots[0].time,
+        last_time=latest.time,
+        window_days=window_days,
+        horizon_days=horizon_days,
+        total=_trend("total", totals, window_start, horizon_days),
+        categories=trends([s.categories for s in snapshots], latest.categories),
+        directories=trends([s.directories for s in snapshots], latest.directories),
+    )
@@ -0,0 +1,134 @@
+import functools
+import stat
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence
+
+# unusual permissions in the order they are reported, the position of each one is its bit in the flags
+UNUSUAL_PERMISSIONS = (
+    ("world-writable", stat.S_IWOTH),
+    ("group-writable", stat.S_IWGRP),
+    ("world-executable", stat.S_IXOTH),
+    ("group-executable", stat.S_IXGRP),
+    ("set-uid", stat.S_ISUID),
+    ("set-gid", stat.S_ISGID),
+    ("sticky-bit", stat.S_ISVTX),
+)
+
+FLAG_NAMES = tuple(name for name, _ in UNUSUAL_PERMISSIONS)
+
+# only the permission bits of st_mode are relevant, file type bits are masked out
+PERMISSION_BITS = 0o7777
+
+# batches smaller than this are checked with plain table lookups, since NumPy's per-call overhead outweighs its gain
+NUMPY_MIN_BATCH = 1024
+
+
+def _flags_of(mode: int) -> int:
+    return sum(1 << i for i, (_, mask) in enumerate(UNUSUAL_PERMISSIONS) if mode & mask)
+
+
+# flags of every combination of the permission bits. Unusual permissions only involve the group/other bits and the
+# special bits, so the table is composed from two small ones, which keeps import time low
+_GROUP_OTHER_FLAGS = [_flags_of(mode) for mode in range(0o100)]
+_SPECIAL_FLAGS = [_flags_of(mode << 9) for mode in range(0o10)]
+FLAG_TABLE = bytes(_GROUP_OTHER_FLAGS[mode & 0o77] | _SPECIAL_FLAGS[mode >> 9] for mode in range(PERMISSION_BITS + 1))
+
+
+@functools.cache
+def _numpy():
+    # optional dependency (numpy), imported on the first large batch so startup doesn't pay for it
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+@dataclass
+class PermissionAnalysis:
+    """
+    Result of checking a batch of modes
+
+    Attributes:
+        flags : Sequence[int]
+            Compact unusual permission flags of every mode, in the order of the input
+        counts : List[int]
+            Number of modes having each flag, indexed like UNUSUAL_PERMISSIONS
+    """
+    flags: Sequence[int]
+    counts: List[int]
+
+
+def permission_flags(mode: int) -> int:
+    """
+    Returns the unusual permission flags of a single mode
+    :param mode: int
+        Permissions as in stat.st_mode
+    :return: int
+        Bit i is set if the mode has the i-th unusual permission of UNUSUAL_PERMISSIONS
+    """
+    return FLAG_TABLE[mode & PERMISSION_BITS]
+
+
+@functools.lru_cache(maxsize=1 << len(FLAG_NAMES))
+def _decode(flags: int) -> tuple:
+    return tuple(name for i, name in enumerate(FLAG_NAMES) if flags & (1 << i))
+
+
+def decode_flags(flags: int) -> List[str]:
+    """
+    Decodes flags into names of unusual permissions. Meant to be called at report time only
+    :param flags: int
+        Flags as returned by permission_flags
+    :return: List[str]
+        Names of the unusual permissions
+    """
+    return list(_decode(flags))
+
+
+def decode_counts(counts: Sequence[int]) -> Dict[str, int]:
+    """
+    Decodes per-flag counts into a map of unusual permission names to their counts, omitting zero counts
+    :param counts: Sequence[int]
+        Counts indexed like UNUSUAL_PERMISSIONS
+    :return: Dict[str, int]
+    """
+    return {name: count for name, count in zip(FLAG_NAMES, counts) if count}
+
+
+def analyze_modes(modes: Sequence[int]) -> PermissionAnalysis:
+    """
+    Checks a batch of modes for unusual permissions. Large batches are checked with NumPy if it is installed,
+    otherwise with lookups into a precomputed table of flags
+    :param modes: Sequence[int]
+        Permissions as in stat.st_mode
+    :return: PermissionAnalysis
+    """
+    numpy = _numpy() if len(modes) >= NUMPY_MIN_BATCH else None
+    if numpy is not None:
+        table = numpy.frombuffer(FLAG_TABLE, dtype=numpy.uint8)
+        flags = table[numpy.asarray(modes, dtype=numpy.uint32) & PERMISSION_BITS]
+        counts = [int(numpy.count_nonzero(flags & (1 << i))) for i in range(len(FLAG_NAMES))]
+        return PermissionAnalysis(flags, counts)
+
+    flags = array('B', bytes(FLAG_TABLE[mode & PERMISSION_BITS] for mode in modes))
+    return PermissionAnalysis(flags, count_flags(flags))
+
+
+def count_flags(flags: Iterable[int]) -> List[int]:
+    """
+    Counts how many entries have each flag
+    :param flags: Iterable[int]
+        Flags as returned by permission_flags
+    :return: List[int]
+        Counts indexed like UNUSUAL_PERMISSIONS
+    """
+    counts = [0] * len(FLAG_NAMES)
+    # there are at most 128 distinct flag values, so bits are only inspected once per value
+    for value, count in Counter(flags).items():
+        for i in range(len(FLAG_NAMES)):
+            if value & (1 << i):
+                counts[i] += count
+    return counts
@@ -0,0 +1,287 @@
+import heapq
+import json
+import os
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from ..logging_config import logger
+
+# format version of the partial result files, bumped on incompatible changes
+PARTIAL_RESULT_VERSION = 1
+
+
+def shard_for_name(name: str, shard_count: int) -> int:
+    """
+    Deterministically assigns a top-level entry to a shard. crc32 is used instead of hash() since
+    the latter is salted per process and would give different partitions on different machines
+    :param name: str
+        Name of the top-level entry
+    :param shard_count: int
+        Total number of shards
+    :return: int
+        1-based index of the shard the entry belongs to
+    """
+    return zlib.crc32(os.fsencode(name)) % shard_count + 1
+
+
+@dataclass
+class CategoryTotals:
+    """
+    Aggregated values for a single category
+
+    Attributes:
+        size : int
+            Cumulative size of all files of the category
+        count : int
+            Number of files of the category
+        allocated_size : int
+            Cumulative size all files of the category occupy on disk
+        archived_size : int
+            Cumulative uncompressed size of archive members of the category
+        archived_count : int
+            Number of archive members of the category
+    """
+    size: int = 0
+    count: int = 0
+    allocated_size: int = 0
+    archived_size: int = 0
+    archived_count: int = 0
+
+
+@dataclass
+class PartialResult:
+    """
+    Mergeable summary of a (possibly partial) scan
+
+    Attributes:
+        dir_path : str
+            Root directory of the scan
+        threshold : int
+            Threshold which determines which files are large
+        size_mode : str
+            Size compared against the threshold, 'apparent' or 'allocated'
+        shard_count : int
+            Total number of shards the scan was split into
+        shards : List[int]
+            Indices of the shards covered by this result
+        top_k : int
+            Maximum number of large files kept
+        categories : Dict[str, CategoryTotals]
+            Map of categories to their totals
+        large_files : List[Tuple[str, int]]
+            Largest files above the threshold as (path, size) pairs, sorted by size descending
+        unusual_permissions : Dict[str, List[str]]
+            Map of paths to names of their unusual permissions
+        errors : Dict[str, int]
+            Map of 'stage: ExceptionType' keys to the number of entries which failed
+    """
+    dir_path: str
+    threshold: int
+    size_mode: str = "apparent"
+    shard_count: int = 1
+    shards: List[int] = field(default_factory=lambda: [1])
+    top_k: int = 100
+    categories: Dict[str, CategoryTotals] = field(default_factory=dict)
+    large_files: List[Tuple[str, int]] = field(default_factory=list)
+    unusual_permissions: Dict[str, List[str]] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def complete(self) -> bool:
+        return sorted(self.shards) == list(range(1, self.shard_count + 1))
+
+    @classmethod
+    def from_analyzer(cls, analyzer, top_k: int = 100) -> "PartialResult":
+        """
+        Builds a partial result out of a FileSystemAnalyzer which has already categorized its files
+        :param analyzer: FileSystemAnalyzer
+            Analyzer to summarize
+        :param top_k: int
+            Maximum number of large files kept
+        :return: PartialResult
+        """
+        index, count = analyzer.shard or (1, 1)
+        categories = {}
+        large_files = []
+        for category, files in analyzer.files_by_category.items():
+            categories[category] = CategoryTotals(files.size, len(files.files), files.allocated_size,
+                                                  files.archived_size, files.archived_count)
+            for f in files.files:
+                size = f.measured_size(analyzer.size_mode)
+                if size > analyzer.threshold:
+                    large_files.append((str(f.path), size))
+
+        return cls(
+            dir_path=os.path.abspath(analyzer.dir_path),
+            threshold=analyzer.threshold,
+            size_mode=analyzer.size_mode,
+            shard_count=count,
+            shards=[index],
+            top_k=top_k,
+            categories=categories,
+            large_files=_top_k(large_files, top_k),
+            unusual_permissions={str(k): list(v) for k, v in analyzer.unusual_permissions_files.items()},
+            errors=dict(analyzer.errors.counts),
+        )
+
+    def merge(self, other: "PartialResult") -> "PartialResult":
+        """
+        Combines two partial results of the same scan into a new one
+        :param other: PartialResult
+            Result of other shards
+        :return: PartialResult
+        """
+        if ((self.dir_path, self.threshold, self.size_mode, self.shard_count)
+                != (other.dir_path, other.threshold, other.size_mode, other.shard_count)):
+            raise ValueError("partial results belong to different scans")
+        overlap = set(self.shards) & set(other.shards)
+        if overlap:
+            raise ValueError(f"shards merged more than once: {sorted(overlap)}")
+
+        categories = {k: CategoryTotals(v.size, v.count, v.allocated_size, v.archived_size, v.archived_count)
+                      for k, v in self.categories.items()}
+        for category, totals in other.categories.items():
+            merged = categories.setdefault(category, CategoryTotals())
+            merged.size += totals.size
+            merged.count += totals.count
+            merged.allocated_size += totals.allocated_size
+            merged.archived_size += totals.archived_size
+            merged.archived_count += totals.archived_count
+
+        errors = dict(self.errors)
+        for key, count in other.errors.items():
+            errors[key] = errors.get(key, 0) + count
+
+        top_k = min(self.top_k, other.top_k)
+        return PartialResult(
+            dir_path=self.dir_path,
+            threshold=self.threshold,
+            size_mode=self.size_mode,
+            shard_count=self.shard_count,
+            shards=sorted(self.shards + other.shards),
+            top_k=top_k,
+            categories=categories,
+            large_files=_top_k(self.large_files + other.large_files, top_k),
+            unusual_permissions={**self.unusual_permissions, **other.unusual_permissions},
+            errors=errors,
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": PARTIAL_RESULT_VERSION,
+            "dir_path": self.dir_path,
+            "threshold": self.threshold,
+            "size_mode": self.size_mode,
+            "shard_count": self.shard_count,
+            "shards": self.shards,
+            "top_k": self.top_k,
+            "categories": {k: [v.size, v.count, v.allocated_size, v.archived_size, v.archived_count]
+                           for k, v in self.categories.items()},
+            "large_files": [list(f) for f in self.large_files],
+            "unusual_permissions": self.unusual_permissions,
+            "errors": self.errors,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PartialResult":
+        if data.get("version") != PARTIAL_RESULT_VERSION:
+            raise ValueError(f"unsupported partial result version: {data.get('version')}")
+        return cls(
+            dir_path=data["dir_path"],
+            threshold=data["threshold"],
+            size_mode=data.get("size_mode", "apparent"),
+            shard_count=data["shard_count"],
+            shards=list(data["shards"]),
+            top_k=data["top_k"],
+            categories={k: CategoryTotals(*v) for k, v in data["categories"].items()},
+            large_files=[(path, size) for path, size in data["large_files"]],
+            unusual_permissions=data["unusual_permissions"],
+            errors=data.get("errors", {}),
+        )
+
+    def save(self, path: os.PathLike) -> None:
+        """
+        Writes the partial result as JSON. The file is replaced atomically so a concurrently running
+        merge never observes a half-written result
+        :param path: os.PathLike
+            Destination file
+        :return: None
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: os.PathLike) -> "PartialResult":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def _top_k(files: List[Tuple[str, int]], k: int) -> List[Tuple[str, int]]:
+    # ties on size are broken by path so merging in any order gives the same list
+    return heapq.nsmallest(k, files, key=lambda f: (-f[1], f[0]))
+
+
+def merge_partial_results(results: List[PartialResult]) -> PartialResult:
+    """
+    Merges partial results of all shards into a single one
+    :param results: List[PartialResult]
+        Results to merge, at least one
+    :return: PartialResult
+    """
+    if not results:
+        raise ValueError("no partial results to merge")
+    merged = results[0]
+    for result in results[1:]:
+        merged = merged.merge(result)
+    if not merged.complete:
+        missing = sorted(set(range(1, merged.shard_count + 1)) - set(merged.shards))
+        logger.warning(f"Merged result is incomplete, missing shards: {missing}")
+    return merged
+
+
+def scan_shard(dir_path: os.PathLike, threshold: int, shard: Tuple[int, int], top_k: int = 100) -> PartialResult:
+    """
+    Scans a single shard of the directory
+    :param dir_path: os.PathLike
+        Root directory of the scan
+    :param threshold: int
+        Threshold which determines which files are large
+    :param shard: Tuple[int, int]
+        Pair (index, count) of the shard to scan
+    :param top_k: int
+        Maximum number of large files kept
+    :return: PartialResult
+    """
+    from .file_system_analyzer import FileSystemAnalyzer
+
+    analyzer = FileSystemAnalyzer(dir_path, threshold, shard=shard)
+    analyzer.categorize_files()
+    return PartialResult.from_analyzer(analyzer, top_k)
+
+
+def scan_shards(dir_path: os.PathLike, threshold: int, shard_count: int, top_k: int = 100,
+                max_workers: Optional[int] = None) -> PartialResult:
+    """
+    Runs every shard of the scan in a local process pool and merges their results
+    :param dir_path: os.PathLike
+        Root directory of the scan
+    :param threshold: int
+        Threshold which determines which files are large
+    :param shard_count: int
+        Number of shards to split the scan into
+    :param top_k: int
+        Maximum number of large files kept
+    :param max_workers: Optional[int]
+        Number of worker processes, defaults to the number of CPUs
+    :return: PartialResult
+    """
+    # imported here since the process pool machinery is only needed for local multi-process runs
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(scan_shard, dir_path, threshold, (i, shard_count), top_k)
+                   for i in range(1, shard_count + 1)]
+        return merge_partial_results([f.result() for f in futures])
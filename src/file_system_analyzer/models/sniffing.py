@@ -0,0 +1,101 @@
+import ctypes
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+# files are opened without blocking, so a file replaced by a FIFO since it was listed can't hang the scan
+_OPEN_FLAGS = (os.O_RDONLY | getattr(os, "O_NONBLOCK", 0) | getattr(os, "O_CLOEXEC", 0)
+               | getattr(os, "O_BINARY", 0))
+
+
+class HeaderReader:
+    """
+    Reads the leading bytes of files into a preallocated buffer, which is reused for every file read by the same
+    thread, so sniffing file contents allocates nothing per file and never reads more than max_bytes of a file.
+    Reads go straight into the buffer with preadv, without a file object in between.
+
+    Attributes:
+        max_bytes : int
+            Maximum number of leading bytes read from each file
+
+    Methods:
+        read(path: os.PathLike):
+            Context manager giving a memoryview of the leading bytes of a file
+    """
+    def __init__(self, max_bytes: int) -> None:
+        """
+        Constructs all necessary attributes for the HeaderReader object
+        :param max_bytes: int
+            Maximum number of leading bytes read from each file
+        """
+        if max_bytes <= 0:
+            raise ValueError("at least one byte must be read")
+        self.max_bytes: int = max_bytes
+        # every thread fills its own buffer
+        self._local = threading.local()
+
+    def _buffer(self) -> bytearray:
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = self._local.buffer = bytearray(self.max_bytes)
+        return buffer
+
+    @contextmanager
+    def read(self, path: os.PathLike) -> Iterator[memoryview]:
+        """
+        Reads the leading bytes of a file. The view is valid only inside the with block, since the next read of
+        the thread overwrites the buffer
+        :param path: os.PathLike
+        :return: Iterator[memoryview]
+            Writable view of at most max_bytes leading bytes, shorter for smaller files
+        """
+        buffer = self._buffer()
+        fd = os.open(path, _OPEN_FLAGS)
+        try:
+            count = read_into(fd, buffer)
+        finally:
+            os.close(fd)
+        with memoryview(buffer) as view, view[:count] as header:
+            yield header
+
+
+def read_into(fd: int, buffer: bytearray) -> int:
+    """
+    Fills the buffer with the leading bytes of an open file
+    :param fd: int
+        File descriptor
+    :param buffer: bytearray
+    :return: int
+        Number of bytes read, less than the size of the buffer only at the end of the file
+    """
+    count = 0
+    with memoryview(buffer) as view:
+        # a read may return fewer bytes than requested before the end of the file, e.g. on network file systems
+        while count < len(view):
+            with view[count:] as rest:
+                read = _read_at(fd, rest, count)
+            if not read:
+                break
+            count += read
+    return count
+
+
+def _read_at(fd: int, view: memoryview, offset: int) -> int:
+    if hasattr(os, "preadv"):
+        return os.preadv(fd, [view], offset)
+    # systems without preadv (Windows) copy through a temporary bytes object
+    os.lseek(fd, offset, os.SEEK_SET)
+    data = os.read(fd, len(view))
+    view[:len(data)] = data
+    return len(data)
+
+
+def as_ctypes(view: memoryview) -> ctypes.Array:
+    """
+    Wraps a writable view into a ctypes array sharing its memory, which python-magic's from_buffer passes to
+    libmagic without copying
+    :param view: memoryview
+    :return: ctypes.Array
+    """
+    return (ctypes.c_char * len(view)).from_buffer(view)
@@ -0,0 +1,164 @@
+import itertools
+import os
+import struct
+import tempfile
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from ..logging_config import logger
+
+# approximate memory held by one file record besides its path: the slotted FileMetadata with its integers, the
+# (sequence, record) pair and the slot of the list holding it
+RECORD_BYTES = 200
+
+# run record: sequence number, size, permissions, allocated size (-1 if unknown), flags and length of the path,
+# followed by the path encoded with os.fsencode
+_RUN_RECORD = struct.Struct("=QqIqII")
+
+# bytes buffered when run files are written and read
+RUN_BUFFER_BYTES = 1024 ** 2
+
+
+def record_bytes(file) -> int:
+    """
+    Returns the approximate memory held by a file record
+    :param file: FileMetadata
+    :return: int
+    """
+    return RECORD_BYTES + len(file.path)
+
+
+class SpillStore:
+    """
+    Keeps file records of all categories within a memory budget. Once the records held in memory exceed the limit,
+    every category writes its records to a run file in a temporary directory, and runs are read back one after
+    another when the files are iterated, so a full listing of any tree fits in a fixed amount of memory.
+
+    Attributes:
+        memory_limit : int
+            Approximate bytes of records held in memory before they are spilled
+        memory : int
+            Approximate bytes of records currently held in memory
+        runs : int
+            Number of run files written
+        spilled : int
+            Number of records written to run files
+
+    Methods:
+        new_list(category: str, files: Iterable[FileMetadata]):
+            Creates the file list of a category
+        spill():
+            Writes records held in memory to run files
+        close():
+            Removes the run files
+    """
+    def __init__(self, memory_limit: int, directory: Optional[os.PathLike] = None) -> None:
+        """
+        Constructs all necessary attributes for the SpillStore object
+        :param memory_limit: int
+            Approximate bytes of records held in memory before they are spilled
+        :param directory: Optional[os.PathLike]
+            Directory in which the temporary directory of runs is created, the system default if None
+        """
+        if memory_limit <= 0:
+            raise ValueError("memory limit must be positive")
+        self.memory_limit: int = memory_limit
+        self.memory: int = 0
+        self.runs: int = 0
+        self.spilled: int = 0
+        self._directory = tempfile.TemporaryDirectory(prefix="fsa-spill-", dir=directory)
+        self._lists: List[SpilledFiles] = []
+        # records are numbered in the order they are added, which runs keep
+        self._sequence = itertools.count()
+
+    def new_list(self, category: str, files: Iterable = ()) -> "SpilledFiles":
+        """
+        Creates the file list of a category
+        :param category: str
+        :param files: Iterable[FileMetadata]
+            Records already collected, e.g. restored from a checkpoint
+        :return: SpilledFiles
+        """
+        spilled_files = SpilledFiles(self, category)
+        self._lists.append(spilled_files)
+        for file in files:
+            spilled_files.append(file)
+        return spilled_files
+
+    def spill(self) -> None:
+        """
+        Writes records held in memory by every category to run files
+        :return: None
+        """
+        for spilled_files in self._lists:
+            if spilled_files._buffer:
+                spilled_files._write_run(os.path.join(self._directory.name, f"run-{self.runs:06d}"))
+                self.runs += 1
+        logger.debug("Spilled records to %s runs, %s records in total", self.runs, self.spilled)
+        self.memory = 0
+
+    def close(self) -> None:
+        self._directory.cleanup()
+
+    def _charge(self, size: int) -> None:
+        self.memory += size
+        if self.memory > self.memory_limit:
+            self.spill()
+
+
+class SpilledFiles:
+    """
+    File list of a category backed by a SpillStore. It supports what a list of files is used for by the analyzer and
+    the report: appending, len() and iteration. Iteration streams the records in the order they were appended, from
+    the runs on disk followed by the records still in memory.
+    """
+    def __init__(self, store: SpillStore, category: str) -> None:
+        self._store = store
+        self._category = category
+        self._buffer: List[Tuple[int, object]] = []
+        self._runs: List[str] = []
+        self._spilled = 0
+
+    def append(self, file) -> None:
+        self._buffer.append((next(self._store._sequence), file))
+        self._store._charge(record_bytes(file))
+
+    def __len__(self) -> int:
+        return self._spilled + len(self._buffer)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __iter__(self) -> Iterator:
+        # every spill writes the records appended since the previous one, so runs follow each other in sequence order
+        # and records in memory come after all of them. Runs are opened one at a time, however many were written
+        runs = itertools.chain.from_iterable(self._read_run(path) for path in self._runs)
+        for _, file in itertools.chain(runs, list(self._buffer)):
+            yield file
+
+    def _write_run(self, path: str) -> None:
+        pack = _RUN_RECORD.pack
+        with open(path, "wb", buffering=RUN_BUFFER_BYTES) as f:
+            for sequence, file in self._buffer:
+                encoded = os.fsencode(file.path)
+                allocated = -1 if file.allocated_size is None else file.allocated_size
+                f.write(pack(sequence, file.size, file.permissions, allocated, file.flags, len(encoded)))
+                f.write(encoded)
+        self._runs.append(path)
+        self._spilled += len(self._buffer)
+        self._store.spilled += len(self._buffer)
+        self._buffer = []
+
+    def _read_run(self, path: str) -> Iterator[Tuple[int, object]]:
+        from .file_system_analyzer import FileMetadata
+
+        size = _RUN_RECORD.size
+        unpack = _RUN_RECORD.unpack
+        with open(path, "rb", buffering=RUN_BUFFER_BYTES) as f:
+            while True:
+                header = f.read(size)
+                if not header:
+                    return
+                sequence, file_size, permissions, allocated, flags, length = unpack(header)
+                file_path = os.fsdecode(f.read(length))
+                yield sequence, FileMetadata(file_path, file_size, permissions, None if allocated < 0 else allocated,
+                                             self._category, flags)
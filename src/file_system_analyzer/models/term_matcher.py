@@ -0,0 +1,120 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+class TermMatcher:
+    """
+    Aho-Corasick automaton which finds terms in a text in a single pass. Matching is case-insensitive and
+    deterministic: the leftmost match wins and among matches starting at the same position the longest one
+    wins, regardless of the order in which terms were provided.
+
+    Attributes:
+        _goto : List[Dict[str, int]]
+            Transitions of every state
+        _fail : List[int]
+            Failure link of every state
+        _depth : List[int]
+            Length of the prefix spelled by every state
+        _longest : List[int]
+            Length of the longest term ending in every state (following failure links), 0 if none
+
+    Methods:
+        search(text: str):
+            Returns the leftmost-longest term found in the text
+        tables():
+            Returns the transition tables, from which from_tables restores the automaton without building it
+    """
+    def __init__(self, terms: Iterable[str]) -> None:
+        """
+        Builds the automaton
+        :param terms: Iterable[str]
+            Terms to match, they are lowercased
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._depth: List[int] = [0]
+        self._longest: List[int] = [0]
+
+        # build the trie of all terms
+        for term in terms:
+            term = term.lower()
+            if not term:
+                raise ValueError("terms must not be empty")
+            state = 0
+            for char in term:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._depth.append(self._depth[state] + 1)
+                    self._longest.append(0)
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._longest[state] = len(term)
+
+        # compute failure links breadth-first, so the links of shallower states are known beforehand
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                # a term ending here is always longer than any term reachable through the failure link
+                if not self._longest[next_state]:
+                    self._longest[next_state] = self._longest[self._fail[next_state]]
+                queue.append(next_state)
+
+    @classmethod
+    def from_tables(cls, goto: Sequence[Dict[str, int]], fail: Sequence[int], depth: Sequence[int],
+                    longest: Sequence[int]) -> "TermMatcher":
+        """
+        Restores an automaton from tables returned by tables(), e.g. precompiled into a module
+        :param goto: Sequence[Dict[str, int]]
+        :param fail: Sequence[int]
+        :param depth: Sequence[int]
+        :param longest: Sequence[int]
+        :return: TermMatcher
+        """
+        matcher = cls.__new__(cls)
+        matcher._goto, matcher._fail, matcher._depth, matcher._longest = goto, fail, depth, longest
+        return matcher
+
+    def tables(self) -> Tuple[List[Dict[str, int]], List[int], List[int], List[int]]:
+        """
+        Returns the transition tables of the automaton
+        :return: Tuple[List[Dict[str, int]], List[int], List[int], List[int]]
+            Transitions, failure links, depths and lengths of the longest terms of all states
+        """
+        return self._goto, self._fail, self._depth, self._longest
+
+    def search(self, text: str) -> Optional[str]:
+        """
+        Returns the leftmost-longest term found in the text
+        :param text: str
+            Text to search in
+        :return: Optional[str]
+            Matched term in lowercase, None if no term occurs in the text
+        """
+        text = text.lower()
+        goto, fail, depth, longest = self._goto, self._fail, self._depth, self._longest
+        best_start = best_length = -1
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            # once the current partial match starts after the best match, no better match is possible
+            if best_length > 0 and i - depth[state] >= best_start:
+                break
+
+            length = longest[state]
+            if length:
+                start = i - length + 1
+                if best_length < 0 or start < best_start or (start == best_start and length > best_length):
+                    best_start, best_length = start, length
+
+        if best_length < 0:
+            return None
+        return text[best_start:best_start + best_length]
@@ -0,0 +1,168 @@
+import os
+import platform
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+from ..logging_config import logger
+
+# bytes libmagic reads from the start of a file by default (MAGIC_PARAM_BYTES_MAX), used to charge content reads
+LIBMAGIC_READ_BYTES = 1024 ** 2
+
+# ioprio_set(2) constants, see linux/ioprio.h
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+
+# syscall numbers of ioprio_set by machine architecture
+IOPRIO_SET_SYSCALLS = {
+    "x86_64": 251,
+    "i386": 289,
+    "i686": 289,
+    "aarch64": 30,
+    "riscv64": 30,
+    "armv7l": 314,
+    "ppc64le": 273,
+    "s390x": 282,
+}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter. Tokens are refilled continuously at the given rate up to the burst size;
+    a caller taking more tokens than available goes into debt and sleeps until it is repaid, so the long-term rate
+    never exceeds the budget whatever the request sizes are.
+
+    Attributes:
+        rate : float
+            Tokens added per second
+        burst : float
+            Maximum number of tokens which can accumulate
+
+    Methods:
+        acquire(tokens: float):
+            Takes tokens, sleeping as long as needed to stay within the rate
+    """
+    def __init__(self, rate: float, burst: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep) -> None:
+        """
+        Constructs all necessary attributes for the TokenBucket object
+        :param rate: float
+            Tokens added per second
+        :param burst: Optional[float]
+            Maximum number of tokens which can accumulate, defaults to one second worth of tokens
+        :param clock: Callable[[], float]
+            Monotonic clock in seconds
+        :param sleep: Callable[[float], None]
+            Function used to wait
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate: float = rate
+        self.burst: float = rate if burst is None else burst
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens: float = self.burst
+        self._updated: float = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Takes tokens, sleeping as long as needed to stay within the rate
+        :param tokens: float
+            Number of tokens to take
+        :return: float
+            Seconds slept
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        # sleep outside the lock, later callers see the debt and wait behind this one
+        if wait:
+            self._sleep(wait)
+        return wait
+
+
+class IOThrottle:
+    """
+    Limits metadata operations (directory listings and stats) and bytes read from file contents
+
+    Attributes:
+        max_iops : Optional[float]
+            Maximum metadata operations per second, unlimited if None
+        max_read_bytes_per_sec : Optional[float]
+            Maximum bytes of file contents read per second, unlimited if None
+
+    Methods:
+        op(count: int):
+            Accounts for metadata operations
+        read(size: int):
+            Accounts for a content read
+    """
+    def __init__(self, max_iops: Optional[float] = None, max_read_bytes_per_sec: Optional[float] = None) -> None:
+        """
+        Constructs all necessary attributes for the IOThrottle object
+        :param max_iops: Optional[float]
+            Maximum metadata operations per second, unlimited if None
+        :param max_read_bytes_per_sec: Optional[float]
+            Maximum bytes of file contents read per second, unlimited if None
+        """
+        self.max_iops: Optional[float] = max_iops
+        self.max_read_bytes_per_sec: Optional[float] = max_read_bytes_per_sec
+        self._ops = TokenBucket(max_iops) if max_iops else None
+        self._bytes = TokenBucket(max_read_bytes_per_sec) if max_read_bytes_per_sec else None
+        # total seconds spent waiting for the budget
+        self.waited: float = 0.0
+
+    def op(self, count: int = 1) -> None:
+        """
+        Accounts for metadata operations, waiting if the budget is spent
+        :param count: int
+            Number of operations
+        :return: None
+        """
+        if self._ops is not None:
+            self.waited += self._ops.acquire(count)
+
+    def read(self, size: int) -> None:
+        """
+        Accounts for a read of file contents, waiting if the budget is spent
+        :param size: int
+            Number of bytes read
+        :return: None
+        """
+        # opening a file to read it is an operation too
+        self.op()
+        if self._bytes is not None and size:
+            self.waited += self._bytes.acquire(size)
+
+
+def set_idle_priority() -> bool:
+    """
+    Lowers the priority of the current process so the scan yields to other workloads: the I/O scheduling class
+    is set to idle with ioprio_set on Linux, and the CPU niceness is set to the lowest priority everywhere
+    :return: bool
+        True if the idle I/O class was set, False if only the CPU niceness could be lowered
+    """
+    if hasattr(os, "setpriority"):
+        try:
+            os.setpriority(os.PRIO_PROCESS, 0, 19)
+        except OSError as e:
+            logger.warning(f"Could not lower CPU priority: {e}")
+
+    syscall = IOPRIO_SET_SYSCALLS.get(platform.machine())
+    if not sys.platform.startswith("linux") or syscall is None:
+        logger.warning("Idle I/O priority is only supported on Linux, only CPU priority was lowered.")
+        return False
+
+    import ctypes
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.syscall(syscall, IOPRIO_WHO_PROCESS, 0, IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) != 0:
+        logger.warning(f"Could not set idle I/O priority: {os.strerror(ctypes.get_errno())}")
+        return False
+    return True
@@ -1,11 +1,141 @@
+import functools
 import stat
 import os
-import math
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from .file_type_mappings import APPLICATION_MIME_TO_CATEGORY, EXTENSION_TO_CATEGORY, TERM_PATTERN, TERM_TO_CATEGORY
+from .compiled_mappings import TERM_MATCHER_TABLES, application_mime_category, extension_category, term_category
+from .permissions import decode_flags, permission_flags
+from .term_matcher import TermMatcher
 from ..logging_config import logger
 
+# separators of the platform, and characters after which a dot doesn't necessarily start an extension
+_SEPARATOR, _ALT_SEPARATOR = os.sep, os.altsep
+_NOT_BEFORE_EXTENSION = ("", ".", os.sep, os.altsep or os.sep)
+
+
+def magic_available() -> bool:
+    """
+    Checks whether python-magic can be imported, which also requires libmagic to be present on the machine
+    :return: bool
+    """
+    try:
+        import magic  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+@functools.cache
+def get_magic(mime: bool = False):
+    """
+    Returns a libmagic handle shared by the whole process. python-magic is imported and the libmagic database
+    is loaded only on the first call, so commands which never inspect file contents don't pay for it
+    :param mime: bool
+        Whether the handle returns MIME types rather than raw descriptions
+    :return: magic.Magic
+    """
+    import magic
+    return magic.Magic(mime=mime)
+
+
+@functools.cache
+def get_term_matcher() -> TermMatcher:
+    """
+    Restores the matcher of all terms from its precompiled tables on first use, so startup doesn't pay for it
+    :return: TermMatcher
+    """
+    return TermMatcher.from_tables(*TERM_MATCHER_TABLES)
+
+
+@functools.lru_cache(maxsize=1024)
+def category_from_description(description: str) -> str:
+    """
+    Maps a raw libmagic description to a category using the leftmost-longest term found in it. libmagic
+    produces a small set of distinct descriptions, so results are memoized
+    :param description: str
+        Raw libmagic description
+    :return: str
+        Category of the matched term, 'other' if no term matched
+    """
+    matched_term = get_term_matcher().search(description)
+    if matched_term is None:
+        return "other"
+    return term_category(matched_term)
+
+
+@functools.lru_cache(maxsize=4096)
+def category_from_mime(mime_type: str) -> Optional[str]:
+    """
+    Resolves the category of a file from its MIME type. A volume usually has only a few hundred distinct
+    MIME types, so results are memoized in a bounded cache
+    :param mime_type: str
+        MIME type reported by libmagic
+    :return: Optional[str]
+        Category, or None if the MIME type is not specific enough and the raw libmagic description is needed
+    """
+    top_level, _, subtype = mime_type.partition('/')
+    if not top_level or not subtype:
+        raise ValueError(f"invalid MIME type: {mime_type}")
+
+    # return categories that match top-level MIME types
+    if top_level in ("text", "image", "audio", "video"):
+        return top_level
+    # handle the case with 'application' top-level type
+    if top_level == "application":
+        # attempt to map full MIME type to category
+        return application_mime_category(mime_type)
+    return "other"
+
+
+def file_extension(path: os.PathLike) -> str:
+    """
+    Returns the extension of a file like os.path.splitext, several times faster for the usual str path with a dot
+    in its file name. It runs for every file of extension-only scans, where splitext is the biggest cost after stat
+    :param path: os.PathLike
+        Path to the file
+    :return: str
+        Extension including the leading dot, empty if the file has none
+    """
+    if isinstance(path, str):
+        head, dot, extension = path.rpartition(".")
+        if not dot or _SEPARATOR in extension or (_ALT_SEPARATOR and _ALT_SEPARATOR in extension):
+            return ""
+        # a dot right after a separator or another dot may be leading, e.g. '.bashrc', which splitext decides
+        if head[-1:] not in _NOT_BEFORE_EXTENSION:
+            return dot + extension
+    return os.path.splitext(path)[1]
+
+
+def category_from_extension(extension: str) -> str:
+    """
+    Maps a file extension to a category, ignoring its case so that '.JPG' and '.jpg' are treated the same
+    :param extension: str
+        File extension, including the leading dot
+    :return: str
+        Category, 'other' if the extension is unknown
+    """
+    return extension_category(extension.lower(), "other")
+
+
+def category_cache_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Returns hit statistics of the memoized category lookups
+    :return: Dict[str, Dict[str, float]]
+        Map of cache name to its hits, misses, current size, maximum size and hit rate
+    """
+    stats = {}
+    for name, cached in (("mime", category_from_mime), ("description", category_from_description)):
+        info = cached.cache_info()
+        lookups = info.hits + info.misses
+        stats[name] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "maxsize": info.maxsize,
+            "hit_rate": info.hits / lookups if lookups else 0.0,
+        }
+    return stats
+
 
 def get_permissions(mode: int) -> Dict[str, Dict]:
     """
@@ -38,10 +168,10 @@ def get_permissions(mode: int) -> Dict[str, Dict]:
         }
         return permissions
     except ValueError as ve:
-        logger.error(f"Value error getting permissions: {ve}")
+        logger.error("Value error getting permissions: %s", ve)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error getting permissions: {e}")
+        logger.error("Unexpected error getting permissions: %s", e)
         raise
 
 
@@ -54,46 +184,29 @@ def infer_file_type_magic(file_path: os.PathLike) -> str:
         Inferred type
     """
     try:
-        import magic
-        mime_type = magic.from_file(file_path, mime=True)
-        magic_type = mime_type.split('/')
-
-        if len(magic_type) < 1:
-            raise ValueError(f"invalid MIME type: {mime_type}")
-
-        # return categories that match top-level MIME types
-        if magic_type[0] == "text":
-            return "text"
-        elif magic_type[0] == "image":
-            return "image"
-        elif magic_type[0] == "audio":
-            return "audio"
-        elif magic_type[0] == "video":
-            return "video"
-        # handle the case with 'application' top-level type
-        elif magic_type[0] == "application":
-            # attempt to map full MIME type to category
-            if mime_type in APPLICATION_MIME_TO_CATEGORY:
-                return APPLICATION_MIME_TO_CATEGORY[mime_type]
-            else:
-                # attempt to infer using raw magic descriptions
-                inferred_type = infer_file_type_magic_raw(file_path)
-                if inferred_type == "other":
-                    # finally attempt to infer type using file extension
-                    return infer_file_type_extension(file_path)
-                return inferred_type
-        return "other"
+        mime_type = get_magic(mime=True).from_file(file_path)
+        # MIME type determines the category, unless the raw description is needed
+        category = category_from_mime(mime_type)
+        if category is not None:
+            return category
+
+        # attempt to infer using raw magic descriptions
+        inferred_type = infer_file_type_magic_raw(file_path)
+        if inferred_type == "other":
+            # finally attempt to infer type using file extension
+            return category_from_extension(os.path.splitext(file_path)[1])
+        return inferred_type
     except ImportError as ie:
-        logger.error(f"Import error inferring type with libmagic: {ie}")
+        logger.debug("Import error inferring type with libmagic: %s", ie)
         raise
     except FileNotFoundError as fe:
-        logger.error(f"FileNotFoundError inferring type with libmagic: {fe}")
+        logger.debug("FileNotFoundError inferring type with libmagic: %s", fe)
         raise
     except ValueError as ve:
-        logger.error(f"Value error inferring type with libmagic: {ve}")
+        logger.debug("Value error inferring type with libmagic: %s", ve)
         raise
     except Exception as e:
-        logger.error(f"Error when inferring type: {e}")
+        logger.debug("Error when inferring type: %s", e)
         raise
 
 
@@ -106,24 +219,46 @@ def infer_file_type_magic_raw(file_path: os.PathLike) -> str:
         Inferred type
     """
     try:
-        import magic
-        magic_type_raw = magic.from_file(file_path)
-        # attempt to match generated description to compiled pattern of terms
-        matched_term = TERM_PATTERN.search(magic_type_raw)
-        if matched_term:
-            # if matched, return the category to which the term maps
-            return TERM_TO_CATEGORY[matched_term.group(0).lower()]
-        return "other"
+        magic_type_raw = get_magic().from_file(file_path)
+        # attempt to match generated description to the terms, returns the category to which the term maps
+        return category_from_description(magic_type_raw)
     except ImportError as ie:
-        logger.error(f"Import error inferring file type with libmagic description: {ie}")
+        logger.debug("Import error inferring file type with libmagic description: %s", ie)
     except FileNotFoundError as fe:
-        logger.error(f"FileNotFoundError inferring file type with libmagic raw description: {fe}")
+        logger.debug("FileNotFoundError inferring file type with libmagic raw description: %s", fe)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error inferring file type with libmagic raw description: {e}")
+        logger.debug("Unexpected error inferring file type with libmagic raw description: %s", e)
         raise
 
 
+def infer_file_type_magic_header(file_path: os.PathLike, header: memoryview) -> str:
+    """
+    Infers the file type like infer_file_type_magic, from leading bytes of the file which were already read. Both
+    libmagic lookups share the header, and libmagic neither opens the file nor reads it again
+    :param file_path: os.PathLike
+        Path to the file, its extension is the fallback for unknown descriptions
+    :param header: memoryview
+        Writable view of the leading bytes of the file, e.g. read by sniffing.HeaderReader
+    :return: str
+        Inferred type
+    """
+    from .sniffing import as_ctypes
+
+    # libmagic reports empty files as inode/x-empty when it stats them itself
+    if not len(header):
+        return "other"
+    mime_type = get_magic(mime=True).from_buffer(as_ctypes(header))
+    category = category_from_mime(mime_type)
+    if category is not None:
+        return category
+
+    inferred_type = category_from_description(get_magic().from_buffer(as_ctypes(header)))
+    if inferred_type == "other":
+        return category_from_extension(os.path.splitext(file_path)[1])
+    return inferred_type
+
+
 def infer_file_type_extension(file_path: os.PathLike) -> str:
     """
     Infer file type using file extensions
@@ -135,20 +270,31 @@ def infer_file_type_extension(file_path: os.PathLike) -> str:
     try:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"file {file_path} does not exist")
-        # obtain file's extension
-        file_ext = os.path.splitext(file_path)[1]
-        if file_ext in EXTENSION_TO_CATEGORY:
-            # if file extension is present in the mapping, return category to which it maps
-            return EXTENSION_TO_CATEGORY[file_ext]
-        return "other"
+        # obtain file's extension and return category to which it maps
+        return category_from_extension(os.path.splitext(file_path)[1])
     except FileNotFoundError as fe:
-        logger.error(f"FileNotFoundError inferring file type with extension: {fe}")
+        logger.debug("FileNotFoundError inferring file type with extension: %s", fe)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error inferring file type with extension: {e}")
+        logger.debug("Unexpected error inferring file type with extension: %s", e)
         raise
 
 
+def allocated_size(file_stat: os.stat_result) -> int:
+    """
+    Returns the size a file occupies on disk, which differs from st_size for sparse and compressed files
+    :param file_stat: os.stat_result
+        Stat of the file
+    :return: int
+        Allocated size in bytes, falls back to st_size on platforms without st_blocks
+    """
+    blocks = getattr(file_stat, "st_blocks", None)
+    if blocks is None:
+        return file_stat.st_size
+    # st_blocks is always counted in 512-byte units, regardless of the file system block size
+    return blocks * 512
+
+
 def convert_size(file_size: int) -> str:
     """
     Convert size from bytes to string with a unit
@@ -168,9 +314,9 @@ def convert_size(file_size: int) -> str:
         base = 1024
         size_units = ("B", "KiB", "MiB", "GiB", "TiB", "PiB")
 
-        # determine a unit index based on the log. in case it's above the length of size_units
-        # take the last biggest one
-        unit_index = min(int(math.floor(math.log(file_size, base))), len(size_units) - 1)
+        # determine a unit index from the number of bits, every unit is 10 bits. in case it's above the length of
+        # size_units take the last biggest one. unlike a float log, this is exact just below powers of 1024
+        unit_index = min((file_size.bit_length() - 1) // 10, len(size_units) - 1)
         divisor = base ** unit_index
         converted_size = file_size / divisor
 
@@ -183,10 +329,10 @@ def convert_size(file_size: int) -> str:
 
         return f"{converted_size} {size_units[unit_index]}"
     except ValueError as ve:
-        logger.error(f"Value error converting size: {ve}")
+        logger.error("Value error converting size: %s", ve)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error converting size: {e}")
+        logger.error("Unexpected error converting size: %s", e)
         raise
 
 
@@ -201,25 +347,10 @@ def detect_unusual_permissions(mode: int) -> List[str]:
     try:
         if not isinstance(mode, int):
             raise ValueError("mode must be integer")
-        unusual_permissions = []
-        if mode & stat.S_IWOTH:
-            unusual_permissions.append("world-writable")
-        if mode & stat.S_IWGRP:
-            unusual_permissions.append("group-writable")
-        if mode & stat.S_IXOTH:
-            unusual_permissions.append("world-executable")
-        if mode & stat.S_IXGRP:
-            unusual_permissions.append("group-executable")
-        if mode & stat.S_ISUID:
-            unusual_permissions.append("set-uid")
-        if mode & stat.S_ISGID:
-            unusual_permissions.append("set-gid")
-        if mode & stat.S_ISVTX:
-            unusual_permissions.append("sticky-bit")
-        return unusual_permissions
+        return decode_flags(permission_flags(mode))
     except ValueError as ve:
-        logger.error(f"Value error when detecting unusual permissions: {ve}")
+        logger.error("Value error when detecting unusual permissions: %s", ve)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error when detecting unusual permissions: {e}")
+        logger.error("Unexpected error when detecting unusual permissions: %s", e)
         raise
@@ -23,3 +23,139 @@ def test_fsa_correct_args(tmp_path):
                              stdout=subprocess.PIPE)
     assert process.returncode == 0
     assert "FILE SYSTEM ANALYSIS REPORT" in process.stdout, "fsa run was supposed to be successful"
+
+
+def test_fsa_shard_and_merge(tmp_path):
+    test_dir = tmp_path / "test_dir"
+    for i in range(4):
+        (test_dir / f"sub_{i}").mkdir(parents=True)
+        (test_dir / f"sub_{i}" / "file.txt").write_text("hello" * (i + 1))
+
+    processes = [subprocess.Popen(["fsa", "-d", test_dir, "-t", "10", "--shard", f"{i}/3",
+                                   "-o", tmp_path / f"part{i}.json"])
+                 for i in range(1, 4)]
+    assert all(p.wait() == 0 for p in processes)
+
+    process = subprocess.run(["fsa", "merge"] + [tmp_path / f"part{i}.json" for i in range(1, 4)],
+                             text=True,
+                             stdout=subprocess.PIPE)
+    assert process.returncode == 0
+    assert "FILE SYSTEM ANALYSIS REPORT" in process.stdout
+    assert "Incomplete" not in process.stdout
+    assert "Large files" in process.stdout
+
+
+def test_fsa_shard_requires_output(tmp_path):
+    process = subprocess.run(["fsa", "-d", tmp_path, "-t", "10", "--shard", "1/2"],
+                             text=True, stderr=subprocess.PIPE)
+    assert process.returncode != 0
+    assert "--shard requires" in process.stderr
+
+
+def test_fsa_throttled(tmp_path):
+    (tmp_path / "file.txt").write_text("hello")
+    process = subprocess.run(["fsa", "-d", tmp_path, "-t", "10MiB", "--max-iops", "1000",
+                              "--max-read-bytes-per-sec", "1MiB", "--idle-io"],
+                             text=True,
+                             stdout=subprocess.PIPE)
+    assert process.returncode == 0
+    assert "FILE SYSTEM ANALYSIS REPORT" in process.stdout
+
+
+def test_fsa_checkpoint_and_resume(tmp_path):
+    test_dir = tmp_path / "test_dir"
+    (test_dir / "sub").mkdir(parents=True)
+    (test_dir / "sub" / "file.txt").write_text("hello")
+    checkpoint = tmp_path / "scan.ckpt"
+
+    scan = subprocess.run(["fsa", "-d", test_dir, "-t", "1", "--checkpoint", checkpoint],
+                          text=True, stdout=subprocess.PIPE)
+    resumed = subprocess.run(["fsa", "--resume", checkpoint], text=True, stdout=subprocess.PIPE)
+    assert scan.returncode == 0 and resumed.returncode == 0
+    assert "Large files" in resumed.stdout
+    assert resumed.stdout == scan.stdout
+
+
+def test_fsa_memory_limit(tmp_path):
+    test_dir = tmp_path / "test_dir"
+    for d in range(3):
+        (test_dir / f"sub_{d}").mkdir(parents=True)
+        for i in range(20):
+            (test_dir / f"sub_{d}" / f"file_{i}.txt").write_text("hello" * i)
+
+    scan = subprocess.run(["fsa", "-d", test_dir, "-t", "50"], text=True, stdout=subprocess.PIPE)
+    limited = subprocess.run(["fsa", "-d", test_dir, "-t", "50", "--memory-limit", "4KiB", "--spill-dir", tmp_path],
+                             text=True, stdout=subprocess.PIPE)
+    assert scan.returncode == 0 and limited.returncode == 0
+    assert limited.stdout == scan.stdout
+
+
+def test_fsa_resume_conflicts_with_directory(tmp_path):
+    process = subprocess.run(["fsa", "--resume", tmp_path / "scan.ckpt", "-d", tmp_path],
+                             text=True, stderr=subprocess.PIPE)
+    assert process.returncode != 0
+    assert "--resume" in process.stderr
+
+
+def test_fsa_estimate(tmp_path):
+    for i in range(50):
+        (tmp_path / f"file_{i}.txt").write_text("hello" * i)
+    process = subprocess.run(["fsa", "-d", tmp_path, "-t", "10MiB", "--estimate", "--seed", "1"],
+                             text=True,
+                             stdout=subprocess.PIPE)
+    assert process.returncode == 0
+    assert "Estimated categories" in process.stdout
+    assert "Classified" in process.stdout
+
+
+def test_fsa_estimate_uses_classifier_chain(tmp_path):
+    test_dir = tmp_path / "test_dir"
+    test_dir.mkdir()
+    for i in range(10):
+        (test_dir / f"trace_{i}.qzx").write_text("hello")
+    mapping = tmp_path / "rules.map"
+    mapping.write_text(".qzx video\n")
+    process = subprocess.run(["fsa", "-d", test_dir, "-t", "10MiB", "--estimate", "--mapping", mapping,
+                              "--classifier", "extension"], text=True, stdout=subprocess.PIPE)
+    assert process.returncode == 0
+    assert "Video" in process.stdout
+
+
+def test_fsa_history_and_trends(tmp_path):
+    test_dir = tmp_path / "test_dir"
+    (test_dir / "docs").mkdir(parents=True)
+    (test_dir / "docs" / "notes.txt").write_text("hello")
+    history = tmp_path / "history.jsonl"
+
+    for i in range(2):
+        scan = subprocess.run(["fsa", "-d", test_dir, "-t", "10MiB", "--history", history], stdout=subprocess.PIPE)
+        assert scan.returncode == 0
+        (test_dir / "docs" / f"more_{i}.txt").write_text("hello" * 100)
+    assert len(history.read_text().splitlines()) == 2
+
+    process = subprocess.run(["fsa", "trends", history], text=True, stdout=subprocess.PIPE)
+    assert process.returncode == 0
+    assert "FILE SYSTEM TRENDS REPORT" in process.stdout
+    assert "2 scans of" in process.stdout and "docs" in process.stdout
+
+
+def test_fsa_trends_missing_history(tmp_path):
+    process = subprocess.run(["fsa", "trends", tmp_path / "missing.jsonl"], text=True, stderr=subprocess.PIPE)
+    assert process.returncode != 0
+
+
+def test_fsa_history_conflicts_with_shard(tmp_path):
+    process = subprocess.run(["fsa", "-d", tmp_path, "-t", "1MiB", "--shard", "1/2", "-o", tmp_path / "p.json",
+                              "--history", tmp_path / "history.jsonl"], text=True, stderr=subprocess.PIPE)
+    assert process.returncode != 0
+    assert "--history" in process.stderr
+
+
+def test_fsa_max_sniff_bytes(tmp_path):
+    (tmp_path / "notes.txt").write_text("hello\n" * 1000)
+    (tmp_path / "image.png").write_bytes(b"\x89PNG\r\n\x1a\n" + bytes(5000))
+    scan = subprocess.run(["fsa", "-d", tmp_path, "-t", "1MiB"], text=True, stdout=subprocess.PIPE)
+    capped = subprocess.run(["fsa", "-d", tmp_path, "-t", "1MiB", "--max-sniff-bytes", "4KiB"], text=True,
+                            stdout=subprocess.PIPE)
+    assert scan.returncode == 0 and capped.returncode == 0
+    assert capped.stdout == scan.stdout
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from file_system_analyzer.cli import serve
+from file_system_analyzer.cli.serve import ScanService, handle_request, start_server
+from file_system_analyzer.models.sharding import PartialResult
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    calls = []
+    release = threading.Event()
+    release.set()
+
+    def fake_scan(root, size_mode):
+        calls.append(root)
+        release.wait(5)
+        # the number of the scan is passed on in the errors of its summary
+        summary = PartialResult(root, 0, size_mode, errors={"scan": len(calls)})
+        return summary, [(f"{root}/big", 1000), (f"{root}/medium", 100), (f"{root}/small", 10)], 0
+
+    monkeypatch.setattr(serve, "_scan", fake_scan)
+    fake_scan.calls = calls
+    fake_scan.release = release
+    return fake_scan
+
+
+def test_concurrent_requests_are_deduplicated(scans):
+    service = ScanService()
+    scans.release.clear()
+
+    async def run():
+        requests = [asyncio.ensure_future(service.scan("/data", 10)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        scans.release.set()
+        return await asyncio.gather(*requests)
+
+    results = asyncio.run(run())
+    assert scans.calls == ["/data"]
+    assert all(result["dir_path"] == "/data" and result["errors"] == {"scan": 1} for result, _ in results)
+    assert service.counters["deduplicated"] == 4
+    service.close()
+
+
+def test_ttl_and_stale_results(scans):
+    clock = FakeClock()
+    service = ScanService(ttl=60, clock=clock)
+
+    async def run():
+        first, _ = await service.scan("/data", 10)
+        clock.now = 30
+        cached, age = await service.scan("/data", 10)
+        assert cached == first and age == 30
+        assert service.counters["cache_hits"] == 1
+
+        # a stale result is returned right away while a refresh runs in the background
+        clock.now = 100
+        stale, age = await service.scan("/data", 10, allow_stale=True)
+        assert stale == first and age == 100
+        while service._inflight:
+            await asyncio.sleep(0.01)
+        refreshed, age = await service.scan("/data", 10)
+        assert refreshed["errors"]["scan"] == 2 and age == 0
+
+    asyncio.run(run())
+    assert service.counters["stale_hits"] == 1
+    service.close()
+
+
+def test_thresholds_and_top_k_share_a_scan(scans):
+    service = ScanService()
+
+    async def run():
+        return [(await service.scan("/data", threshold, top_k=top_k))[0]["large_files"]
+                for threshold, top_k in [(10, 100), (50, 100), (10, 1), (0, 0), (5000, 100)]]
+
+    views = asyncio.run(run())
+    assert views == [
+        [["/data/big", 1000], ["/data/medium", 100]],
+        [["/data/big", 1000], ["/data/medium", 100]],
+        [["/data/big", 1000]],
+        [],
+        [],
+    ]
+    assert scans.calls == ["/data"]
+    assert service.counters["cache_hits"] == 4
+    # the size mode is measured by the scan, so it isn't shared
+    asyncio.run(service.scan("/data", 10, size_mode="allocated"))
+    assert scans.calls == ["/data", "/data"]
+    service.close()
+
+
+def test_lru_eviction(scans):
+    service = ScanService(max_entries=2)
+
+    async def run():
+        await service.scan("/a", 10)
+        await service.scan("/b", 10)
+        await service.scan("/a", 10)
+        await service.scan("/c", 10)
+        # /b was the least recently used result
+        await service.scan("/b", 10)
+
+    asyncio.run(run())
+    assert scans.calls == ["/a", "/b", "/c", "/b"]
+    assert service.counters["evictions"] == 2
+    assert "fsa_evictions_total 2" in service.metrics()
+    service.close()
+
+
+def test_allowed_roots(tmp_path):
+    (tmp_path / "shared").mkdir()
+    service = ScanService(allowed_roots=[str(tmp_path / "shared")])
+    assert service.check_root(str(tmp_path / "shared")) == str((tmp_path / "shared").resolve())
+    with pytest.raises(PermissionError):
+        service.check_root(str(tmp_path))
+    with pytest.raises(ValueError):
+        service.check_root(str(tmp_path / "missing"))
+    service.close()
+
+
+async def request(port, target, method="GET"):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, body = response.split(b"\r\n\r\n", 1)
+    return int(head.split()[1]), body.decode()
+
+
+def test_http_server(tmp_path):
+    (tmp_path / "file.txt").write_text("hello")
+    service = ScanService()
+
+    async def run():
+        server = await start_server(service, port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            status, body = await request(port, f"/scan?root={tmp_path}&threshold=1")
+            assert status == 200
+            result = json.loads(body)["result"]
+            assert result["categories"]["text"] == [5, 1, result["categories"]["text"][2], 0, 0]
+            assert result["large_files"] == [[str(tmp_path / "file.txt"), 5]]
+
+            status, body = await request(port, f"/scan?root={tmp_path}&threshold=1")
+            assert status == 200 and not json.loads(body)["stale"]
+
+            status, body = await request(port, "/metrics")
+            assert status == 200
+            assert "fsa_cache_hits_total 1" in body
+            assert "fsa_scans_total 1" in body
+
+            assert (await request(port, "/scan"))[0] == 400
+            assert (await request(port, f"/scan?root={tmp_path}&threshold=ten"))[0] == 400
+            assert (await request(port, f"/scan?root={tmp_path}&top_k=-1"))[0] == 400
+            assert (await request(port, f"/scan?root={tmp_path}&top_k=1000000"))[0] == 400
+            assert (await request(port, "/nope"))[0] == 404
+            assert (await request(port, "/health", method="POST"))[0] == 405
+
+    asyncio.run(run())
+    service.close()
+
+
+def test_unrestricted_scans_need_a_local_host(scans, tmp_path):
+    service = ScanService()
+    target = f"/scan?root={tmp_path}"
+    assert asyncio.run(handle_request(service, "GET", target, "localhost"))[0] == 200
+    assert asyncio.run(handle_request(service, "GET", target, "127.0.0.1"))[0] == 200
+    assert asyncio.run(handle_request(service, "GET", target, "attacker.example"))[0] == 403
+    assert asyncio.run(handle_request(service, "GET", target, None))[0] == 403
+    service.close()
+
+    restricted = ScanService(allowed_roots=[str(tmp_path)])
+    assert asyncio.run(handle_request(restricted, "GET", target, "fsa.example"))[0] == 200
+    restricted.close()
+
+
+def test_root_required_on_public_address():
+    with pytest.raises(SystemExit) as e:
+        serve.serve(["--host", "0.0.0.0"])
+    assert e.value.code == 2
@@ -0,0 +1,53 @@
+import subprocess
+import sys
+import zipfile
+
+# modules which are costly to import and must stay out of the startup path of `fsa -h`
+HEAVY_MODULES = {
+    "rich",
+    "magic",
+    "file_system_analyzer.models.file_type_mappings",
+    "file_system_analyzer.models.compiled_mappings",
+    "file_system_analyzer.models.file_system_analyzer",
+}
+
+
+def imported_modules(args):
+    process = subprocess.run([sys.executable, "-X", "importtime", "-m", "file_system_analyzer.cli.cli"] + args,
+                             stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE,
+                             text=True)
+    modules = set()
+    for line in process.stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            modules.add(line.rsplit("|", 1)[1].strip())
+    return process.returncode, modules
+
+
+def test_help_does_not_import_heavy_modules():
+    returncode, modules = imported_modules(["-h"])
+    assert returncode == 0
+    assert "argparse" in modules, "-X importtime output was not captured"
+    assert not HEAVY_MODULES & modules
+
+
+def test_machine_readable_output_does_not_import_rich(tmp_path):
+    (tmp_path / "file.txt").write_text("hello")
+    returncode, modules = imported_modules(["-d", str(tmp_path), "-t", "1KiB", "-o", str(tmp_path / "part.json")])
+    assert returncode == 0
+    assert "rich" not in modules
+
+
+def test_scan_imports_archive_and_shard_modules_only_when_used(tmp_path):
+    (tmp_path / "file.txt").write_text("hello")
+    archive_modules = {"zipfile", "tarfile", "file_system_analyzer.models.archives"}
+    returncode, modules = imported_modules(["-d", str(tmp_path), "-t", "1KiB"])
+    assert returncode == 0
+    assert "file_system_analyzer.models.file_system_analyzer" in modules
+    assert not (archive_modules | {"file_system_analyzer.models.sharding"}) & modules
+
+    with zipfile.ZipFile(tmp_path / "bundle.zip", "w") as archive:
+        archive.writestr("member.txt", "hello")
+    returncode, modules = imported_modules(["-d", str(tmp_path), "-t", "1KiB", "--inspect-archives"])
+    assert returncode == 0
+    assert archive_modules <= modules
@@ -1,8 +1,13 @@
 import pytest
 from rich.console import Console
 
-from file_system_analyzer.cli.utils import parse_permissions, parse_output, convert_to_bytes
+from file_system_analyzer.cli.utils import (parse_permissions, parse_output, parse_partial_result, convert_to_bytes,
+                                            parse_shard, parse_stats, parse_audit, parse_age_report,
+                                            parse_errors)
+from file_system_analyzer.models.aging import AgeHistograms
+from file_system_analyzer.models.audit import AuditFinding
 from file_system_analyzer.models.file_system_analyzer import FileMetadata, CategoryFiles
+from file_system_analyzer.models.sharding import PartialResult, CategoryTotals
 
 
 @pytest.fixture
@@ -43,12 +48,13 @@ def test_parse_output_error():
 
 def test_parse_output_success(sample_output):
     console = Console(record=True, force_interactive=False)
-    parse_output(console, sample_output[0], sample_output[1], sample_output[2])
+    parse_output(console, sample_output[0], sample_output[1], sample_output[2], {"world-writable": 1})
     rendered = console.export_text()
 
     assert "Text - 5 KiB" in rendered
     assert "Large files" in rendered
     assert "Files with unusual permissions" in rendered
+    assert "Total: world-writable: 1" in rendered
 
 
 @pytest.mark.parametrize(
@@ -81,3 +87,81 @@ def test_convert_to_bytes_success(size_str, expected):
     assert convert_to_bytes(size_str) == expected
 
 
+@pytest.mark.parametrize("bad_input", ["0/2", "3/2", "1", "a/b", "1/2/3", ""])
+def test_parse_shard_error(bad_input):
+    with pytest.raises(ValueError):
+        parse_shard(bad_input)
+
+
+def test_parse_shard_success():
+    assert parse_shard("2/8") == (2, 8)
+
+
+def test_parse_partial_result_success():
+    result = PartialResult("/data", 10, shard_count=2, shards=[1],
+                           categories={"text": CategoryTotals(5120, 2)},
+                           large_files=[("/data/a.txt", 4096)],
+                           unusual_permissions={"/data/a.txt": ["world-writable"]})
+    console = Console(record=True, force_interactive=False, width=200)
+    parse_partial_result(console, result)
+    rendered = console.export_text()
+
+    assert "Incomplete result: 1 of 2 shards merged" in rendered
+    assert "5 KiB" in rendered
+    assert "/data/a.txt: 4 KiB" in rendered
+    assert "Files with unusual permissions" in rendered
+
+
+def test_parse_stats_success():
+    stats = {"mime": {"hits": 3, "misses": 1, "size": 1, "maxsize": 4096, "hit_rate": 0.75}}
+    console = Console(record=True, force_interactive=False, width=200)
+    parse_stats(console, stats)
+    rendered = console.export_text()
+
+    assert "Statistics" in rendered
+    assert "75.0%" in rendered
+    assert "1/4096" in rendered
+
+
+def test_parse_audit_success():
+    findings = [AuditFinding("critical", "unexpected-setuid", "/opt/tool", "setuid root binary not in allowlist")]
+    console = Console(record=True, force_interactive=False, width=200)
+    parse_audit(console, findings)
+    rendered = console.export_text()
+
+    assert "Security audit (1 findings)" in rendered
+    assert "critical" in rendered
+    assert "/opt/tool" in rendered
+
+
+def test_parse_output_archived_members():
+    output = {"document": CategoryFiles(archived_size=3072, archived_count=2)}
+    console = Console(record=True, force_interactive=False, width=200)
+    parse_output(console, output, {}, {})
+    rendered = console.export_text()
+
+    assert "Document - 0 B (+ 3 KiB in 2 archive members)" in rendered
+
+
+def test_parse_age_report_success():
+    histograms = AgeHistograms(cold_after_days=30, now=100 * 86400)
+    histograms.add("video", "/media", 2048, 0, 0)
+    console = Console(record=True, force_interactive=False, width=200)
+    parse_age_report(console, histograms)
+    rendered = console.export_text()
+
+    assert "Bytes by modification age" in rendered
+    assert "Cold data (untouched for 30 days)" in rendered
+    assert "100.0%" in rendered
+    assert "1. /media: 2 KiB" in rendered
+
+
+def test_parse_errors_success():
+    console = Console(record=True, force_interactive=False, width=200)
+    parse_errors(console, {"stat: FileNotFoundError": 3, "directory: PermissionError": 1},
+                 [("directory", "/data/[private]", "Permission denied")])
+    rendered = console.export_text()
+
+    assert "Errors (4 entries skipped or classified by extension)" in rendered
+    assert "stat: FileNotFoundError: 3" in rendered
+    assert "1. [directory] /data/[private]: Permission denied" in rendered
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from file_system_analyzer.models.aging import AGE_BUCKET_LABELS, SECONDS_PER_DAY, AgeHistograms
+from file_system_analyzer.models.file_system_analyzer import FileSystemAnalyzer
+
+NOW = 1_700_000_000.0
+
+
+def days_ago(days):
+    return NOW - days * SECONDS_PER_DAY
+
+
+@pytest.mark.parametrize(
+    "age_days, bucket",
+    [(-1, 0), (0, 0), (0.5, 0), (3, 1), (10, 2), (60, 3), (100, 4), (200, 5), (400, 6), (1000, 7)]
+)
+def test_buckets(age_days, bucket):
+    histograms = AgeHistograms(now=NOW)
+    histograms.add("text", "/data", 100, days_ago(age_days), days_ago(age_days))
+    assert histograms.modified["text"].index(100) == bucket
+    assert len(histograms.modified["text"]) == len(AGE_BUCKET_LABELS)
+
+
+def test_cold_data():
+    histograms = AgeHistograms(cold_after_days=90, now=NOW)
+    histograms.add("video", "/media/old", 1000, days_ago(400), days_ago(200))
+    histograms.add("video", "/media/old", 500, days_ago(400), days_ago(100))
+    # recently accessed files are not cold even if they weren't modified for long
+    histograms.add("video", "/media/new", 700, days_ago(400), days_ago(2))
+    histograms.add("text", "/docs", 10, days_ago(120), days_ago(120))
+
+    assert histograms.cold_bytes == {"video": 1500, "text": 10}
+    assert histograms.top_cold_directories(1) == [("/media/old", 1500)]
+    assert histograms.accessed["video"] == [0, 700, 0, 0, 500, 1000, 0, 0]
+    assert sum(histograms.modified["video"]) == 2200
+
+
+def test_round_trip():
+    histograms = AgeHistograms(now=NOW)
+    histograms.add("text", "/docs", 10, days_ago(300), days_ago(300))
+    restored = AgeHistograms.from_dict(histograms.to_dict())
+    assert restored.to_dict() == histograms.to_dict()
+
+
+def test_histograms_during_scan(tmp_path):
+    old = tmp_path / "old.txt"
+    old.write_text("x" * 100)
+    os.utime(old, (days_ago(365), days_ago(365)))
+    (tmp_path / "new.txt").write_text("y" * 50)
+    os.utime(tmp_path / "new.txt", (NOW, NOW))
+
+    histograms = AgeHistograms(now=NOW)
+    fsa = FileSystemAnalyzer(tmp_path, 1024, age_histograms=histograms)
+    fsa.categorize_files()
+
+    assert histograms.modified["text"] == [50, 0, 0, 0, 0, 100, 0, 0]
+    assert histograms.cold_bytes == {"text": 100}
+    assert histograms.cold_directories == {str(tmp_path): 100}
@@ -0,0 +1,157 @@
+import gzip
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from file_system_analyzer.models.archives import BoundedReader, ArchiveBudgetExceeded, inspect_archive
+from file_system_analyzer.models.file_system_analyzer import FileSystemAnalyzer
+
+
+@pytest.fixture
+def members():
+    return {"docs/report.pdf": b"%PDF" + b"\x00" * 3000, "notes.txt": b"hello " * 100, "photo.JPG": b"\xff" * 500}
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("docs/", "")
+        for name, data in members.items():
+            archive.writestr(name, data)
+
+
+def make_protected_zip(path, members, flags=0x1, method=None):
+    # zipfile can't encrypt, so the encryption flag (or an unsupported compression method) is patched into the local
+    # and central headers of a plain archive
+    make_zip(path, members)
+    data = bytearray(path.read_bytes())
+    for signature, offset in ((b"PK\x03\x04", 6), (b"PK\x01\x02", 8)):
+        start = data.find(signature)
+        while start != -1:
+            data[start + offset] |= flags
+            if method is not None:
+                data[start + offset + 2:start + offset + 4] = method.to_bytes(2, "little")
+            start = data.find(signature, start + 4)
+    path.write_bytes(bytes(data))
+
+
+def make_tar(path, members, mode="w"):
+    with tarfile.open(path, mode) as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+@pytest.mark.parametrize(
+    "name, make",
+    [
+        ("bundle.zip", make_zip),
+        ("bundle.tar", make_tar),
+        ("bundle.tar.gz", lambda path, m: make_tar(path, m, "w:gz")),
+        ("bundle.tar.bz2", lambda path, m: make_tar(path, m, "w:bz2")),
+    ]
+)
+def test_inspect_archive(tmp_path, members, name, make):
+    path = tmp_path / name
+    make(path, members)
+
+    summary = inspect_archive(str(path))
+
+    assert not summary.truncated
+    assert summary.members == 3
+    assert dict(summary.sizes) == {"document": 3004, "text": 600, "image": 500}
+    assert dict(summary.counts) == {"document": 1, "text": 1, "image": 1}
+
+
+def test_inspect_gzip(tmp_path):
+    path = tmp_path / "server.log.gz"
+    path.write_bytes(gzip.compress(b"line\n" * 1000))
+
+    summary = inspect_archive(str(path))
+
+    assert dict(summary.sizes) == {"other": 5000}
+
+
+def test_inspect_archive_budget(tmp_path):
+    path = tmp_path / "bundle.tar"
+    make_tar(path, {f"file_{i}.txt": b"x" * 4096 for i in range(20)})
+
+    # member data is skipped by seeking, so only headers count towards the budget
+    summary = inspect_archive(str(path), max_bytes=8192)
+
+    assert summary.truncated
+    assert 0 < summary.members < 20
+    assert inspect_archive(str(path), max_bytes=64 * 1024).members == 20
+
+
+def test_inspect_unsupported(tmp_path):
+    path = tmp_path / "bundle.7z"
+    path.write_bytes(b"7z\xbc\xaf\x27\x1c" + b"\x00" * 100)
+    assert inspect_archive(str(path)) is None
+
+    corrupt = tmp_path / "corrupt.zip"
+    corrupt.write_bytes(b"PK\x03\x04" + b"\x00" * 10)
+    with pytest.raises(zipfile.BadZipFile):
+        inspect_archive(str(corrupt))
+
+
+@pytest.mark.parametrize("flags, method", [(0x1, None), (0, 99)])
+def test_inspect_unreadable_members(tmp_path, flags, method):
+    path = tmp_path / "secret.zip"
+    make_protected_zip(path, {"notes.txt": b"hello", "blob.xyz": b"\x00" * 100}, flags, method)
+
+    summary = inspect_archive(str(path), sniff=True)
+
+    # members are still listed and classified by extension, only the member with an unknown extension is read
+    assert summary.members == 2
+    assert dict(summary.counts) == {"text": 1, "other": 1}
+    assert summary.unreadable == 1
+    assert [name for name, _ in summary.errors] == ["blob.xyz"]
+    assert isinstance(summary.errors[0][1], (RuntimeError, NotImplementedError))
+
+
+def test_bounded_reader():
+    reader = BoundedReader(io.BytesIO(b"x" * 100), 10)
+    assert reader.read(8) == b"x" * 8
+    with pytest.raises(ArchiveBudgetExceeded):
+        reader.read(8)
+    assert reader.read(2) == b"x" * 2
+    assert reader.bytes_read == 10
+    reader.seek(0)
+    assert reader.tell() == 0
+
+
+def test_archives_folded_into_categories(tmp_path, members):
+    make_zip(tmp_path / "bundle.zip", members)
+    (tmp_path / "readme.txt").write_text("hello")
+
+    fsa = FileSystemAnalyzer(tmp_path, 1024 ** 2, inspect_archives=True)
+    fsa.categorize_files()
+    result = fsa.files_by_category
+
+    assert len(result["archive"].files) == 1
+    assert result["text"].archived_size == 600
+    assert result["text"].archived_count == 1
+    assert result["document"].archived_size == 3004
+    assert result["document"].files == []
+    assert str(tmp_path / "bundle.zip") in fsa.archive_summaries
+
+
+def test_unreadable_archives_dont_fail_scan(tmp_path):
+    make_protected_zip(tmp_path / "secret.zip", {"blob.xyz": b"\x00" * 100})
+    # a zip cut short loses its central directory
+    make_zip(tmp_path / "corrupt.zip", {"notes.txt": b"hello"})
+    (tmp_path / "corrupt.zip").write_bytes((tmp_path / "corrupt.zip").read_bytes()[:-30])
+    (tmp_path / "readme.txt").write_text("hello")
+
+    fsa = FileSystemAnalyzer(tmp_path, 1024 ** 2, inspect_archives=True)
+    fsa.categorize_files()
+
+    assert len(fsa.files_by_category["text"].files) == 1
+    assert fsa.errors.counts["archive: BadZipFile"] == 1
+    if fsa._magic_available:
+        # without libmagic members aren't read, so the encrypted one isn't noticed
+        assert fsa.errors.counts["archive member: RuntimeError"] == 1
+        assert fsa.archive_summaries[str(tmp_path / "secret.zip")].unreadable == 1
@@ -0,0 +1,77 @@
+import os
+import stat
+from types import SimpleNamespace
+
+import pytest
+
+import file_system_analyzer.models.audit as audit
+from file_system_analyzer.models.audit import SecurityAuditor, is_user_writable, load_allowlist
+from file_system_analyzer.models.file_system_analyzer import FileSystemAnalyzer
+
+pytestmark = pytest.mark.skipif(audit.pwd is None, reason="pwd and grp are unavailable")
+
+ROOT_DIR = SimpleNamespace(st_uid=0, st_gid=0, st_mode=stat.S_IFDIR | 0o755)
+USER_DIR = SimpleNamespace(st_uid=1000, st_gid=1000, st_mode=stat.S_IFDIR | 0o755)
+
+
+def file_stat(uid=0, gid=0, mode=0o644):
+    return SimpleNamespace(st_uid=uid, st_gid=gid, st_mode=stat.S_IFREG | mode)
+
+
+@pytest.mark.parametrize(
+    "dir_stat, expected",
+    [
+        (ROOT_DIR, False),
+        (USER_DIR, True),
+        (SimpleNamespace(st_uid=0, st_gid=100, st_mode=stat.S_IFDIR | 0o775), True),
+        (SimpleNamespace(st_uid=0, st_gid=0, st_mode=stat.S_IFDIR | 0o775), False),
+        (SimpleNamespace(st_uid=0, st_gid=0, st_mode=stat.S_IFDIR | 0o1777), False),
+        (SimpleNamespace(st_uid=0, st_gid=100, st_mode=stat.S_IFDIR | 0o1775), False),
+        (SimpleNamespace(st_uid=1000, st_gid=1000, st_mode=stat.S_IFDIR | 0o1777), True),
+    ]
+)
+def test_is_user_writable(dir_stat, expected):
+    assert is_user_writable(dir_stat) == expected
+
+
+def test_check_file_rules():
+    auditor = SecurityAuditor(setuid_allowlist={"/usr/bin/sudo"})
+    orphan = 2 ** 31 - 7
+    user = next((u for u in audit.pwd.getpwall() if u.pw_uid != 0 and audit.group_exists(u.pw_gid)), None)
+    if user is None:
+        pytest.skip("no non-root user available")
+
+    auditor.check_file("/usr/bin/sudo", file_stat(mode=0o4755), ROOT_DIR)
+    auditor.check_file("/opt/app/tool", file_stat(mode=0o4755), ROOT_DIR)
+    auditor.check_file("/home/u/tool", file_stat(uid=user.pw_uid, gid=user.pw_gid, mode=0o4755), USER_DIR)
+    auditor.check_file("/home/u/config", file_stat(), USER_DIR)
+    auditor.check_file("/data/lost", file_stat(uid=orphan, gid=orphan), ROOT_DIR)
+    # the sticky bit keeps other users from replacing root's files in /tmp
+    auditor.check_file("/tmp/root.lock", file_stat(), SimpleNamespace(st_uid=0, st_gid=0,
+                                                                      st_mode=stat.S_IFDIR | 0o1777))
+
+    findings = [(f.severity, f.rule, f.path) for f in auditor.findings]
+    assert findings[0] == ("critical", "unexpected-setuid", "/opt/app/tool")
+    assert set(findings[1:3]) == {("high", "root-in-user-writable-dir", "/home/u/config"),
+                                  ("high", "unexpected-setuid", "/home/u/tool")}
+    assert findings[3:] == [("medium", "orphan-gid", "/data/lost"), ("medium", "orphan-uid", "/data/lost")]
+
+
+def test_load_allowlist(tmp_path):
+    allowlist = tmp_path / "allowlist"
+    allowlist.write_text("# setuid binaries\n/usr/bin/sudo\n\n  /usr/bin/passwd  \n")
+    assert load_allowlist(allowlist) == {"/usr/bin/sudo", "/usr/bin/passwd"}
+
+
+def test_audit_runs_during_scan(tmp_path):
+    tool = tmp_path / "tool"
+    tool.write_bytes(b"\x7fELF")
+    os.chmod(tool, 0o4755)
+    (tmp_path / "notes.txt").write_text("hello")
+
+    auditor = SecurityAuditor(setuid_allowlist=set())
+    fsa = FileSystemAnalyzer(tmp_path, 1024, auditor=auditor)
+    fsa.categorize_files()
+
+    assert [(f.rule, f.path) for f in auditor.findings if f.rule == "unexpected-setuid"] == [
+        ("unexpected-setuid", str(tool))]
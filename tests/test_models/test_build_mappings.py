@@ -0,0 +1,72 @@
+import pytest
+
+from file_system_analyzer.models import build_mappings, compiled_mappings, file_type_mappings
+from file_system_analyzer.models.term_matcher import TermMatcher
+
+VALID_SOURCE = """
+APPLICATION_MIME_TO_CATEGORY = {"application/zip": "archive"}
+TERM_TO_CATEGORY = {"zip": "archive"}
+EXTENSION_TO_CATEGORY = {".zip": "archive"}
+"""
+
+
+def test_compiled_mappings_up_to_date():
+    with open(build_mappings.SOURCE_PATH, encoding="utf-8") as f:
+        source = f.read()
+    with open(build_mappings.COMPILED_PATH, encoding="utf-8") as f:
+        assert f.read() == build_mappings.render(build_mappings.load_mappings(source)), \
+            "run python -m file_system_analyzer.models.build_mappings"
+
+
+def test_compiled_tables_match_source():
+    for name in build_mappings.TABLES:
+        assert dict(getattr(compiled_mappings, name)) == getattr(file_type_mappings, name)
+    assert compiled_mappings.extension_category(".xlb") == "spreadsheet"
+    assert compiled_mappings.extension_category(".unknown", "other") == "other"
+
+
+def test_compiled_tables_are_immutable():
+    with pytest.raises(TypeError):
+        compiled_mappings.EXTENSION_TO_CATEGORY[".xyz"] = "text"
+    with pytest.raises(TypeError):
+        compiled_mappings.TERM_MATCHER_TABLES[1][0] = 1
+
+
+@pytest.mark.parametrize(
+    "description",
+    [
+        "Zip archive data, at least v2.0 to extract",
+        "Microsoft Excel 2007+ spreadsheetml",
+        "POSIX shell script, ASCII text executable",
+        "ELF 64-bit LSB shared object, x86-64",
+        "data",
+    ]
+)
+def test_restored_matcher_matches_built_matcher(description):
+    restored = TermMatcher.from_tables(*compiled_mappings.TERM_MATCHER_TABLES)
+    assert restored.search(description) == TermMatcher(file_type_mappings.TERM_TO_CATEGORY).search(description)
+
+
+def test_load_mappings():
+    assert build_mappings.load_mappings(VALID_SOURCE)["EXTENSION_TO_CATEGORY"] == {".zip": "archive"}
+
+
+@pytest.mark.parametrize(
+    "replacement, problem",
+    [
+        ('{".zip": "archive", ".tar": "archive", ".zip": "text"}', "duplicate key '.zip'"),
+        ('{".zip": "archives"}', "unknown category 'archives'"),
+        ('{".ZIP": "archive"}', "must be lowercase"),
+        ('{"zip": "archive"}', "must start with a dot"),
+        ("dict(zip=1)", "must be a dict literal"),
+    ]
+)
+def test_load_mappings_error(replacement, problem):
+    source = VALID_SOURCE.replace('{".zip": "archive"}', replacement)
+    with pytest.raises(ValueError, match=problem):
+        build_mappings.load_mappings(source)
+
+
+def test_load_mappings_missing_table():
+    with pytest.raises(ValueError, match="TERM_TO_CATEGORY is missing"):
+        build_mappings.load_mappings(VALID_SOURCE.replace("TERM_TO_CATEGORY", "TERMS"))
@@ -0,0 +1,150 @@
+import json
+import os
+import tracemalloc
+
+import pytest
+
+from file_system_analyzer.models.aging import AgeHistograms
+from file_system_analyzer.models.audit import SecurityAuditor
+from file_system_analyzer.models import checkpoint as checkpoint_module, file_system_analyzer as analyzer_module
+from file_system_analyzer.models.checkpoint import read_checkpoint
+from file_system_analyzer.models.file_system_analyzer import FileSystemAnalyzer
+from file_system_analyzer.models.spill import RECORD_BYTES
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "root"
+    for i in range(3):
+        for j in range(2):
+            directory = root / f"dir_{i}" / f"sub_{j}"
+            directory.mkdir(parents=True)
+            (directory / "notes.txt").write_text("x" * (100 * i + j))
+            (directory / "image.png").write_bytes(b"\x89PNG\r\n\x1a\n" + b"\x00" * (50 + i))
+        (root / f"dir_{i}" / "script.sh").write_text("#!/bin/sh\n")
+        (root / f"dir_{i}" / "script.sh").chmod(0o777)
+    return root
+
+
+def report(analyzer):
+    state = analyzer.checkpoint_state()
+    del state["pending"]
+    state["categories"] = {category: (files.size, files.allocated_size, [(f.path, f.size, f.flags) for f in files.files])
+                           for category, files in analyzer.files_by_category.items()}
+    return state
+
+
+def interrupt_after(analyzer, directories, monkeypatch):
+    process_entries = analyzer._process_entries
+    calls = []
+
+    def interrupted(*args):
+        if len(calls) == directories:
+            raise KeyboardInterrupt
+        calls.append(args[0])
+        return process_entries(*args)
+
+    monkeypatch.setattr(analyzer, "_process_entries", interrupted)
+
+
+@pytest.mark.parametrize("directories", [2, 4, 9])
+def test_resume_gives_same_result(tree, tmp_path, monkeypatch, directories):
+    expected = FileSystemAnalyzer(tree, 60, auditor=SecurityAuditor(), age_histograms=AgeHistograms(now=0))
+    expected.categorize_files()
+
+    checkpoint = tmp_path / "scan.ckpt"
+    analyzer = FileSystemAnalyzer(tree, 60, auditor=SecurityAuditor(), age_histograms=AgeHistograms(now=0),
+                                  checkpoint_path=checkpoint, checkpoint_interval=0)
+    interrupt_after(analyzer, directories, monkeypatch)
+    with pytest.raises(KeyboardInterrupt):
+        analyzer.categorize_files()
+    assert read_checkpoint(checkpoint)["pending"]
+
+    resumed = FileSystemAnalyzer.resume(checkpoint)
+    assert resumed.auditor is not None and resumed.age_histograms is not None
+    resumed.categorize_files()
+
+    assert report(resumed) == report(expected)
+    assert resumed.large_files == expected.large_files
+    assert resumed.unusual_permissions_files == expected.unusual_permissions_files
+    assert read_checkpoint(checkpoint)["pending"] == []
+
+
+def test_checkpoint_is_replaced_atomically(tree, tmp_path):
+    checkpoint = tmp_path / "scan.ckpt"
+    FileSystemAnalyzer(tree, 60, checkpoint_path=checkpoint, checkpoint_interval=0).categorize_files()
+    assert checkpoint.exists()
+    assert not (tmp_path / "scan.ckpt.tmp").exists()
+
+
+def test_shard_checkpoint(tree, tmp_path):
+    checkpoint = tmp_path / "scan.ckpt"
+    FileSystemAnalyzer(tree, 60, shard=(1, 2), checkpoint_path=checkpoint).categorize_files()
+    assert FileSystemAnalyzer.resume(checkpoint).shard == (1, 2)
+
+
+def test_unsupported_checkpoint_version(tmp_path):
+    checkpoint = tmp_path / "scan.ckpt"
+    checkpoint.write_text(json.dumps({"version": 0}))
+    with pytest.raises(ValueError):
+        FileSystemAnalyzer.resume(checkpoint)
+
+
+def flat_tree(root, directories, files):
+    for i in range(directories):
+        directory = root / f"dir_{i:03d}"
+        directory.mkdir(parents=True)
+        for j in range(files):
+            (directory / f"file_{j:03d}.txt").write_text("x")
+    return root
+
+
+def test_checkpoints_dont_grow_with_files(tmp_path, monkeypatch):
+    root = flat_tree(tmp_path / "root", 20, 50)
+    checkpoint = tmp_path / "scan.ckpt"
+    sizes = []
+    write_checkpoint = checkpoint_module.write_checkpoint
+
+    def measured(state, path):
+        sizes.append(len(json.dumps(state)))
+        write_checkpoint(state, path)
+
+    monkeypatch.setattr(analyzer_module, "write_checkpoint", measured)
+    FileSystemAnalyzer(root, 60, checkpoint_path=checkpoint, checkpoint_interval=0).categorize_files()
+
+    # records are written once to the journal, checkpoints only shrink as the pending stack empties
+    assert len(sizes) > 20
+    assert max(sizes) == sizes[0]
+    with open(f"{checkpoint}.files", "rb") as f:
+        assert sum(1 for _ in f) == 1000
+
+
+def test_checkpointed_scan_stays_within_memory_limit(tmp_path, monkeypatch):
+    limit = 50 * RECORD_BYTES
+    roots = {files: flat_tree(tmp_path / f"root_{files}", 20, files) for files in (20, 200)}
+
+    def peak(files, **kwargs):
+        checkpoint = tmp_path / f"scan_{files}_{bool(kwargs)}.ckpt"
+        analyzer = FileSystemAnalyzer(roots[files], 60, checkpoint_path=checkpoint, checkpoint_interval=0, **kwargs)
+        interrupt_after(analyzer, 15, monkeypatch)
+        tracemalloc.start()
+        with pytest.raises(KeyboardInterrupt):
+            analyzer.categorize_files()
+        resumed = FileSystemAnalyzer.resume(checkpoint, **kwargs)
+        resumed.categorize_files()
+        result = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return resumed, result
+
+    _, small = peak(20, memory_limit=limit, spill_dir=tmp_path)
+    limited, large = peak(200, memory_limit=limit, spill_dir=tmp_path)
+    _, unlimited_small = peak(20)
+    unlimited, unlimited_large = peak(200)
+
+    # restored records are spilled like scanned ones, and checkpoints don't collect them into one list, so memory
+    # barely grows with the number of files, unlike without a limit
+    assert limited.spill_store.spilled > 3000
+    assert limited.spill_store.memory <= limit
+    assert large - small < (unlimited_large - unlimited_small) / 4
+    assert ([f.path for f in limited.files_by_category["text"].files]
+            == [f.path for f in unlimited.files_by_category["text"].files])
@@ -0,0 +1,116 @@
+import pytest
+
+from file_system_analyzer.models.classifiers import (
+    CLASSIFIERS,
+    Classifier,
+    ExtensionClassifier,
+    MappingClassifier,
+    SignatureClassifier,
+    get_classifier,
+    register_classifier,
+)
+from file_system_analyzer.models.errors import ScanErrors
+from file_system_analyzer.models.file_system_analyzer import FileMetadata, FileSystemAnalyzer
+
+
+def metadata(path, size=0):
+    return FileMetadata(str(path), size, 0o644)
+
+
+@pytest.mark.parametrize(
+    "name, header, category",
+    [
+        ("a.bin", b"\x89PNG\r\n\x1a\n" + b"\x00" * 10, "image"),
+        ("a.bin", b"%PDF-1.7\n", "document"),
+        ("a.bin", b"\x7fELF\x02\x01", "executable"),
+        ("a.bin", b"\x00" * 257 + b"ustar\x0000", "archive"),
+        ("a.bin", b"RIFF\x00\x00\x00\x00WAVEfmt ", "audio"),
+        ("a.bin", b"\x00\x00\x00\x18ftypmp42", "video"),
+        ("a.zip", b"PK\x03\x04rest", "archive"),
+        ("a.docx", b"PK\x03\x04rest", "document"),
+        ("a.bin", "plain text, naïve".encode(), "text"),
+        ("a.bin", "é".encode() * 256, "text"),
+        ("a.bin", b"\x00\x01\x02", None),
+        ("a.bin", b"\xff\xfe\xfd", None),
+        ("a.bin", b"", None),
+    ]
+)
+def test_signature_classifier(tmp_path, name, header, category):
+    path = tmp_path / name
+    path.write_bytes(header)
+    classifier = SignatureClassifier()
+    assert classifier.classify(metadata(path)) == category
+    assert classifier.classify_many([metadata(path)]) == [category]
+
+
+def test_signature_classifier_counts_failures(tmp_path):
+    (tmp_path / "a.txt").write_text("hello")
+    errors = ScanErrors()
+    categories = SignatureClassifier().classify_many([metadata(tmp_path / "missing"), metadata(tmp_path / "a.txt")],
+                                                     errors)
+    assert categories == [None, "text"]
+    assert errors.counts == {"classify: FileNotFoundError": 1}
+
+
+def test_extension_classifier():
+    assert ExtensionClassifier().classify_many([metadata("a.JPG"), metadata("a.unknown")]) == ["image", None]
+
+
+def test_mapping_classifier(tmp_path):
+    mapping = tmp_path / "mapping.txt"
+    mapping.write_text("# custom rules\n"
+                       ".LOG text\n"
+                       "Makefile text\n"
+                       "core.[0-9]* other\n"
+                       "*.tar.zst archive\n"
+                       "*.log document\n")
+    classifier = MappingClassifier(mapping)
+    paths = ["/a/server.log", "/a/Makefile", "/a/core.123", "/a/data.tar.zst", "/a/core.txt", "/a/image.png"]
+    # globs take precedence over extensions
+    assert classifier.classify_many([metadata(p) for p in paths]) == [
+        "document", "text", "other", "archive", None, None]
+
+
+def test_mapping_classifier_invalid_line(tmp_path):
+    mapping = tmp_path / "mapping.txt"
+    mapping.write_text(".log\n")
+    with pytest.raises(ValueError, match="mapping.txt:1"):
+        MappingClassifier(mapping)
+
+
+def test_registry(monkeypatch):
+    class Everything(Classifier):
+        name = "everything"
+
+        def classify(self, file):
+            return "document"
+
+    monkeypatch.setitem(CLASSIFIERS, "everything", None)
+    register_classifier("everything", Everything)
+    assert isinstance(get_classifier("everything"), Everything)
+    with pytest.raises(ValueError):
+        get_classifier("nonexistent")
+
+
+def test_classifier_without_classify_fails_when_created():
+    class Incomplete(Classifier):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_chain_in_analyzer(tmp_path):
+    (tmp_path / "notes.txt").write_bytes(b"\x00binary")
+    (tmp_path / "picture").write_bytes(b"GIF89a")
+    (tmp_path / "unknown.xyz").write_bytes(b"\x00\x01")
+
+    fsa = FileSystemAnalyzer(tmp_path, 1000, classifiers=[SignatureClassifier(), ExtensionClassifier()])
+    fsa.categorize_files()
+    categories = {category: [f.path for f in files.files] for category, files in fsa.files_by_category.items()}
+
+    assert categories == {
+        "text": [str(tmp_path / "notes.txt")],
+        "image": [str(tmp_path / "picture")],
+        "other": [str(tmp_path / "unknown.xyz")],
+    }
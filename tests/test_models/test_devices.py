@@ -0,0 +1,210 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from file_system_analyzer.models import file_system_analyzer as analyzer_module
+from file_system_analyzer.models.aging import AgeHistograms
+from file_system_analyzer.models.audit import SecurityAuditor
+from file_system_analyzer.models.classifiers import ExtensionClassifier
+from file_system_analyzer.models.devices import (DEVICE_CONCURRENCY, DeviceScheduler, device_kind, physical_offset,
+                                                 read_mount_types, read_order, statx_function)
+from file_system_analyzer.models.file_system_analyzer import FileSystemAnalyzer
+
+MOUNTINFO = """\
+22 1 259:2 / / rw,relatime shared:1 - ext4 /dev/nvme0n1p2 rw
+30 22 8:1 / /data rw,relatime shared:2 - xfs /dev/sda1 rw
+31 22 8:16 / /fast rw,relatime shared:3 - ext4 /dev/sdb rw
+40 22 0:50 / /mnt/nfs rw,relatime shared:4 - nfs4 server:/export rw,vers=4.2
+41 22 0:51 / /mnt/bucket rw,relatime shared:5 - fuse.mountpoint-s3 bucket rw
+42 22 0:26 / /tmp rw,nosuid shared:6 - tmpfs tmpfs rw
+"""
+
+# user and group ids nobody has
+ORPHAN_ID = 4_000_000_000
+
+
+@pytest.fixture
+def topology(tmp_path):
+    """
+    Fake sysfs with an NVMe partition, a partition of a spinning disk and an SSD
+    """
+    mountinfo = tmp_path / "mountinfo"
+    mountinfo.write_text(MOUNTINFO)
+    sys_root = tmp_path / "sys"
+    devices = sys_root / "devices"
+    for disk, rotational in (("nvme0n1", "0"), ("sda", "1"), ("sdb", "0")):
+        (devices / disk / "queue").mkdir(parents=True)
+        (devices / disk / "queue" / "rotational").write_text(rotational + "\n")
+    for disk, partition in (("nvme0n1", "nvme0n1p2"), ("sda", "sda1")):
+        (devices / disk / partition).mkdir()
+        (devices / disk / partition / "partition").write_text("1\n")
+    (sys_root / "dev" / "block").mkdir(parents=True)
+    for device, target in (("259:2", "nvme0n1/nvme0n1p2"), ("8:1", "sda/sda1"), ("8:16", "sdb")):
+        (sys_root / "dev" / "block" / device).symlink_to(devices / target)
+    return sys_root, mountinfo
+
+
+def test_read_mount_types(topology):
+    _, mountinfo = topology
+    types = read_mount_types(mountinfo)
+    assert types["259:2"] == "ext4"
+    assert types["0:50"] == "nfs4"
+    assert read_mount_types(mountinfo.parent / "missing") == {}
+
+
+@pytest.mark.parametrize("major, minor, kind", [
+    (259, 2, "nvme"),
+    (8, 1, "rotational"),
+    (8, 16, "ssd"),
+    (0, 50, "network"),
+    (0, 51, "network"),
+    (0, 26, "memory"),
+    (0, 99, "unknown"),
+])
+def test_device_kind(topology, major, minor, kind):
+    sys_root, mountinfo = topology
+    assert device_kind(os.makedev(major, minor), read_mount_types(mountinfo), sys_root) == kind
+
+
+def test_scheduler_concurrency(topology):
+    sys_root, mountinfo = topology
+    scheduler = DeviceScheduler(sys_root=sys_root, mountinfo=mountinfo)
+    assert scheduler.concurrency(os.makedev(259, 2)) == DEVICE_CONCURRENCY["nvme"]
+    assert scheduler.concurrency(os.makedev(8, 1)) == 1
+    assert scheduler.kinds == {os.makedev(259, 2): "nvme", os.makedev(8, 1): "rotational"}
+    assert DeviceScheduler(3).concurrency(os.makedev(8, 1)) == 3
+    with pytest.raises(ValueError):
+        DeviceScheduler(0)
+
+
+def test_scheduler_map(topology):
+    sys_root, mountinfo = topology
+    scheduler = DeviceScheduler(sys_root=sys_root, mountinfo=mountinfo)
+    threads = set()
+
+    def work(item):
+        threads.add(threading.current_thread().name)
+        return item * 2
+
+    # spinning disks are served serially by the calling thread
+    assert scheduler.map(os.makedev(8, 1), work, range(10)) == list(range(0, 20, 2))
+    assert threads == {threading.current_thread().name}
+    # results keep the order of the items on parallel devices
+    assert scheduler.map(os.makedev(259, 2), work, range(100)) == list(range(0, 200, 2))
+    assert any(name.startswith("fsa-dev") for name in threads)
+    scheduler.close()
+
+
+def test_statx_function():
+    function = statx_function(owner=True)
+    if not hasattr(os, "statx"):
+        assert function is None
+    else:
+        assert function(__file__).st_size == os.lstat(__file__).st_size
+
+
+def test_analyzer_with_scheduler(tmp_path):
+    for i in range(50):
+        (tmp_path / f"file_{i}.txt").write_text("x" * i)
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "nested.txt").write_text("nested")
+
+    serial = FileSystemAnalyzer(tmp_path, 10)
+    serial.categorize_files()
+    scheduler = DeviceScheduler(workers=4)
+    parallel = FileSystemAnalyzer(tmp_path, 10, scheduler=scheduler)
+    parallel.categorize_files()
+    # the scan shuts the pools of the scheduler down once it is done
+    assert not scheduler._pools
+    assert not any(thread.name.startswith("fsa-dev") for thread in threading.enumerate())
+
+    assert parallel.large_files == serial.large_files
+    assert ([(f.path, f.size) for f in parallel.files_by_category["text"].files]
+            == [(f.path, f.size) for f in serial.files_by_category["text"].files])
+
+
+def test_analyzer_with_statx(tmp_path, monkeypatch):
+    (tmp_path / "data.bin").write_bytes(b"x" * 100)
+    now = time.time()
+    calls = []
+
+    def fake_statx_function(owner):
+        calls.append(owner)
+
+        def statx(path):
+            # fields as os.statx reports them, which differ from lstat where statx is faked
+            real = os.lstat(path)
+            return SimpleNamespace(st_mode=real.st_mode, st_size=real.st_size, st_ino=real.st_ino, st_blocks=64,
+                                   st_uid=ORPHAN_ID, st_gid=ORPHAN_ID, st_mtime=now - 500 * 86400,
+                                   st_atime=now - 400 * 86400)
+        return statx
+
+    monkeypatch.setattr(analyzer_module, "statx_function", fake_statx_function)
+    auditor = SecurityAuditor()
+    age_histograms = AgeHistograms(cold_after_days=180, now=now)
+    analyzer = FileSystemAnalyzer(tmp_path, 10, size_mode="allocated", auditor=auditor,
+                                  age_histograms=age_histograms, classifiers=[ExtensionClassifier()])
+    analyzer.categorize_files()
+
+    # owners are only fetched by statx when they are audited
+    assert calls == [True]
+    [file] = [f for files in analyzer.files_by_category.values() for f in files.files]
+    assert (file.size, file.allocated_size) == (100, 64 * 512)
+    assert {finding.rule for finding in auditor.findings} == {"orphan-uid", "orphan-gid"}
+    assert age_histograms.top_cold_directories() == [(str(tmp_path), 100)]
+    # the file was just written, so its real access time is the newest bucket
+    assert age_histograms.accessed[file.category][0] == 0
+
+
+def test_physical_offset(tmp_path):
+    (tmp_path / "empty").touch()
+    assert physical_offset(tmp_path / "empty") is None
+    assert physical_offset(tmp_path / "missing") is None
+    (tmp_path / "data").write_bytes(b"x" * 8192)
+    os.sync()
+    offset = physical_offset(tmp_path / "data")
+    # FIEMAP isn't supported everywhere, e.g. on tmpfs or macOS
+    assert offset is None or offset >= 0
+
+
+def test_read_order(tmp_path):
+    stats = [os.stat_result((0, ino, 0, 0, 0, 0, 0, 0, 0, 0)) for ino in (30, 10, 20)]
+    paths = [str(tmp_path / name) for name in ("a", "b", "c")]
+    assert read_order(stats, paths, "scan") == [0, 1, 2]
+    assert read_order(stats, paths, "inode") == [1, 2, 0]
+    # files without a known physical offset are read in inode order
+    assert read_order(stats, paths, "physical") == [1, 2, 0]
+    with pytest.raises(ValueError):
+        read_order(stats, paths, "random")
+
+
+def test_classifiers_read_in_inode_order(tmp_path):
+    from file_system_analyzer.models.classifiers import Classifier, ExtensionClassifier
+
+    class RecordingClassifier(Classifier):
+        name = "recording"
+        read_bytes = 512
+
+        def __init__(self):
+            self.paths = []
+
+        def classify(self, file):
+            self.paths.append(file.path)
+            return None
+
+    for name in ("c.txt", "a.txt", "b.txt", "d.bin"):
+        (tmp_path / name).write_text(name)
+    recording = RecordingClassifier()
+    analyzer = FileSystemAnalyzer(tmp_path, 10, classifiers=[recording, ExtensionClassifier()], read_order="inode")
+    analyzer.categorize_files()
+
+    inodes = [os.lstat(path).st_ino for path in recording.paths]
+    assert len(inodes) == 4 and inodes == sorted(inodes)
+    # categories still belong to their files
+    assert sorted(os.path.basename(f.path) for f in analyzer.files_by_category["text"].files) == ["a.txt", "b.txt",
+                                                                                                 "c.txt"]
+    with pytest.raises(ValueError):
+        FileSystemAnalyzer(tmp_path, 10, read_order="random")
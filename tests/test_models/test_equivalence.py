@@ -0,0 +1,260 @@
+"""
+Every execution mode of FileSystemAnalyzer must give the same categories, sizes, permission findings and error counts
+as the reference serial walk. Trees are generated from random seeds with edge cases: symbolic links (to files,
+to directories, dangling and looping), hard links, special files, permission-denied directories, files vanishing
+between listing and stat, deep nesting and uppercase extensions.
+
+The stress tier runs on a tree of 1M+ files and is skipped unless FSA_STRESS is set, e.g.
+FSA_STRESS=1 pytest -m stress (or FSA_STRESS=200000 for a smaller tree).
+"""
+import os
+import random
+import stat
+
+import pytest
+
+from file_system_analyzer.models import file_system_analyzer as analyzer_module
+from file_system_analyzer.models.classifiers import ExtensionClassifier, SignatureClassifier
+from file_system_analyzer.models.devices import DeviceScheduler
+from file_system_analyzer.models.file_system_analyzer import FileSystemAnalyzer
+from file_system_analyzer.models.getdents import getdents_available
+from file_system_analyzer.models.sharding import PartialResult, merge_partial_results
+from file_system_analyzer.models.spill import RECORD_BYTES
+
+SEEDS = [1, 2, 3, 5]
+
+THRESHOLD = 2000
+
+EXTENSIONS = [".txt", ".TXT", ".md", ".JPG", ".png", ".Pdf", ".zip", ".tar.gz", ".py", ".CSV", ".mp3", ".bin", ""]
+
+MODES = [0o644, 0o600, 0o755, 0o777, 0o666, 0o4755, 0o2755, 0o775]
+
+CONTENTS = [
+    lambda rng, size: rng.randbytes(size),
+    lambda rng, size: ("line of text\n" * (size // 13 + 1))[:size].encode(),
+    lambda rng, size: b"\x89PNG\r\n\x1a\n" + bytes(size),
+    lambda rng, size: b"%PDF-1.4\n" + b"x" * size,
+]
+
+
+def build_tree(root, seed, files=150):
+    """
+    Generates a random tree and returns the directories which were made unreadable
+    """
+    rng = random.Random(seed)
+    directories = [root]
+    root.mkdir()
+    for i in range(files // 10):
+        parent = rng.choice(directories)
+        directory = parent / f"dir_{i}"
+        directory.mkdir()
+        directories.append(directory)
+
+    # a deep chain of directories
+    deep = root
+    for level in range(60):
+        deep = deep / f"level_{level}"
+    deep.mkdir(parents=True)
+    (deep / "bottom.txt").write_text("deep")
+    directories.append(deep)
+
+    regular = []
+    for i in range(files):
+        path = rng.choice(directories) / f"file_{i}{rng.choice(EXTENSIONS)}"
+        path.write_bytes(rng.choice(CONTENTS)(rng, rng.randrange(THRESHOLD * 2)))
+        os.chmod(path, rng.choice(MODES))
+        regular.append(path)
+
+    for i in range(files // 10):
+        directory = rng.choice(directories)
+        os.link(rng.choice(regular), directory / f"hardlink_{i}.txt")
+        (directory / f"symlink_{i}.txt").symlink_to(rng.choice(regular))
+        (directory / f"dirlink_{i}").symlink_to(rng.choice(directories), target_is_directory=True)
+        (directory / f"dangling_{i}").symlink_to(directory / "missing")
+        # files removed between listing and stat by vanish_after_listing, not in the root which is listed by
+        # every shard
+        (rng.choice(directories[1:]) / f"vanish_{i}.txt").write_text("vanishing")
+    (root / "loop").symlink_to(root, target_is_directory=True)
+    os.mkfifo(root / "pipe")
+
+    denied = []
+    for directory in rng.sample(directories[1:], 2):
+        (directory / "secret.txt").write_text("secret")
+        os.chmod(directory, 0)
+        denied.append(directory)
+    return denied
+
+
+@pytest.fixture
+def make_tree(tmp_path):
+    denied = []
+
+    def make(name, seed, files=150):
+        root = tmp_path / name
+        denied.extend(build_tree(root, seed, files))
+        return root
+
+    yield make
+    # let pytest remove the tree
+    for directory in denied:
+        os.chmod(directory, stat.S_IRWXU)
+
+
+@pytest.fixture
+def vanish_after_listing(monkeypatch):
+    """
+    Removes files named vanish_* right after their directory is listed, as if they were deleted mid-scan
+    """
+    list_directory = analyzer_module.list_directory
+
+    def listing(path, backend="scandir"):
+        entries = list_directory(path, backend)
+        for entry in entries:
+            if entry.name.startswith("vanish_"):
+                os.unlink(entry.path)
+        return entries
+
+    monkeypatch.setattr(analyzer_module, "list_directory", listing)
+
+
+def summarize(analyzer):
+    root = analyzer.dir_path
+
+    def relative(path):
+        return os.path.relpath(path, root)
+
+    return {
+        "categories": {
+            category: (files.size, files.allocated_size,
+                       sorted((relative(f.path), f.size, f.permissions, f.flags) for f in files.files))
+            for category, files in analyzer.files_by_category.items() if files.files
+        },
+        "large_files": sorted((relative(path), size) for path, size in analyzer.large_files.items()),
+        "unusual_permissions": sorted((relative(path), tuple(names))
+                                      for path, names in analyzer.unusual_permissions_files.items()),
+        "permission_counts": analyzer.permission_counts,
+        "errors": analyzer.errors.counts,
+    }
+
+
+def scan(root, **kwargs):
+    # libmagic is left out for speed, signatures still read file contents
+    kwargs.setdefault("classifiers", [SignatureClassifier(), ExtensionClassifier()])
+    analyzer = FileSystemAnalyzer(root, THRESHOLD, **kwargs)
+    analyzer.categorize_files()
+    return analyzer
+
+
+def reference(make_tree, seed, files=150):
+    return summarize(scan(make_tree("reference", seed, files)))
+
+
+EXECUTION_MODES = {
+    "scheduler": lambda: {"scheduler": DeviceScheduler(workers=8)},
+    "inode_order": lambda: {"read_order": "inode"},
+    "physical_order": lambda: {"read_order": "physical"},
+    "memory_limit": lambda: {"memory_limit": 20 * RECORD_BYTES},
+    "getdents": lambda: {"listing_backend": "getdents"},
+}
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("mode", EXECUTION_MODES)
+def test_modes_match_serial_walk(make_tree, vanish_after_listing, seed, mode):
+    if mode == "getdents" and not getdents_available():
+        pytest.skip("getdents64 is only available on Linux")
+    expected = reference(make_tree, seed)
+    assert expected["errors"]["stat: FileNotFoundError"] > 0
+
+    analyzer = scan(make_tree(mode, seed), **EXECUTION_MODES[mode]())
+    assert summarize(analyzer) == expected
+    if analyzer.scheduler is not None:
+        analyzer.scheduler.close()
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_iter_files_matches_serial_walk(make_tree, vanish_after_listing, seed):
+    expected = reference(make_tree, seed)
+    analyzer = FileSystemAnalyzer(make_tree("streaming", seed), THRESHOLD,
+                                  classifiers=[SignatureClassifier(), ExtensionClassifier()])
+    streamed = {}
+    for file in analyzer.iter_files():
+        streamed.setdefault(file.category, []).append(
+            (os.path.relpath(file.path, analyzer.dir_path), file.size, file.permissions, file.flags))
+    assert {category: sorted(files) for category, files in streamed.items()} == {
+        category: files for category, (_, _, files) in expected["categories"].items()}
+    assert analyzer.errors.counts == expected["errors"]
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_shards_match_serial_walk(make_tree, vanish_after_listing, seed):
+    root = make_tree("sharded", seed)
+    whole = PartialResult.from_analyzer(scan(make_tree("whole", seed)), top_k=20)
+    merged = merge_partial_results([PartialResult.from_analyzer(scan(root, shard=(index, 3)), top_k=20)
+                                    for index in range(1, 4)])
+
+    def relative(result, base):
+        return ({category: (t.size, t.count, t.allocated_size) for category, t in result.categories.items()},
+                [(os.path.relpath(path, base), size) for path, size in result.large_files],
+                sorted((os.path.relpath(path, base), names) for path, names in result.unusual_permissions.items()),
+                result.errors)
+
+    assert relative(merged, root) == relative(whole, whole.dir_path)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("stop_after", [30, 80, 130])
+def test_resumed_scan_matches_serial_walk(make_tree, tmp_path, seed, stop_after):
+    expected = reference(make_tree, seed)
+    checkpoint = tmp_path / f"scan-{seed}-{stop_after}.ckpt"
+    interrupted = FileSystemAnalyzer(make_tree("interrupted", seed), THRESHOLD, checkpoint_path=checkpoint,
+                                     checkpoint_interval=0, classifiers=[SignatureClassifier(), ExtensionClassifier()])
+    # records after the last checkpoint are lost, as if the scan was killed
+    files = (file for batch in interrupted._walk_directories(checkpoints=True) for file in batch)
+    for i, file in enumerate(files):
+        interrupted._record_files([file])
+        if i == stop_after:
+            break
+
+    resumed = FileSystemAnalyzer.resume(checkpoint, classifiers=[SignatureClassifier(), ExtensionClassifier()])
+    resumed.categorize_files()
+    assert summarize(resumed) == expected
+
+
+def stress_files():
+    value = os.environ.get("FSA_STRESS", "")
+    if not value:
+        return 0
+    return int(value) if value.isdigit() and int(value) > 1 else 1_000_000
+
+
+def build_flat_tree(root, files):
+    # empty files spread over directories of 10,000, so the tree is cheap to create but has many entries
+    for i in range(files):
+        directory = root / f"shard_{i // 10_000:04d}"
+        if i % 10_000 == 0:
+            directory.mkdir(parents=True)
+        with open(directory / f"object_{i:08d}{EXTENSIONS[i % len(EXTENSIONS)]}", "wb") as f:
+            if i % 1000 == 0:
+                f.truncate(THRESHOLD * 10)
+
+
+@pytest.mark.stress
+@pytest.mark.skipif(not stress_files(), reason="set FSA_STRESS to run the stress tier")
+def test_stress_modes_match_serial_walk(tmp_path):
+    root = tmp_path / "stress"
+    build_flat_tree(root, stress_files())
+    # extensions only, the stress tier is about the walk rather than libmagic
+    classifiers = [ExtensionClassifier()]
+
+    def totals(analyzer):
+        return ({category: (files.size, len(files.files)) for category, files in analyzer.files_by_category.items()},
+                sorted(analyzer.large_files), analyzer.permission_counts, analyzer.errors.counts)
+
+    expected = totals(scan(root, classifiers=classifiers))
+    assert sum(count for _, count in expected[0].values()) == stress_files()
+    modes = [{"scheduler": DeviceScheduler(workers=8)}, {"memory_limit": 64 * 1024 ** 2}]
+    if getdents_available():
+        modes.append({"listing_backend": "getdents"})
+    for mode in modes:
+        assert totals(scan(root, classifiers=classifiers, **mode)) == expected
@@ -0,0 +1,72 @@
+import os
+
+from file_system_analyzer.models.classifiers import Classifier, ExtensionClassifier
+from file_system_analyzer.models.errors import ScanErrors
+import file_system_analyzer.models.file_system_analyzer as fs
+
+
+def test_errors_are_counted_with_bounded_samples():
+    errors = ScanErrors(max_samples=2)
+    assert not errors
+    for i in range(5):
+        errors.record("stat", f"/data/{i}", FileNotFoundError(f"missing {i}"))
+    errors.record("directory", "/data", PermissionError("denied"))
+
+    assert errors.counts == {"stat: FileNotFoundError": 5, "directory: PermissionError": 1}
+    assert errors.total == 6
+    assert errors.samples == [("stat", "/data/0", "missing 0"), ("stat", "/data/1", "missing 1")]
+    assert ScanErrors.from_dict(errors.to_dict()).counts == errors.counts
+
+
+def test_failing_entry_does_not_stop_directory(tmp_path):
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (tmp_path / name).write_text(name)
+
+    class VanishingClassifier(Classifier):
+        def classify(self, file):
+            if os.path.basename(file.path) == "b.txt":
+                raise FileNotFoundError(file.path)
+            return "document"
+
+    fsa = fs.FileSystemAnalyzer(tmp_path, 1000, classifiers=[VanishingClassifier(), ExtensionClassifier()])
+    fsa.categorize_files()
+
+    # the failing file is still counted, by its extension
+    assert len(fsa.files_by_category["document"].files) == 2
+    assert [f.path for f in fsa.files_by_category["text"].files] == [str(tmp_path / "b.txt")]
+    assert fsa.errors.counts == {"classify: FileNotFoundError": 1}
+    assert fsa.errors.samples[0][1] == str(tmp_path / "b.txt")
+
+
+def test_failing_directory_is_counted(tmp_path, monkeypatch):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "file.txt").write_text("hello")
+    (tmp_path / "file.txt").write_text("hello")
+    scandir = os.scandir
+
+    def failing_scandir(path):
+        if os.fspath(path).endswith("sub"):
+            raise PermissionError(f"denied: {path}")
+        return scandir(path)
+
+    monkeypatch.setattr(fs.os, "scandir", failing_scandir)
+    fsa = fs.FileSystemAnalyzer(tmp_path, 1000)
+    fsa.categorize_files()
+
+    assert fsa.errors.counts == {"directory: PermissionError": 1}
+    assert len(fsa.files_by_category["text"].files) == 1
+
+
+def test_symlinks_and_special_files_are_skipped(tmp_path):
+    target = tmp_path / "target"
+    target.mkdir()
+    (target / "file.txt").write_text("hello")
+    (tmp_path / "scan").mkdir()
+    (tmp_path / "scan" / "dir_link").symlink_to(target)
+    (tmp_path / "scan" / "file_link.txt").symlink_to(target / "file.txt")
+    os.mkfifo(tmp_path / "scan" / "fifo")
+
+    fsa = fs.FileSystemAnalyzer(tmp_path / "scan", 1000)
+    fsa.categorize_files()
+    assert not fsa.files_by_category
+    assert not fsa.errors
@@ -0,0 +1,156 @@
+import os
+import random
+
+import pytest
+
+from file_system_analyzer.models import estimate as estimate_module
+from file_system_analyzer.models.classifiers import ExtensionClassifier, MappingClassifier
+from file_system_analyzer.models.estimate import StratifiedSampler, chain_classify, estimate_categories
+from file_system_analyzer.models.utils import infer_file_type_extension
+
+
+def test_fully_sampled_strata_are_exact():
+    sampler = StratifiedSampler(10, seed=1)
+    sampler.add("/a.txt", 100)
+    sampler.add("/b.txt", 120)
+    sampler.add("/c.png", 100)
+    estimate = sampler.estimate(lambda path: "image" if path.endswith(".png") else "text")
+
+    assert estimate.files == 3 and estimate.sampled == 3 and estimate.size == 320
+    assert estimate.categories["text"].size == pytest.approx(220)
+    assert estimate.categories["text"].size_margin == 0
+    assert estimate.categories["image"].count == pytest.approx(1)
+    assert estimate.categories["image"].count_margin == 0
+
+
+def test_classification_is_bounded():
+    sampler = StratifiedSampler(5, seed=1)
+    for i in range(1000):
+        sampler.add(f"/data/{i}.bin", 1000)
+    classified = []
+    estimate = sampler.estimate(lambda path: classified.append(path) or "other")
+
+    # all files share one stratum
+    assert estimate.strata == 1
+    assert len(classified) == estimate.sampled == 5
+    assert estimate.categories["other"].size == pytest.approx(1_000_000)
+    assert estimate.categories["other"].count == pytest.approx(1000)
+
+
+def test_confidence_intervals_cover_true_totals():
+    rng = random.Random(7)
+    files = {}
+    for i in range(5000):
+        extension = rng.choice([".dat", ".bin"])
+        category = "image" if rng.random() < (0.3 if extension == ".dat" else 0.7) else "other"
+        files[f"/data/{i}{extension}"] = (int(rng.lognormvariate(8, 2)), category)
+    true_size = sum(size for size, category in files.values() if category == "image")
+
+    covered = 0
+    for seed in range(100):
+        sampler = StratifiedSampler(10, seed=seed)
+        for path, (size, _) in files.items():
+            sampler.add(path, size)
+        image = sampler.estimate(lambda path: files[path][1]).categories["image"]
+        covered += abs(image.size - true_size) <= image.size_margin
+    # the nominal coverage is 95%
+    assert covered >= 85
+
+
+def test_estimates_add_up_to_total():
+    sampler = StratifiedSampler(3, seed=2)
+    for i in range(300):
+        sampler.add(f"/f{i}.{'abc'[i % 3]}", i * 37)
+    estimate = sampler.estimate(lambda path: "text" if int(path[2:].split(".")[0]) % 2 else "other")
+    assert sum(c.size for c in estimate.categories.values()) == pytest.approx(estimate.size)
+    assert sum(c.count for c in estimate.categories.values()) == pytest.approx(estimate.files)
+
+
+def test_invalid_samples_per_stratum():
+    with pytest.raises(ValueError):
+        StratifiedSampler(1)
+
+
+def test_estimate_categories_walks_tree(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "a.txt").write_text("a" * 10)
+    (tmp_path / "b.png").write_bytes(b"\x00" * 20)
+    (tmp_path / "link.txt").symlink_to(tmp_path / "sub" / "a.txt")
+
+    estimate = estimate_categories(tmp_path, infer_file_type_extension, seed=0)
+    assert estimate.files == 2
+    assert estimate.categories["text"].size == pytest.approx(10)
+    assert estimate.categories["image"].size == pytest.approx(20)
+
+
+def test_failed_samples_are_left_out():
+    sampler = StratifiedSampler(4, seed=0)
+    for i in range(8):
+        sampler.add(f"/data/{i}.txt", 100)
+    sampler.add("/data/gone.png", 50)
+
+    def classify(path):
+        if path.endswith(("1.txt", "2.txt", "3.txt", "4.txt", ".png")):
+            raise FileNotFoundError(path)
+        return "text"
+
+    estimate = sampler.estimate(classify)
+
+    # the remaining samples of a stratum still represent all of its files, a stratum without any isn't guessed
+    assert estimate.sampled + estimate.failed == 5
+    assert estimate.failed == estimate.errors.total
+    assert estimate.categories["text"].size == pytest.approx(800)
+    assert estimate.categories["text"].count == pytest.approx(8)
+    assert (estimate.unclassified_files, estimate.unclassified_size) == (1, 50)
+
+
+def test_failing_entries_dont_drop_siblings(tmp_path, monkeypatch):
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (tmp_path / name).write_text("x" * 10)
+    real_scandir = os.scandir
+
+    class Entry:
+        def __init__(self, entry):
+            self._entry = entry
+            self.path = entry.path
+
+        def is_dir(self, follow_symlinks=True):
+            return self._entry.is_dir(follow_symlinks=follow_symlinks)
+
+        def is_file(self, follow_symlinks=True):
+            return self._entry.is_file(follow_symlinks=follow_symlinks)
+
+        def stat(self, follow_symlinks=True):
+            if self.path.endswith("a.txt"):
+                raise FileNotFoundError(self.path)
+            return self._entry.stat(follow_symlinks=follow_symlinks)
+
+    class Listing:
+        def __init__(self, path):
+            self._listing = real_scandir(path)
+
+        def __enter__(self):
+            return sorted((Entry(entry) for entry in self._listing), key=lambda entry: entry.path)
+
+        def __exit__(self, *args):
+            self._listing.close()
+
+    monkeypatch.setattr(estimate_module.os, "scandir", Listing)
+    estimate = estimate_categories(tmp_path, infer_file_type_extension, seed=0)
+
+    assert estimate.files == 2
+    assert estimate.errors.counts == {"stat: FileNotFoundError": 1}
+
+
+def test_chain_classify_matches_full_scan(tmp_path):
+    mapping = tmp_path / "rules.map"
+    mapping.write_text(".log text\n")
+    (tmp_path / "server.log").write_text("started")
+    (tmp_path / "photo.jpg").write_bytes(b"\x00")
+    classify = chain_classify([MappingClassifier(mapping), ExtensionClassifier()])
+
+    assert classify(str(tmp_path / "server.log")) == "text"
+    assert classify(str(tmp_path / "photo.jpg")) == "image"
+    assert classify(str(tmp_path / "rules.map")) == "other"
+    with pytest.raises(FileNotFoundError):
+        classify(str(tmp_path / "missing.txt"))
@@ -1,6 +1,8 @@
 import os
 import stat
 
+import pytest
+
 import file_system_analyzer.models.file_system_analyzer as fs
 
 
@@ -50,4 +52,97 @@ def test_file_system_analyzer_class(tmp_path):
     assert result["executable"].size == big.stat().st_size
     assert fsa.large_files == {str(big): result["executable"].files[0].converted_size}
     assert fsa.unusual_permissions_files == {str(big): ["world-writable"]}
-    assert any(f.path == str(big) for f in result["executable"].files)
\ No newline at end of file
+    assert fsa.permission_counts == {"world-writable": 1}
+    assert any(f.path == str(big) for f in result["executable"].files)
+
+
+def test_file_metadata_allocated_size():
+    sparse = fs.FileMetadata("disk.img", 10 * 1024 ** 2, 0o644, 4096)
+    assert sparse.is_sparse
+    assert sparse.converted_allocated_size == "4 KiB"
+    assert sparse.measured_size("apparent") == 10 * 1024 ** 2
+    assert sparse.measured_size("allocated") == 4096
+
+    unknown = fs.FileMetadata("file.txt", 100, 0o644)
+    assert not unknown.is_sparse
+    assert unknown.measured_size("allocated") == 100
+
+
+def test_file_system_analyzer_size_mode(tmp_path):
+    threshold = 1024 ** 2
+    sparse = tmp_path / "disk.img"
+    with open(sparse, "wb") as f:
+        f.truncate(8 * threshold)
+    if sparse.stat().st_blocks * 512 >= threshold:
+        pytest.skip("file system does not support sparse files")
+
+    apparent = fs.FileSystemAnalyzer(tmp_path, threshold)
+    apparent.categorize_files()
+    allocated = fs.FileSystemAnalyzer(tmp_path, threshold, size_mode="allocated")
+    allocated.categorize_files()
+
+    assert str(sparse) in apparent.large_files
+    assert allocated.large_files == {}
+    category = allocated.files_by_category[next(iter(allocated.files_by_category))]
+    assert category.size == 8 * threshold
+    assert category.allocated_size == sparse.stat().st_blocks * 512
+
+
+def test_file_system_analyzer_invalid_size_mode(tmp_path):
+    with pytest.raises(ValueError):
+        fs.FileSystemAnalyzer(tmp_path, 1024, size_mode="logical")
+
+
+def test_iter_files(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.txt").write_text("hello")
+    (tmp_path / "sub" / "b.txt").write_text("world!")
+    os.chmod(tmp_path / "sub" / "b.txt", 0o666)
+
+    visited = []
+    fsa = fs.FileSystemAnalyzer(tmp_path, 1, visitors=[visited.append])
+    records = list(fsa.iter_files())
+
+    assert [(r.path, r.category, r.size) for r in records] == [
+        (str(tmp_path / "a.txt"), "text", 5),
+        (str(tmp_path / "sub" / "b.txt"), "text", 6),
+    ]
+    assert records[1].unusual_permissions == ["world-writable", "group-writable"]
+    assert visited == records
+    # nothing is kept per file, only constant-size aggregates
+    assert not fsa.files_by_category and not fsa.large_files and not fsa.unusual_permissions_files
+    assert fsa.permission_counts == {"world-writable": 1, "group-writable": 1}
+    assert not hasattr(records[0], "__dict__")
+
+
+def test_failing_visitor_keeps_the_tree(tmp_path):
+    (tmp_path / "sub" / "deeper").mkdir(parents=True)
+    (tmp_path / "a.txt").write_text("top")
+    (tmp_path / "sub" / "b.txt").write_text("middle")
+    (tmp_path / "sub" / "deeper" / "c.txt").write_text("bottom")
+
+    def reject_top_level(file):
+        if os.path.dirname(file.path) == str(tmp_path):
+            raise RuntimeError("rejected")
+
+    fsa = fs.FileSystemAnalyzer(tmp_path, 1, visitors=[reject_top_level])
+    fsa.categorize_files()
+
+    # the failure is counted for the file, the directory and its subdirectories are still scanned
+    assert sorted(f.path for f in fsa.files_by_category["text"].files) == [
+        str(tmp_path / "a.txt"), str(tmp_path / "sub" / "b.txt"), str(tmp_path / "sub" / "deeper" / "c.txt")]
+    assert fsa.errors.counts == {"visitor: RuntimeError": 1}
+
+
+def test_iter_files_matches_categorize_files(tmp_path):
+    for i in range(3):
+        (tmp_path / f"dir_{i}").mkdir()
+        (tmp_path / f"dir_{i}" / f"file_{i}.txt").write_text("x" * i)
+        (tmp_path / f"dir_{i}" / "image.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+
+    fsa = fs.FileSystemAnalyzer(tmp_path, 1)
+    fsa.categorize_files()
+    categorized = [f for files in fsa.files_by_category.values() for f in files.files]
+
+    streamed = list(fs.FileSystemAnalyzer(tmp_path, 1).iter_files())
+    assert sorted(streamed, key=lambda f: f.path) == sorted(categorized, key=lambda f: f.path)
@@ -0,0 +1,117 @@
+import itertools
+import os
+
+import pytest
+
+from file_system_analyzer.models.file_system_analyzer import FileSystemAnalyzer
+from file_system_analyzer.models import devices
+from file_system_analyzer.models.getdents import (DT_UNKNOWN, Dirent, auto_listing_backend, check_listing_backend,
+                                                  getdents_available, iter_dirent_batches, list_directory)
+
+linux_only = pytest.mark.skipif(not getdents_available(), reason="getdents64 is only available on Linux")
+
+
+def make_tree(root):
+    (root / "sub").mkdir()
+    (root / "sub" / "nested.txt").write_text("nested")
+    (root / "plain.txt").write_text("hello")
+    (root / "ünïcödé.md").write_text("# title")
+    (root / "link").symlink_to(root / "plain.txt")
+    os.mkfifo(root / "pipe")
+    # a name which isn't valid UTF-8 round-trips like os.scandir does
+    open(os.path.join(os.fsencode(root), b"bad\xffname"), "w").close()
+
+
+def describe(entries):
+    return sorted((e.name, e.path, e.is_dir(follow_symlinks=False), e.is_file(follow_symlinks=False),
+                   e.is_symlink(), e.is_file()) for e in entries)
+
+
+@linux_only
+def test_getdents_matches_scandir(tmp_path):
+    make_tree(tmp_path)
+    entries = list_directory(tmp_path, "getdents")
+    assert all(isinstance(entry, Dirent) for entry in entries)
+    assert describe(entries) == describe(os.scandir(tmp_path))
+    plain = next(entry for entry in entries if entry.name == "plain.txt")
+    assert plain.stat(follow_symlinks=False).st_size == 5
+    assert os.fspath(plain) == str(tmp_path / "plain.txt")
+
+
+@linux_only
+def test_getdents_batches(tmp_path):
+    for i in range(500):
+        (tmp_path / f"file_{i:04d}").touch()
+    # a small buffer takes many calls, each yielding one batch
+    batches = list(iter_dirent_batches(tmp_path, buffer_size=4096))
+    assert len(batches) > 1
+    assert sorted(entry.name for batch in batches for entry in batch) == sorted(os.listdir(tmp_path))
+
+
+@linux_only
+def test_interleaved_listings_share_the_buffer(tmp_path):
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        for i in range(300):
+            (tmp_path / name / f"{name}_ü_{i:04d}").touch()
+    # listings of one thread reuse its buffer, every batch is parsed before the next call refills it
+    first = iter_dirent_batches(tmp_path / "a", buffer_size=4096)
+    second = iter_dirent_batches(tmp_path / "b", buffer_size=4096)
+    names = {"a": [], "b": []}
+    for batch_a, batch_b in itertools.zip_longest(first, second, fillvalue=[]):
+        names["a"].extend(entry.name for entry in batch_a)
+        names["b"].extend(entry.name for entry in batch_b)
+    assert sorted(names["a"]) == sorted(os.listdir(tmp_path / "a"))
+    assert sorted(names["b"]) == sorted(os.listdir(tmp_path / "b"))
+
+
+@linux_only
+def test_auto_uses_getdents_on_remote_fuse_mounts(tmp_path, monkeypatch):
+    for fs_type, backend in [("fuse.s3fs", "getdents"), ("fuse.sshfs", "getdents"), ("fuse", "scandir"),
+                             ("fuseblk", "scandir"), ("nfs4", "scandir"), ("ext4", "scandir")]:
+        monkeypatch.setattr(devices, "file_system_type", lambda path: fs_type)
+        assert auto_listing_backend(tmp_path) == backend
+        assert check_listing_backend("auto", tmp_path) == backend
+    monkeypatch.undo()
+    assert auto_listing_backend(tmp_path / "missing") == "scandir"
+
+
+@linux_only
+def test_getdents_missing_directory(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        list_directory(tmp_path / "missing", "getdents")
+
+
+def test_unknown_type_falls_back_to_stat(tmp_path):
+    (tmp_path / "file.txt").write_text("x")
+    (tmp_path / "dir").mkdir()
+    file = Dirent("file.txt", str(tmp_path / "file.txt"), DT_UNKNOWN)
+    directory = Dirent("dir", str(tmp_path / "dir"), DT_UNKNOWN)
+    vanished = Dirent("gone", str(tmp_path / "gone"), DT_UNKNOWN)
+    assert file.is_file(follow_symlinks=False) and not file.is_dir(follow_symlinks=False)
+    assert directory.is_dir(follow_symlinks=False) and not directory.is_symlink()
+    assert not vanished.is_file(follow_symlinks=False)
+
+
+def test_listing_backends(tmp_path, monkeypatch):
+    with pytest.raises(ValueError):
+        check_listing_backend("readdir")
+    # other systems fall back to scandir
+    monkeypatch.setattr("file_system_analyzer.models.getdents._getdents", False)
+    assert check_listing_backend("getdents") == "scandir"
+    assert check_listing_backend("auto") == "auto"
+    (tmp_path / "file.txt").touch()
+    assert [entry.name for entry in list_directory(tmp_path, "auto")] == ["file.txt"]
+
+
+@linux_only
+def test_analyzer_with_getdents(tmp_path):
+    make_tree(tmp_path)
+    results = {}
+    for backend in ("scandir", "getdents"):
+        analyzer = FileSystemAnalyzer(tmp_path, 3, listing_backend=backend)
+        analyzer.categorize_files()
+        results[backend] = {category: sorted((f.path, f.size, f.flags) for f in files.files)
+                            for category, files in analyzer.files_by_category.items()}
+    assert results["getdents"] == results["scandir"]
+    assert sum(len(files) for files in results["getdents"].values()) == 4
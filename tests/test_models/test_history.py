@@ -0,0 +1,160 @@
+import json
+import threading
+import time
+
+import pytest
+
+from file_system_analyzer.models.aging import SECONDS_PER_DAY
+from file_system_analyzer.models.file_system_analyzer import FileSystemAnalyzer
+from file_system_analyzer.models.history import (OTHER_DIRECTORIES, ROOT_FILES, ScanHistory, Snapshot,
+                                                 compute_trends, retained)
+from file_system_analyzer.models.sharding import CategoryTotals
+
+NOW = 1_750_000_000
+
+
+def snapshot(days_ago, text_size, directories=None, dir_path="/data"):
+    return Snapshot(dir_path, NOW - days_ago * SECONDS_PER_DAY, categories={"text": CategoryTotals(text_size, 1)},
+                    directories=directories or {"docs": CategoryTotals(text_size, 1)})
+
+
+def test_snapshot_from_analyzer(tmp_path):
+    for d in range(3):
+        (tmp_path / f"dir_{d}" / "nested").mkdir(parents=True)
+        (tmp_path / f"dir_{d}" / "nested" / "notes.txt").write_text("x" * (d + 1) * 10)
+    (tmp_path / "top.txt").write_text("top")
+    analyzer = FileSystemAnalyzer(tmp_path, 1000)
+    analyzer.categorize_files()
+
+    result = Snapshot.from_analyzer(analyzer, now=NOW)
+    assert result.time == NOW
+    assert result.categories["text"].count == 4
+    assert {name: totals.size for name, totals in result.directories.items()} == {
+        "dir_0": 10, "dir_1": 20, "dir_2": 30, ROOT_FILES: 3}
+
+    truncated = Snapshot.from_analyzer(analyzer, now=NOW, max_directories=2)
+    assert {name: totals.size for name, totals in truncated.directories.items()} == {
+        "dir_2": 30, "dir_1": 20, OTHER_DIRECTORIES: 13}
+
+
+def test_history_round_trip(tmp_path):
+    history = ScanHistory(tmp_path / "history.jsonl")
+    history.append(snapshot(1, 100))
+    history.append(snapshot(0, 200, dir_path="/other"))
+    history.append(snapshot(2, 50))
+
+    assert [s.categories["text"].size for s in history.load("/data")] == [50, 100]
+    assert len(history.load()) == 3
+    assert history.load("/other")[0] == snapshot(0, 200, dir_path="/other")
+
+
+def test_history_skips_truncated_record(tmp_path):
+    path = tmp_path / "history.jsonl"
+    history = ScanHistory(path)
+    history.append(snapshot(1, 100))
+    with open(path, "a") as f:
+        f.write(json.dumps(snapshot(0, 200).to_dict())[:40])
+    assert len(history.load()) == 1
+
+
+def test_retained():
+    # five years of daily scans
+    snapshots = [snapshot(days_ago, days_ago) for days_ago in range(5 * 365, -1, -1)]
+    kept = retained(snapshots, NOW)
+    ages = [(NOW - s.time) / SECONDS_PER_DAY for s in kept]
+    assert ages == sorted(ages, reverse=True)
+    assert len(kept) < 300
+    # every day of the last 90 is kept, older ones are thinned out
+    assert sum(age < 90 for age in ages) == 90
+    assert max(b - a for a, b in zip(ages[1:], ages)) <= 30
+    # snapshots kept once stay kept until they move on to a longer period
+    assert retained(kept, NOW) == kept
+
+
+def test_compact(tmp_path):
+    history = ScanHistory(tmp_path / "history.jsonl")
+    for days_ago in range(400, 360, -1):
+        history.append(snapshot(days_ago, days_ago))
+    assert len(history.load()) == 40
+
+    assert history.compact(NOW, min_dropped=1000) == 0
+    dropped = history.compact(NOW)
+    assert dropped > 30
+    assert len(history.load()) == 40 - dropped
+
+
+def test_compactions_dont_lose_concurrent_appends(tmp_path):
+    history = ScanHistory(tmp_path / "history.jsonl")
+    history.append(snapshot(1, 0))
+
+    def append_fresh(start):
+        for size in range(start, start + 100):
+            ScanHistory(history.path).append(snapshot(0, size))
+
+    def expire_and_compact():
+        for days_ago in range(400, 500):
+            compactor = ScanHistory(history.path)
+            compactor.append(snapshot(days_ago, days_ago))
+            compactor.compact(NOW, min_dropped=1)
+
+    threads = [threading.Thread(target=append_fresh, args=(start,)) for start in range(1000, 5000, 1000)]
+    threads += [threading.Thread(target=expire_and_compact) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # expired snapshots are thinned out, while every recent one is kept
+    recent = sorted(s.categories["text"].size for s in history.load() if s.time > NOW - 90 * SECONDS_PER_DAY)
+    assert recent == [0] + [size for start in range(1000, 5000, 1000) for size in range(start, start + 100)]
+    assert [path.name for path in tmp_path.iterdir()] == ["history.jsonl"]
+
+
+def test_compute_trends():
+    snapshots = [snapshot(days_ago, 1000 - days_ago * 10) for days_ago in (60, 20, 10, 0)]
+    report = compute_trends(snapshots, window_days=30, horizon_days=10)
+
+    assert report.snapshots == 4
+    assert report.total.size == 1000
+    assert report.total.change == 100
+    text, = report.categories
+    # rates are fitted only over the snapshots of the window
+    assert text.rate == pytest.approx(10)
+    assert text.projected_size == 1100
+    docs, = report.directories
+    assert docs.rate == pytest.approx(10)
+
+
+def test_compute_trends_missing_entries():
+    snapshots = [
+        snapshot(2, 0, {"docs": CategoryTotals(0, 1), OTHER_DIRECTORIES: CategoryTotals(5, 1)}),
+        snapshot(1, 0, {"docs": CategoryTotals(0, 1)}),
+        snapshot(0, 0, {"docs": CategoryTotals(0, 1), "new": CategoryTotals(100, 1)}),
+    ]
+    new = next(trend for trend in compute_trends(snapshots).directories if trend.name == "new")
+    # the directory counts as empty where the table is complete, and unknown where it was truncated
+    assert new.change == 100
+    assert new.rate == pytest.approx(100)
+
+
+def test_compute_trends_single_snapshot():
+    report = compute_trends([snapshot(0, 100)])
+    assert report.total.change is None and report.total.rate is None and report.total.projected_size is None
+
+
+def test_compute_trends_no_snapshots():
+    with pytest.raises(ValueError):
+        compute_trends([])
+
+
+def test_trends_of_years_of_history_are_fast(tmp_path):
+    history = ScanHistory(tmp_path / "history.jsonl")
+    directories = {f"dir_{i}": CategoryTotals(i, i) for i in range(50)}
+    with open(history.path, "w") as f:
+        for days_ago in range(3 * 365, -1, -1):
+            f.write(json.dumps(snapshot(days_ago, days_ago, directories).to_dict()) + "\n")
+    history.compact(NOW)
+
+    start = time.perf_counter()
+    compute_trends(history.load())
+    assert time.perf_counter() - start < 0.5
@@ -0,0 +1,58 @@
+import random
+import stat
+
+import pytest
+
+import file_system_analyzer.models.permissions as permissions
+from file_system_analyzer.models.permissions import (FLAG_NAMES, analyze_modes, count_flags, decode_counts,
+                                                     decode_flags, permission_flags)
+from file_system_analyzer.models.utils import detect_unusual_permissions
+
+
+def reference_flags(mode):
+    return [name for name, mask in permissions.UNUSUAL_PERMISSIONS if mode & mask]
+
+
+@pytest.fixture(params=["table", "numpy"])
+def engine(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+        monkeypatch.setattr(permissions, "NUMPY_MIN_BATCH", 1)
+    else:
+        monkeypatch.setattr(permissions, "NUMPY_MIN_BATCH", float("inf"))
+    return request.param
+
+
+def test_permission_flags_match_every_mode():
+    for mode in range(0o7777 + 1):
+        assert decode_flags(permission_flags(stat.S_IFREG | mode)) == reference_flags(mode)
+
+
+def test_decode_flags():
+    assert decode_flags(0) == []
+    assert decode_flags(permission_flags(stat.S_IWOTH | stat.S_ISUID)) == ["world-writable", "set-uid"]
+    # callers get their own list
+    decode_flags(1).append("changed")
+    assert decode_flags(1) == ["world-writable"]
+
+
+def test_analyze_modes(engine):
+    rng = random.Random(42)
+    modes = [stat.S_IFREG | rng.randrange(0o7777 + 1) for _ in range(5000)]
+
+    analysis = analyze_modes(modes)
+
+    assert [decode_flags(f) for f in analysis.flags.tolist()] == [detect_unusual_permissions(m) for m in modes]
+    assert analysis.counts == [sum(1 for m in modes if name in reference_flags(m)) for name in FLAG_NAMES]
+
+
+def test_analyze_modes_empty(engine):
+    analysis = analyze_modes([])
+    assert len(analysis.flags) == 0
+    assert analysis.counts == [0] * len(FLAG_NAMES)
+
+
+def test_count_and_decode_counts():
+    flags = [permission_flags(stat.S_IWOTH), permission_flags(stat.S_IWOTH | stat.S_ISVTX), 0]
+    counts = count_flags(flags)
+    assert decode_counts(counts) == {"world-writable": 2, "sticky-bit": 1}
@@ -0,0 +1,97 @@
+import os
+import stat
+import zipfile
+
+import pytest
+
+from file_system_analyzer.models.file_system_analyzer import FileSystemAnalyzer
+from file_system_analyzer.models.sharding import (PartialResult, CategoryTotals, shard_for_name, scan_shard,
+                                                  scan_shards, merge_partial_results)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for i in range(8):
+        sub = tmp_path / f"dir_{i}"
+        sub.mkdir()
+        (sub / "notes.txt").write_text("x" * (i + 1) * 100)
+        (sub / "data.bin").write_bytes(b"\x00" * (i + 1) * 1000)
+    (tmp_path / "top.txt").write_text("top level file")
+    os.chmod(tmp_path / "dir_3" / "notes.txt", stat.S_IRUSR | stat.S_IWOTH)
+    return tmp_path
+
+
+def test_shard_for_name_is_deterministic():
+    assert shard_for_name("dir_1", 4) == shard_for_name("dir_1", 4)
+    assert all(1 <= shard_for_name(f"d{i}", 3) <= 3 for i in range(50))
+
+
+def test_invalid_shard(tmp_path):
+    with pytest.raises(ValueError):
+        FileSystemAnalyzer(tmp_path, 10, shard=(0, 2))
+    with pytest.raises(ValueError):
+        FileSystemAnalyzer(tmp_path, 10, shard=(3, 2))
+
+
+def test_shards_partition_the_tree(tree):
+    full = FileSystemAnalyzer(tree, 2000)
+    full.categorize_files()
+    expected = PartialResult.from_analyzer(full, top_k=3)
+
+    merged = merge_partial_results([scan_shard(tree, 2000, (i, 3), top_k=3) for i in range(1, 4)])
+
+    assert merged.complete
+    assert merged.categories == expected.categories
+    assert merged.large_files == expected.large_files
+    assert len(merged.large_files) == 3
+    assert merged.unusual_permissions == expected.unusual_permissions
+
+
+def test_scan_shards_multiprocess(tree):
+    full = FileSystemAnalyzer(tree, 2000)
+    full.categorize_files()
+    expected = PartialResult.from_analyzer(full)
+
+    merged = scan_shards(tree, 2000, 4, max_workers=2)
+
+    assert merged.shards == [1, 2, 3, 4]
+    assert merged.categories == expected.categories
+    assert merged.large_files == expected.large_files
+
+
+def test_archive_members_in_partial_results(tree):
+    for i in (1, 6):
+        with zipfile.ZipFile(tree / f"dir_{i}" / "bundle.zip", "w") as archive:
+            archive.writestr("readme.txt", "x" * 300)
+            archive.writestr("photo.jpg", b"\xff" * 500)
+    full = FileSystemAnalyzer(tree, 2000, inspect_archives=True)
+    full.categorize_files()
+    expected = PartialResult.from_analyzer(full)
+    assert (expected.categories["text"].archived_size, expected.categories["text"].archived_count) == (600, 2)
+
+    partials = []
+    for i in (1, 2):
+        shard = FileSystemAnalyzer(tree, 2000, shard=(i, 2), inspect_archives=True)
+        shard.categorize_files()
+        partials.append(PartialResult.from_dict(PartialResult.from_analyzer(shard).to_dict()))
+    assert merge_partial_results(partials).categories == expected.categories
+
+
+def test_partial_result_round_trip(tmp_path):
+    result = PartialResult("/data", 10, shard_count=2, shards=[2], top_k=1,
+                           categories={"text": CategoryTotals(15, 2, 8192, 300, 4)},
+                           large_files=[("/data/a.txt", 11)],
+                           unusual_permissions={"/data/a.txt": ["world-writable"]})
+    result.save(tmp_path / "part.json")
+    assert PartialResult.load(tmp_path / "part.json") == result
+    assert not result.complete
+
+
+def test_merge_errors():
+    first = PartialResult("/data", 10, shard_count=2, shards=[1])
+    with pytest.raises(ValueError):
+        first.merge(PartialResult("/other", 10, shard_count=2, shards=[2]))
+    with pytest.raises(ValueError):
+        first.merge(PartialResult("/data", 10, shard_count=2, shards=[1]))
+    with pytest.raises(ValueError):
+        merge_partial_results([])
@@ -0,0 +1,93 @@
+import os
+import threading
+
+import pytest
+
+from file_system_analyzer.models.classifiers import MagicClassifier
+from file_system_analyzer.models.file_system_analyzer import FileMetadata
+from file_system_analyzer.models.sniffing import HeaderReader, as_ctypes
+from file_system_analyzer.models.utils import infer_file_type_magic, magic_available
+
+
+def test_read_caps_bytes(tmp_path):
+    (tmp_path / "large").write_bytes(bytes(range(256)) * 100)
+    (tmp_path / "small").write_bytes(b"abc")
+    reader = HeaderReader(1000)
+    with reader.read(tmp_path / "large") as header:
+        assert header.tobytes() == (bytes(range(256)) * 4)[:1000]
+    with reader.read(tmp_path / "small") as header:
+        assert header.tobytes() == b"abc"
+        assert as_ctypes(header).raw == b"abc"
+
+
+def test_read_reuses_buffer_per_thread(tmp_path):
+    (tmp_path / "a").write_bytes(b"first")
+    reader = HeaderReader(16)
+    buffers = []
+
+    def read():
+        for _ in range(2):
+            with reader.read(tmp_path / "a") as header:
+                buffers.append(header.obj)
+
+    read()
+    thread = threading.Thread(target=read)
+    thread.start()
+    thread.join()
+    assert buffers[0] is buffers[1] and buffers[2] is buffers[3]
+    assert buffers[0] is not buffers[2]
+
+
+def test_view_released_after_read(tmp_path):
+    (tmp_path / "a").write_bytes(b"abc")
+    with HeaderReader(16).read(tmp_path / "a") as header:
+        pass
+    with pytest.raises(ValueError):
+        header.tobytes()
+
+
+def test_read_without_preadv(tmp_path, monkeypatch):
+    monkeypatch.delattr(os, "preadv", raising=False)
+    (tmp_path / "a").write_bytes(b"x" * 100)
+    with HeaderReader(64).read(tmp_path / "a") as header:
+        assert header.tobytes() == b"x" * 64
+
+
+def test_read_fifo_does_not_block(tmp_path):
+    # e.g. a file replaced by a FIFO since it was listed, which fails instead of waiting for a writer
+    os.mkfifo(tmp_path / "pipe")
+    with pytest.raises(OSError):
+        with HeaderReader(64).read(tmp_path / "pipe"):
+            pass
+
+
+def test_read_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        with HeaderReader(64).read(tmp_path / "missing"):
+            pass
+
+
+def test_invalid_max_bytes():
+    with pytest.raises(ValueError):
+        HeaderReader(0)
+
+
+@pytest.mark.skipif(not magic_available(), reason="libmagic is not available")
+@pytest.mark.parametrize(
+    "name, content",
+    [
+        ("notes.txt", b"plain text\n" * 100),
+        ("image.png", b"\x89PNG\r\n\x1a\n" + bytes(100)),
+        ("doc.pdf", b"%PDF-1.4\n" + b"x" * 100),
+        ("program", b"\x7fELF\x02\x01\x01" + bytes(100)),
+        ("data.xlsx", b"PK\x03\x04" + bytes(100)),
+        ("empty.txt", b""),
+        ("unknown.jpg", bytes(range(256)) * 8),
+    ]
+)
+def test_magic_classifier_matches_from_file(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    file = FileMetadata(str(path), len(content), 0o644)
+    assert MagicClassifier().classify(file) == infer_file_type_magic(str(path))
+    assert MagicClassifier(64).classify(file) == infer_file_type_magic(str(path))
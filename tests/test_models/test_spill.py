@@ -0,0 +1,88 @@
+import os
+import resource
+
+import pytest
+
+from file_system_analyzer.models.file_system_analyzer import FileMetadata, FileSystemAnalyzer
+from file_system_analyzer.models.spill import RECORD_BYTES, SpillStore
+
+
+def make_file(i, category="text"):
+    return FileMetadata(f"/data/dir_{i % 7}/file_{i}.txt", i * 10, 0o100644 | (i % 3), None if i % 5 else i * 4096,
+                        category, i % 4)
+
+
+def test_spill_store_preserves_order():
+    store = SpillStore(memory_limit=20 * RECORD_BYTES)
+    texts = store.new_list("text")
+    images = store.new_list("image")
+    expected_texts, expected_images = [], []
+    for i in range(500):
+        file = make_file(i, "text" if i % 3 else "image")
+        (texts if i % 3 else images).append(file)
+        (expected_texts if i % 3 else expected_images).append(file)
+
+    assert store.runs > 10
+    assert 0 < store.spilled < 500
+    assert len(texts) == len(expected_texts) and len(images) == len(expected_images)
+    assert list(texts) == expected_texts
+    assert list(images) == expected_images
+    # lists can be iterated several times
+    assert list(texts) == expected_texts
+    store.close()
+
+
+def test_more_runs_than_open_files():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    # every record spills a run, so iterating must not keep all of them open at once
+    store = SpillStore(memory_limit=1)
+    files = store.new_list("text")
+    expected = [make_file(i) for i in range(300)]
+    for file in expected:
+        files.append(file)
+    assert store.runs == 300
+    resource.setrlimit(resource.RLIMIT_NOFILE, (len(os.listdir("/proc/self/fd")) + 50, hard))
+    try:
+        assert list(files) == expected
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    store.close()
+
+
+def test_spill_store_non_utf8_paths():
+    store = SpillStore(memory_limit=1)
+    files = store.new_list("other")
+    path = os.fsdecode(b"/data/bad\xffname")
+    files.append(FileMetadata(path, 1, 0o100644, 512, "other", 0))
+    assert [f.path for f in files] == [path]
+    store.close()
+
+
+def test_spill_store_invalid_limit():
+    with pytest.raises(ValueError):
+        SpillStore(0)
+
+
+def test_analyzer_with_memory_limit(tmp_path):
+    root = tmp_path / "data"
+    for d in range(5):
+        (root / f"dir_{d}").mkdir(parents=True)
+        for i in range(40):
+            (root / f"dir_{d}" / f"file_{i}.{'txt' if i % 2 else 'png'}").write_text("x" * (i + d))
+
+    unlimited = FileSystemAnalyzer(root, 30)
+    unlimited.categorize_files()
+    limited = FileSystemAnalyzer(root, 30, memory_limit=50 * RECORD_BYTES, spill_dir=tmp_path)
+    limited.categorize_files()
+
+    assert limited.spill_store.spilled > 0
+    assert limited.files_by_category.keys() == unlimited.files_by_category.keys()
+    for category, files in unlimited.files_by_category.items():
+        spilled = limited.files_by_category[category]
+        assert spilled.size == files.size and len(spilled.files) == len(files.files)
+        assert list(spilled.files) == files.files
+    assert limited.large_files == unlimited.large_files
+
+    # the run files are removed once the files are reported
+    limited.close()
+    assert [path.name for path in tmp_path.iterdir()] == ["data"]
@@ -0,0 +1,42 @@
+import pytest
+
+from file_system_analyzer.models.term_matcher import TermMatcher
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("nothing to see", None),
+        ("", None),
+        ("Zip archive data", "zip"),
+        ("ELF 64-bit LSB SHARED OBJECT, x86-64", "shared object"),
+        # longest match wins when several terms start at the same position
+        ("Microsoft Excel 2007+ spreadsheetml", "excel"),
+        ("spreadsheetml document", "spreadsheetml"),
+        # leftmost match wins over a longer one further right
+        ("tar archive", "tar"),
+        ("POSIX shell script, ASCII text executable", "shell script"),
+    ]
+)
+def test_search(text, expected):
+    matcher = TermMatcher(["spreadsheet", "spreadsheetml", "excel", "zip", "archive", "tar",
+                           "shared object", "shell script", "executable", "object"])
+    assert matcher.search(text) == expected
+
+
+def test_search_overlapping_terms():
+    matcher = TermMatcher(["he", "she", "hers", "his"])
+    assert matcher.search("ushers") == "she"
+    assert matcher.search("xhersx") == "hers"
+    assert matcher.search("ahishe") == "his"
+
+
+def test_order_of_terms_does_not_matter():
+    terms = ["compress", "compressed data", "data"]
+    text = "gzip compressed data, from Unix"
+    assert TermMatcher(terms).search(text) == TermMatcher(reversed(terms)).search(text) == "compressed data"
+
+
+def test_empty_term_error():
+    with pytest.raises(ValueError):
+        TermMatcher(["zip", ""])
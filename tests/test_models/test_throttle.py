@@ -0,0 +1,85 @@
+import pytest
+
+from file_system_analyzer.models.file_system_analyzer import FileSystemAnalyzer
+from file_system_analyzer.models.throttle import IOThrottle, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_burst_then_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(10, burst=5, clock=clock, sleep=clock.sleep)
+    # the burst is served without waiting
+    assert [bucket.acquire() for _ in range(5)] == [0.0] * 5
+    # then every token takes 1/rate seconds
+    assert bucket.acquire() == pytest.approx(0.1)
+    assert bucket.acquire() == pytest.approx(0.1)
+
+    # tokens refill while idle, up to the burst
+    clock.now += 100
+    assert [bucket.acquire() for _ in range(5)] == [0.0] * 5
+    assert bucket.acquire() > 0
+
+
+def test_token_bucket_large_request_keeps_long_term_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(100, clock=clock, sleep=clock.sleep)
+    for _ in range(10):
+        bucket.acquire(250)
+    # 2500 tokens at 100 per second, minus the initial burst of 100
+    assert clock.now == pytest.approx(24)
+
+
+def test_token_bucket_invalid_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_unlimited_throttle_never_waits():
+    throttle = IOThrottle()
+    throttle.op(1000)
+    throttle.read(10 ** 12)
+    assert throttle.waited == 0
+
+
+class RecordingThrottle(IOThrottle):
+    def __init__(self):
+        super().__init__()
+        self.ops = 0
+        self.bytes_read = 0
+
+    def op(self, count=1):
+        self.ops += count
+
+    def read(self, size):
+        super().read(size)
+        self.bytes_read += size
+
+
+def test_analyzer_charges_throttle(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.txt").write_text("a" * 100)
+    (tmp_path / "sub" / "b.txt").write_text("b" * 50)
+
+    throttle = RecordingThrottle()
+    analyzer = FileSystemAnalyzer(tmp_path, 1000, throttle=throttle)
+    analyzer.categorize_files()
+
+    # two directory listings and two stats, plus opening each file if libmagic reads it
+    if analyzer._magic_available:
+        assert throttle.ops == 6
+        assert throttle.bytes_read == 150
+    else:
+        assert throttle.ops == 4
+    assert analyzer.files_by_category["text"].size == 150
@@ -1,10 +1,15 @@
 import pytest
 import base64
+import os
 import stat
+from pathlib import Path
+from types import SimpleNamespace
 
 from file_system_analyzer.models.utils import (get_permissions, infer_file_type_magic,
                                                infer_file_type_magic_raw, infer_file_type_extension, convert_size,
-                                               detect_unusual_permissions)
+                                               detect_unusual_permissions, category_from_description,
+                                               category_from_mime, category_from_extension, category_cache_stats,
+                                               allocated_size, file_extension)
 
 
 @pytest.mark.parametrize(
@@ -113,8 +118,12 @@ def test_infer_file_type_extension_error(tmp_path):
         ("document_file.pdf", "document"),
         ("presentation_file.pptx", "presentation"),
         ("spreadsheet_file.xls", "spreadsheet"),
+        ("workbook.xlb", "spreadsheet"),
+        ("add_in.ppa", "presentation"),
         ("audio_file.mp3", "audio"),
-        ("video_file.mp4", "video")
+        ("video_file.mp4", "video"),
+        ("IMAGE_FILE.JPG", "image"),
+        ("Archive.Tar", "archive")
     ]
 )
 def test_infer_file_type_extension_success(file_path, expected, tmp_path):
@@ -145,7 +154,9 @@ def test_convert_size_error(bad_input):
         (1024, "1 KiB"),
         (1536, "1.5 KiB"),
         (5 * 1024**2, "5 MiB"),
-        (7 * 1024**4, "7 TiB")
+        (7 * 1024**4, "7 TiB"),
+        (1024**5 - 1, "1024.0 TiB"),
+        (1024**5, "1 PiB")
     ]
 )
 def test_convert_size_success(bytes_in, expected):
@@ -185,3 +196,76 @@ def test_detect_unusual_permissions_error(bad_input):
 )
 def test_detect_unusual_permissions_success(mode, expected):
     assert detect_unusual_permissions(mode) == expected
+
+
+@pytest.mark.parametrize(
+    "description, expected",
+    [
+        ("ELF 64-bit LSB shared object, x86-64, dynamically linked", "executable"),
+        ("Zip archive data, at least v2.0 to extract", "archive"),
+        ("Composite Document File V2 Document, Microsoft Excel", "document"),
+        ("CSV text", "spreadsheet"),
+        ("data", "other"),
+    ]
+)
+def test_category_from_description(description, expected):
+    assert category_from_description(description) == expected
+
+
+@pytest.mark.parametrize(
+    "mime_type, expected",
+    [
+        ("text/plain", "text"),
+        ("image/png", "image"),
+        ("audio/mpeg", "audio"),
+        ("video/mp4", "video"),
+        ("application/pdf", "document"),
+        ("application/x-sqlite3", None),
+        ("inode/x-empty", "other"),
+    ]
+)
+def test_category_from_mime(mime_type, expected):
+    assert category_from_mime(mime_type) == expected
+
+
+@pytest.mark.parametrize("bad_input", ["text", "", "/plain"])
+def test_category_from_mime_error(bad_input):
+    with pytest.raises(ValueError):
+        category_from_mime(bad_input)
+
+
+def test_category_from_extension():
+    assert category_from_extension(".jpg") == category_from_extension(".JPG") == "image"
+    assert category_from_extension(".unknown") == "other"
+    assert category_from_extension("") == "other"
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["a.txt", "/data/a.tar.gz", "/data/.bashrc", ".bashrc", "/data/..a", "/data/a..b", "/data.d/file", "/data/file",
+     "/data/file.", "...", "/", "", "a.TXT", "/data/.a.b"]
+)
+def test_file_extension_matches_splitext(path):
+    assert file_extension(path) == os.path.splitext(path)[1]
+    assert file_extension(Path(path)) == os.path.splitext(Path(path))[1]
+
+
+def test_category_cache_stats():
+    category_from_mime.cache_clear()
+    category_from_mime("image/gif")
+    category_from_mime("image/gif")
+    category_from_mime("image/gif")
+    category_from_mime("text/html")
+
+    stats = category_cache_stats()
+
+    assert set(stats) == {"mime", "description"}
+    assert stats["mime"]["hits"] == 2
+    assert stats["mime"]["misses"] == 2
+    assert stats["mime"]["size"] == 2
+    assert stats["mime"]["hit_rate"] == 0.5
+
+
+def test_allocated_size():
+    assert allocated_size(SimpleNamespace(st_size=10_000, st_blocks=8)) == 4096
+    assert allocated_size(SimpleNamespace(st_size=10_000)) == 10_000